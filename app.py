@@ -1,528 +1,914 @@
-from flask import Flask, jsonify, request, send_from_directory
-from aws.cognito_utils import create_user_pool, create_app_client, get_user_pool_id, get_client_id
-from aws.dynamodb_utils import create_appointments_table, put_appointment, update_appointment_status
-from aws.s3_utils import get_s3_client, create_bucket, upload_car_image, configure_bucket_cors
-from aws.sns_utils import send_notification
-from aws.lambda_utils import invoke_lambda_function
-import boto3
-import uuid
-import json
-from datetime import datetime
-from functools import wraps
-from autocare_utils.validators import AppointmentValidator
-import os
-
-app = Flask(__name__, static_folder='frontend', static_url_path='')
-
-# AWS Configuration
-REGION = 'us-east-1'
-USER_POOL_ID = None
-CLIENT_ID = None
-BUCKET_NAME = 'autocare-images1-' + str(uuid.uuid4())
-PORT = 5555
-SNS_TOPIC_ARN = None
-APPOINTMENTS_TABLE = 'Appointments'
-
-def init_aws_services():
-    global USER_POOL_ID, CLIENT_ID, APPOINTMENTS_TABLE, SNS_TOPIC_ARN
-    
-    try:
-        USER_POOL_ID = get_user_pool_id()
-        CLIENT_ID = get_client_id()
-        
-        if not USER_POOL_ID or not CLIENT_ID:
-            print("Failed to initialize Cognito: USER_POOL_ID or CLIENT_ID is None")
-            return False
-            
-        print(f"Initialized with User Pool ID: {USER_POOL_ID}")
-        print(f"Initialized with Client ID: {CLIENT_ID}")
-        
-        # Initialize S3 first
-        s3_client = get_s3_client(REGION)
-        if not s3_client:
-            print("Failed to initialize S3 client")
-            return False
-        
-        bucket = create_bucket(s3_client, BUCKET_NAME, REGION)
-        if not bucket:
-            print("Failed to create S3 bucket")
-            return False
-            
-        # Configure CORS for the bucket
-        if not configure_bucket_cors(s3_client, BUCKET_NAME):
-            print("Failed to configure CORS for S3 bucket")
-            return False
-        
-        print(f"Successfully created/verified bucket: {BUCKET_NAME}")
-        
-        # Initialize DynamoDB
-        try:
-            APPOINTMENTS_TABLE = create_appointments_table()
-        except Exception as e:
-            print(f"Error initializing DynamoDB: {str(e)}")
-            return False
-        
-        # Initialize SNS
-        sns_client = boto3.client('sns', region_name=REGION)
-        response = sns_client.create_topic(Name='appointment-notifications')
-        SNS_TOPIC_ARN = response['TopicArn']
-        
-        # Subscribe the user's email when they create an appointment
-        print(f"Successfully created SNS topic: {SNS_TOPIC_ARN}")
-        
-        return True
-    except Exception as e:
-        print(f"Error initializing AWS services: {str(e)}")
-        return False
-
-# Call initialization before the first request
-@app.before_request
-def initialize():
-    if not init_aws_services():
-        print("WARNING: Failed to initialize AWS services")
-
-# Authentication decorator
-def require_auth(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        auth_header = request.headers.get('Authorization')
-        if not auth_header:
-            return jsonify({'error': 'No authorization header'}), 401
-        
-        # Verify token with Cognito
-        try:
-            cognito = boto3.client('cognito-idp', region_name=REGION)
-            response = cognito.get_user(AccessToken=auth_header)
-            return f(*args, **kwargs, user=response)
-        except Exception as e:
-            return jsonify({'error': 'Invalid token'}), 401
-    
-    return decorated
-
-# Routes
-@app.route('/')
-def index():
-    return send_from_directory(app.static_folder, 'index.html')
-
-@app.route('/api/auth/signup', methods=['POST'])
-def signup():
-    try:
-        print("Received signup request")
-        print("Request headers:", dict(request.headers))
-        print("Request data:", request.get_data())
-        
-        if not request.is_json:
-            return jsonify({'error': 'Content-Type must be application/json'}), 400
-            
-        data = request.get_json()
-        print("Parsed JSON data:", data)
-        
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-            
-        if not data.get('email'):
-            return jsonify({'error': 'Email is required'}), 400
-            
-        if not data.get('password'):
-            return jsonify({'error': 'Password is required'}), 400
-            
-        if len(data['password']) < 8:
-            return jsonify({'error': 'Password must be at least 8 characters long'}), 400
-            
-        cognito = boto3.client('cognito-idp', region_name=REGION)
-        
-        try:
-            # Sign up the user
-            response = cognito.sign_up(
-                ClientId=CLIENT_ID,
-                Username=data['email'],
-                Password=data['password'],
-                UserAttributes=[
-                    {'Name': 'email', 'Value': data['email']}
-                ]
-            )
-            
-            # Auto confirm the user (for testing only - remove in production)
-            cognito.admin_confirm_sign_up(
-                UserPoolId=USER_POOL_ID,
-                Username=data['email']
-            )
-            
-            print(f"Signup response: {response}")
-            return jsonify({'message': 'User registered and confirmed successfully'}), 201
-            
-        except cognito.exceptions.UsernameExistsException:
-            return jsonify({'error': 'User already exists'}), 400
-        except cognito.exceptions.InvalidPasswordException as e:
-            return jsonify({'error': str(e)}), 400
-        except cognito.exceptions.InvalidParameterException as e:
-            return jsonify({'error': str(e)}), 400
-        except Exception as e:
-            print(f"Cognito signup error: {str(e)}")
-            return jsonify({'error': str(e)}), 400
-            
-    except Exception as e:
-        print(f"General signup error: {str(e)}")
-        return jsonify({'error': 'Internal server error'}), 500
-
-@app.route('/api/auth/login', methods=['POST'])
-def login():
-    try:
-        data = request.json
-        if not data or 'email' not in data or 'password' not in data:
-            return jsonify({'error': 'Email and password are required'}), 400
-
-        cognito = boto3.client('cognito-idp', region_name=REGION)
-        
-        try:
-            response = cognito.initiate_auth(
-                ClientId=CLIENT_ID,
-                AuthFlow='USER_PASSWORD_AUTH',
-                AuthParameters={
-                    'USERNAME': data['email'],
-                    'PASSWORD': data['password']
-                }
-            )
-            
-            return jsonify({
-                'token': response['AuthenticationResult']['AccessToken'],
-                'user': {'email': data['email']}
-            })
-        except cognito.exceptions.UserNotFoundException:
-            return jsonify({'error': 'User not found. Please sign up first.'}), 404
-        except cognito.exceptions.NotAuthorizedException:
-            return jsonify({'error': 'Incorrect username or password'}), 401
-        except cognito.exceptions.UserNotConfirmedException:
-            return jsonify({'error': 'Please verify your email before logging in'}), 403
-        except Exception as e:
-            print(f"Cognito login error: {str(e)}")
-            return jsonify({'error': str(e)}), 401
-            
-    except Exception as e:
-        print(f"General login error: {str(e)}")
-        return jsonify({'error': 'Internal server error'}), 500
-
-@app.route('/api/auth/logout', methods=['POST'])
-@require_auth
-def logout(user):
-    try:
-        cognito = boto3.client('cognito-idp', region_name=REGION)
-        auth_header = request.headers.get('Authorization')
-        cognito.global_sign_out(AccessToken=auth_header)
-        return jsonify({'message': 'Logged out successfully'})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 400
-
-@app.route('/api/upload-url', methods=['POST'])
-@require_auth
-def get_upload_url(user):
-    try:
-        s3_client = get_s3_client(REGION)
-        if not s3_client:
-            return jsonify({'error': 'S3 client initialization failed'}), 500
-            
-        data = request.json
-        file_name = f"{uuid.uuid4()}-{data['fileName']}"
-        
-        # Verify bucket exists
-        try:
-            s3_client.head_bucket(Bucket=BUCKET_NAME)
-        except Exception as e:
-            return jsonify({'error': f'S3 bucket not found: {str(e)}'}), 500
-            
-        url = s3_client.generate_presigned_url(
-            'put_object',
-            Params={
-                'Bucket': BUCKET_NAME,
-                'Key': file_name,
-                'ContentType': data['fileType'],
-                'ACL': 'public-read'
-            },
-            ExpiresIn=3600
-        )
-        
-        # Use the correct S3 URL format
-        image_url = f"https://{BUCKET_NAME}.s3.{REGION}.amazonaws.com/{file_name}"
-        
-        return jsonify({
-            'uploadUrl': url,
-            'imageUrl': image_url
-        })
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 400
-
-@app.route('/api/appointments', methods=['GET'])
-@require_auth
-def get_appointments(user):
-    try:
-        dynamodb = boto3.resource('dynamodb', region_name=REGION)
-        table = dynamodb.Table('Appointments')
-        
-        # Query using the GSI
-        response = table.query(
-            IndexName='UserEmailIndex',
-            KeyConditionExpression='userEmail = :email',
-            ExpressionAttributeValues={
-                ':email': user['Username']
-            }
-        )
-        
-        appointments = response.get('Items', [])
-        # Sort appointments by date and time
-        appointments.sort(key=lambda x: (x['date'], x['time']))
-        
-        return jsonify(appointments)
-    except Exception as e:
-        print(f"Error fetching appointments: {str(e)}")
-        return jsonify({'error': str(e)}), 400
-
-# Add this function for appointment validation
-def validate_appointment(appointment_data):
-    try:
-        # Validate car information
-        car_valid, car_message = AppointmentValidator.validate_car_info(
-            appointment_data['carMake'],
-            appointment_data['carModel'],
-            appointment_data['carYear']
-        )
-        if not car_valid:
-            return {'isValid': False, 'message': car_message}
-
-        # Validate appointment time
-        time_valid, time_message = AppointmentValidator.validate_appointment_time(
-            appointment_data['date'],
-            appointment_data['time']
-        )
-        if not time_valid:
-            return {'isValid': False, 'message': time_message}
-
-        # Validate service type
-        service_valid, service_message = AppointmentValidator.validate_service_type(
-            appointment_data['serviceType']
-        )
-        if not service_valid:
-            return {'isValid': False, 'message': service_message}
-
-        return {'isValid': True}
-    except Exception as e:
-        return {
-            'isValid': False,
-            'message': f'Validation error: {str(e)}'
-        }
-
-# Add this new route to handle SNS confirmation
-@app.route('/api/confirm-appointment/<appointment_id>', methods=['GET', 'POST'])
-def confirm_appointment(appointment_id):
-    try:
-        print(f"Starting confirmation process for appointment: {appointment_id}")  # Debug log
-        print(f"Request method: {request.method}")  # Debug log
-        
-        # Update status using the new function
-        appointment = update_appointment_status(appointment_id, 'Confirmed')
-        
-        if not appointment:
-            print(f"No appointment found with ID: {appointment_id}")  # Debug log
-            return jsonify({'error': 'Appointment not found'}), 404
-            
-        print(f"Successfully updated appointment: {appointment}")  # Debug log
-        
-        if appointment.get('notificationPreference'):
-            message = f"""
-            Your appointment has been confirmed!
-            
-            Service: {appointment['serviceType']}
-            Date: {appointment['date']}
-            Time: {appointment['time']}
-            Vehicle: {appointment['carYear']} {appointment['carMake']} {appointment['carModel']}
-            
-            Thank you for choosing our service.
-            """
-            
-            send_notification(
-                SNS_TOPIC_ARN,
-                message,
-                'Appointment Confirmed'
-            )
-        
-        # If it's a GET request, return a simple HTML response
-        if request.method == 'GET':
-            return """
-            <html>
-                <body>
-                    <h1>Appointment Confirmed!</h1>
-                    <p>Your appointment has been successfully confirmed.</p>
-                </body>
-            </html>
-            """
-            
-        return jsonify({
-            'message': 'Appointment confirmed successfully', 
-            'appointment': appointment
-        }), 200
-        
-    except Exception as e:
-        print(f"Error confirming appointment: {str(e)}")  # Debug log
-        return jsonify({'error': str(e)}), 400
-
-# Add this new route to handle SNS notifications
-@app.route('/api/sns-notification', methods=['POST'])
-def handle_sns_notification():
-    try:
-        # Parse the SNS message
-        sns_message = json.loads(request.data)
-        print(f"Received SNS message: {sns_message}")  # Debug log
-
-        # Handle subscription confirmation
-        if sns_message.get('Type') == 'SubscriptionConfirmation':
-            subscription_url = sns_message.get('SubscribeURL')
-            import urllib.request
-            urllib.request.urlopen(subscription_url).read()
-            print("SNS subscription confirmed")
-            return jsonify({'message': 'Subscription confirmed'}), 200
-
-        # Handle notification
-        if sns_message.get('Type') == 'Notification':
-            message = json.loads(sns_message.get('Message', '{}'))
-            if message.get('event') == 'email_confirmed':
-                appointment_id = message.get('appointment_id')
-                if appointment_id:
-                    # Update the appointment status
-                    appointment = update_appointment_status(appointment_id, 'Confirmed')
-                    print(f"Updated appointment status: {appointment}")
-                    return jsonify({'message': 'Status updated successfully'}), 200
-
-        return jsonify({'message': 'Notification processed'}), 200
-
-    except Exception as e:
-        print(f"Error handling SNS notification: {str(e)}")  # Debug log
-        return jsonify({'error': str(e)}), 400
-
-# Update the create_appointment function to include SNS notification
-@app.route('/api/appointments', methods=['POST'])
-@require_auth
-def create_appointment(user):
-    try:
-        data = request.json
-        appointment_id = str(uuid.uuid4())
-        
-        # Use the updated validation with all appointment data
-        validation_result = validate_appointment(data)
-        
-        if not validation_result.get('isValid', False):
-            return jsonify({'error': validation_result.get('message', 'Invalid appointment')}), 400
-            
-        # Store appointment in DynamoDB
-        appointment_data = {
-            'appointment_id': appointment_id,
-            'userEmail': user['Username'],
-            'carMake': data['carMake'],
-            'carModel': data['carModel'],
-            'carYear': data['carYear'],
-            'serviceType': data['serviceType'],
-            'date': data['date'],
-            'time': data['time'],
-            'description': data.get('description', ''),
-            'imageUrl': data.get('imageUrl', ''),
-            'status': 'Pending',
-            'createdAt': datetime.utcnow().isoformat(),
-            'notificationPreference': data.get('notificationPreference', True),
-        }
-        
-        put_appointment(appointment_id, appointment_data)
-        
-        if appointment_data['notificationPreference']:
-            try:
-                sns_client = boto3.client('sns', region_name=REGION)
-                
-                # Create a message that includes the appointment ID
-                message = {
-                    'event': 'email_confirmation',
-                    'appointment_id': appointment_id,
-                    'details': f"""
-                    Thank you for booking an appointment with AutoCare Service Manager!
-                    
-                    Appointment Details:
-                    Service: {data['serviceType']}
-                    Date: {data['date']}
-                    Time: {data['time']}
-                    Vehicle: {data['carYear']} {data['carMake']} {data['carModel']}
-                    
-                    Please confirm your email to confirm the appointment.
-                    """
-                }
-                
-                # Subscribe to SNS topic with HTTP endpoint for confirmation
-                sns_client.subscribe(
-                    TopicArn=SNS_TOPIC_ARN,
-                    Protocol='email',
-                    Endpoint=user['Username'],
-                    Attributes={
-                        'FilterPolicy': json.dumps({
-                            'event': ['email_confirmation']
-                        })
-                    }
-                )
-                
-                # Send the notification
-                send_notification(
-                    SNS_TOPIC_ARN,
-                    json.dumps(message),
-                    'Appointment Confirmation Required'
-                )
-                
-            except Exception as e:
-                print(f"Error setting up SNS notification: {str(e)}")
-                
-        return jsonify(appointment_data), 201
-        
-    except Exception as e:
-        print(f"Error creating appointment: {str(e)}")
-        return jsonify({'error': str(e)}), 400
-
-@app.route('/<path:path>')
-def serve_static_files(path):
-    return send_from_directory(app.static_folder, path)
-
-# Example of sending notification when appointment status changes
-def update_appointment_status(appointment_id, new_status):
-    try:
-        dynamodb = boto3.resource('dynamodb', region_name=REGION)
-        table = dynamodb.Table('Appointments')
-        
-        # Update the appointment status
-        response = table.update_item(
-            Key={'appointment_id': appointment_id},
-            UpdateExpression='SET #status = :status',
-            ExpressionAttributeNames={'#status': 'status'},
-            ExpressionAttributeValues={':status': new_status},
-            ReturnValues='ALL_NEW'
-        )
-        
-        # Send notification about status change
-        appointment = response['Attributes']
-        if appointment.get('notificationPreference'):
-            message = f"""
-            Your appointment status has been updated.
-            
-            New Status: {new_status}
-            Service: {appointment['serviceType']}
-            Date: {appointment['date']}
-            Time: {appointment['time']}
-            """
-            
-            send_notification(
-                SNS_TOPIC_ARN,
-                message,
-                f'Appointment Status Update: {new_status}'
-            )
-            
-        return response['Attributes']
-    except Exception as e:
-        print(f"Error updating appointment status: {str(e)}")
-        raise e
-
-if __name__ == '__main__':
-    # Update for production
-    port = int(os.environ.get('PORT', 5555))
-    app.run(host='0.0.0.0', port=port)
+from flask import Blueprint, Flask, Response, current_app, jsonify, request, send_from_directory
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from appointment_events import Event, EventHub, format_sse
+from availability import ShopAvailability
+from image_variants import ImageVariantService
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY, instrument_app, instrument_aws
+from notification_outbox import NotificationOutbox
+from remote_validation import LocalLambda, RemoteValidator
+from aws.clients import get_client
+from aws.dynamodb_utils import (
+    put_appointment, update_appointment_status as update_appointment_record, query_user_appointments,
+    query_user_changes, latest_user_update, invalidate_user_appointments, get_appointment_cache,
+    get_appointment, SlotFullError, CANCELLED_STATUS, put_appointments_batch,
+    reserve_slot_capacity, release_slot_capacity, set_image_variants, add_image_references
+)
+from aws.s3_utils import upload_car_image, hash_from_key
+from aws.services import AWSServices
+from aws.lambda_utils import invoke_lambda_function
+from aws.sns_utils import get_publisher, get_subscription_registry, publish_notification, subscribe_email
+import base64
+import hashlib
+import uuid
+import json
+from collections import Counter
+from datetime import date, datetime
+from functools import wraps
+from autocare_utils.rules import DEFAULT_SHOP, RuleBook
+import os
+
+# AWS Configuration
+REGION = 'us-east-1'
+PORT = 5555
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+# Server-Sent Events settings, per worker process
+SSE_HEARTBEAT_SECONDS = 15
+SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS', 100))
+SSE_REPLAY_SIZE = 500
+MAX_AVAILABILITY_RESULTS = 50
+MAX_BATCH_SIZE = 100
+MAX_UPLOAD_FILES = 10
+# SNS calls run on this many background workers; failures end up in the file
+NOTIFICATION_WORKERS = int(os.environ.get('NOTIFICATION_WORKERS', 4))
+NOTIFICATION_DEAD_LETTER_FILE = os.environ.get('NOTIFICATION_DEAD_LETTER_FILE', 'notification_deadletter.jsonl')
+# Pillow workers producing thumbnail/medium copies of appointment photos
+IMAGE_VARIANT_WORKERS = int(os.environ.get('IMAGE_VARIANT_WORKERS', 2))
+# EventSource cannot send headers, so the stream takes a short-lived token in
+# its URL; it only opens streams, so a logged URL does not leak API access
+STREAM_TOKEN_TTL = 60
+# Signs stream tokens; set it when several workers serve the same users
+SECRET_KEY = os.environ.get('SECRET_KEY')
+# Per-shop booking rules; edits to the file are picked up without a restart
+SHOP_RULES_FILE = os.environ.get('SHOP_RULES_FILE', 'shop_rules.json')
+# Validator Lambda to consult before booking ('local' runs the handler
+# in-process); unset validates locally only. Slower answers fall back to local
+VALIDATION_FUNCTION = os.environ.get('VALIDATION_FUNCTION')
+VALIDATION_BUDGET_MS = int(os.environ.get('VALIDATION_BUDGET_MS', 250))
+# 'cognito' verifies tokens against the user pool's JWKS; 'local' signs and
+# verifies them with a self-generated key pair (development and tests only)
+AUTH_MODE = os.environ.get('AUTH_MODE', 'cognito')
+
+api = Blueprint('api', __name__)
+
+def create_app():
+    """Build the Flask app and start the one-time AWS bootstrap.
+
+    Resources must already exist; see ``python -m aws.provision``.
+    """
+    app = Flask(__name__, static_folder='frontend', static_url_path='')
+    if SECRET_KEY:
+        app.secret_key = SECRET_KEY
+    else:
+        print("WARNING: SECRET_KEY not set, stream tokens only work in this process")
+        app.secret_key = os.urandom(32)
+    # Before any AWS client exists, since clients copy the hooks when built
+    instrument_aws()
+    instrument_app(app)
+
+    services = AWSServices(REGION, AUTH_MODE)
+    app.extensions['aws_services'] = services
+    app.extensions['event_hub'] = EventHub(replay_size=SSE_REPLAY_SIZE, max_streams=SSE_MAX_STREAMS)
+    app.extensions['shop_rules'] = RuleBook(SHOP_RULES_FILE)
+    app.extensions['availability'] = ShopAvailability(app.extensions['shop_rules'])
+    # Load slot counters before the first search rather than during it
+    services.add_warm_up(lambda: app.extensions['availability'].warm(app.extensions['shop_rules'].shop_ids()))
+    app.extensions['remote_validator'] = None
+    if VALIDATION_FUNCTION:
+        invoke = invoke_lambda_function
+        if VALIDATION_FUNCTION == 'local':
+            # Imported here as it loads its own rule book
+            from autocare_utils import lambda_handler
+            invoke = LocalLambda(lambda_handler.handler).invoke
+        app.extensions['remote_validator'] = RemoteValidator(
+            VALIDATION_FUNCTION, validate_appointment, invoke=invoke, budget_ms=VALIDATION_BUDGET_MS,
+            rules_version=app.extensions['shop_rules'].version
+        )
+
+    def store_image_variants(appointment_id, variants):
+        appointment = set_image_variants(appointment_id, variants)
+        if appointment:
+            app.extensions['event_hub'].publish(appointment['userEmail'], 'appointment', appointment)
+
+    app.extensions['image_variants'] = ImageVariantService(
+        services, store_image_variants, workers=IMAGE_VARIANT_WORKERS
+    )
+
+    # Created before the outbox so its atexit flush runs after the outbox drains
+    get_publisher()
+    outbox = NotificationOutbox(
+        {'send_notification': publish_notification, 'subscribe_email': subscribe_email},
+        workers=NOTIFICATION_WORKERS,
+        dead_letter_path=NOTIFICATION_DEAD_LETTER_FILE
+    )
+    app.extensions['notification_outbox'] = outbox
+    outbox.start()
+    app.register_blueprint(api)
+
+    services.start()
+    return app
+
+def aws_services():
+    return current_app.extensions['aws_services']
+
+def event_hub():
+    return current_app.extensions['event_hub']
+
+def notification_outbox():
+    return current_app.extensions['notification_outbox']
+
+def availability():
+    return current_app.extensions['availability']
+
+def image_variants():
+    return current_app.extensions['image_variants']
+
+def shop_rules():
+    return current_app.extensions['shop_rules']
+
+def remote_validator():
+    return current_app.extensions['remote_validator']
+
+def shop_capacity(shop_id):
+    """Bookings one of the shop's slots can hold, or None for an unknown shop."""
+    rules = shop_rules().get(shop_id)
+    return rules.service_bays if rules else None
+
+def image_hash(appointment):
+    """SHA-256 of the appointment's photo if it is stored content-addressed, else None."""
+    key = aws_services().presigner.key_from_url(appointment.get('imageUrl'))
+    return hash_from_key(key) if key else None
+
+def publish_appointment_event(appointment):
+    """Push an appointment change to the owner's open event streams."""
+    event_hub().publish(appointment['userEmail'], 'appointment', appointment)
+
+# Hold API traffic until bootstrap has finished; static files are always served
+@api.before_app_request
+def require_ready():
+    if request.path.startswith('/api/') and not aws_services().ready:
+        return jsonify({'error': 'Service is starting up'}), 503
+
+# Authentication decorator
+def require_auth(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        auth_header = request.headers.get('Authorization')
+        if not auth_header:
+            return jsonify({'error': 'No authorization header'}), 401
+        
+        # Verify the token locally against the user pool's signing keys
+        try:
+            user = aws_services().token_verifier.verify(auth_header)
+        except Exception as e:
+            return jsonify({'error': 'Invalid token'}), 401
+        return f(*args, **kwargs, user=user)
+    
+    return decorated
+
+# Routes
+@api.route('/healthz')
+def healthz():
+    return jsonify({'status': 'ok'})
+
+@api.route('/readyz')
+def readyz():
+    services = aws_services()
+    if not services.ready:
+        return jsonify({'status': 'starting', 'error': services.error}), 503
+    return jsonify({'status': 'ready'})
+
+@api.route('/statsz')
+def statsz():
+    return jsonify({
+        'appointmentCache': get_appointment_cache().stats(),
+        'eventStreams': event_hub().open_streams,
+        'notificationOutbox': notification_outbox().stats(),
+        'remoteValidation': remote_validator().stats() if remote_validator() else None
+    })
+
+@api.route('/metrics')
+def metrics():
+    return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
+@api.route('/')
+def index():
+    return send_from_directory(current_app.static_folder, 'index.html')
+
+@api.route('/api/auth/signup', methods=['POST'])
+def signup():
+    try:
+        print("Received signup request")
+        print("Request headers:", dict(request.headers))
+        print("Request data:", request.get_data())
+        
+        if not request.is_json:
+            return jsonify({'error': 'Content-Type must be application/json'}), 400
+            
+        data = request.get_json()
+        print("Parsed JSON data:", data)
+        
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+            
+        if not data.get('email'):
+            return jsonify({'error': 'Email is required'}), 400
+            
+        if not data.get('password'):
+            return jsonify({'error': 'Password is required'}), 400
+            
+        if len(data['password']) < 8:
+            return jsonify({'error': 'Password must be at least 8 characters long'}), 400
+            
+        cognito = get_client('cognito-idp', REGION)
+        
+        try:
+            # Sign up the user
+            response = cognito.sign_up(
+                ClientId=aws_services().client_id,
+                Username=data['email'],
+                Password=data['password'],
+                UserAttributes=[
+                    {'Name': 'email', 'Value': data['email']}
+                ]
+            )
+            
+            # Auto confirm the user (for testing only - remove in production)
+            cognito.admin_confirm_sign_up(
+                UserPoolId=aws_services().user_pool_id,
+                Username=data['email']
+            )
+            
+            print(f"Signup response: {response}")
+            return jsonify({'message': 'User registered and confirmed successfully'}), 201
+            
+        except cognito.exceptions.UsernameExistsException:
+            return jsonify({'error': 'User already exists'}), 400
+        except cognito.exceptions.InvalidPasswordException as e:
+            return jsonify({'error': str(e)}), 400
+        except cognito.exceptions.InvalidParameterException as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            print(f"Cognito signup error: {str(e)}")
+            return jsonify({'error': str(e)}), 400
+            
+    except Exception as e:
+        print(f"General signup error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@api.route('/api/auth/login', methods=['POST'])
+def login():
+    try:
+        data = request.json
+        if not data or 'email' not in data or 'password' not in data:
+            return jsonify({'error': 'Email and password are required'}), 400
+
+        cognito = get_client('cognito-idp', REGION)
+        
+        try:
+            response = cognito.initiate_auth(
+                ClientId=aws_services().client_id,
+                AuthFlow='USER_PASSWORD_AUTH',
+                AuthParameters={
+                    'USERNAME': data['email'],
+                    'PASSWORD': data['password']
+                }
+            )
+            
+            token = response['AuthenticationResult']['AccessToken']
+            verifier = aws_services().token_verifier
+            if verifier.is_local:
+                token = verifier.issue_token(data['email'])
+
+            return jsonify({
+                'token': token,
+                'user': {'email': data['email']}
+            })
+        except cognito.exceptions.UserNotFoundException:
+            return jsonify({'error': 'User not found. Please sign up first.'}), 404
+        except cognito.exceptions.NotAuthorizedException:
+            return jsonify({'error': 'Incorrect username or password'}), 401
+        except cognito.exceptions.UserNotConfirmedException:
+            return jsonify({'error': 'Please verify your email before logging in'}), 403
+        except Exception as e:
+            print(f"Cognito login error: {str(e)}")
+            return jsonify({'error': str(e)}), 401
+            
+    except Exception as e:
+        print(f"General login error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@api.route('/api/auth/logout', methods=['POST'])
+@require_auth
+def logout(user):
+    try:
+        if aws_services().token_verifier.is_local:
+            return jsonify({'message': 'Logged out successfully'})
+
+        cognito = get_client('cognito-idp', REGION)
+        auth_header = request.headers.get('Authorization')
+        cognito.global_sign_out(AccessToken=auth_header)
+        return jsonify({'message': 'Logged out successfully'})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@api.route('/api/upload-url', methods=['POST'])
+@require_auth
+def get_upload_url(user):
+    try:
+        data = request.json
+        upload = aws_services().presigner.presign_put(
+            data['fileName'], data['fileType'], sha256=data.get('sha256')
+        )
+        if upload.get('exists'):
+            # Same content is already stored; the client skips the upload
+            return jsonify({'exists': True, 'imageUrl': upload['imageUrl']})
+        return jsonify({
+            'uploadUrl': upload['uploadUrl'],
+            'headers': upload['headers'],
+            'imageUrl': upload['imageUrl']
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@api.route('/api/upload-urls', methods=['POST'])
+@require_auth
+def get_upload_urls(user):
+    """Presign uploads for several photos at once.
+
+    Body: {"files": [{"fileName", "fileType", "sha256"?}], "method": "PUT" | "POST"}.
+    POST returns a policy (url + form fields) that S3 enforces on size and type.
+    In content-addressed mode, files already stored come back with ``exists``.
+    """
+    try:
+        data = request.json or {}
+        files = data.get('files')
+        method = data.get('method', 'PUT').upper()
+        if not isinstance(files, list) or not files:
+            return jsonify({'error': 'files must be a non-empty list'}), 400
+        if len(files) > MAX_UPLOAD_FILES:
+            return jsonify({'error': f'At most {MAX_UPLOAD_FILES} files per request'}), 400
+        if method not in ('PUT', 'POST'):
+            return jsonify({'error': 'method must be PUT or POST'}), 400
+
+        for file in files:
+            if not isinstance(file, dict) or not file.get('fileName'):
+                return jsonify({'error': 'Each file needs a fileName'}), 400
+            if not str(file.get('fileType', '')).startswith('image/'):
+                return jsonify({'error': f"{file['fileName']}: fileType must be an image type"}), 400
+
+        presigner = aws_services().presigner
+        if method == 'POST':
+            uploads = [presigner.presign_post(f['fileName'], f['fileType'], sha256=f.get('sha256'))
+                       for f in files]
+        else:
+            uploads = [presigner.presign_put(f['fileName'], f['fileType'], sha256=f.get('sha256'))
+                       for f in files]
+
+        return jsonify({'method': method, 'uploads': uploads})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@api.route('/api/appointments', methods=['GET'])
+@require_auth
+def get_appointments(user):
+    try:
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+
+        date_from = request.args.get('from')
+        date_to = request.args.get('to')
+        for value in (date_from, date_to):
+            if value:
+                try:
+                    datetime.strptime(value, '%Y-%m-%d')
+                except ValueError:
+                    return jsonify({'error': 'from/to must be dates in YYYY-MM-DD format'}), 400
+
+        start_key = None
+        if request.args.get('cursor'):
+            start_key = decode_cursor(request.args['cursor'])
+            if not start_key or start_key.get('userEmail') != user['Username']:
+                return jsonify({'error': 'Invalid cursor'}), 400
+
+        sync_token = latest_user_update(user['Username'])
+        since = request.args.get('since')
+        if since:
+            # Delta mode: rows changed since the client's last sync token, plus
+            # an overlap. A late write can land inside the overlap without
+            # moving the newest updatedAt, so the ETag covers the rows too.
+            appointments, last_key = query_user_changes(
+                user['Username'],
+                since,
+                limit=limit,
+                start_key=start_key
+            )
+            rows = ','.join(f"{a['appointment_id']}@{a.get('updatedAt')}" for a in appointments)
+            etag = hashlib.sha256(
+                f"{user['Username']}|{sync_token}|{request.query_string.decode()}|{rows}".encode()
+            ).hexdigest()[:32]
+            if etag in request.if_none_match:
+                return not_modified(etag)
+        else:
+            # The response only depends on the user's newest updatedAt and the
+            # query string, so an unchanged pair can be answered with a 304
+            etag = hashlib.sha256(
+                f"{user['Username']}|{sync_token}|{request.query_string.decode()}".encode()
+            ).hexdigest()[:32]
+            if etag in request.if_none_match:
+                return not_modified(etag)
+
+            # The GSI sort key returns rows already ordered by date and time
+            appointments, last_key = query_user_appointments(
+                user['Username'],
+                limit=limit,
+                start_key=start_key,
+                date_from=date_from,
+                date_to=date_to
+            )
+
+        # Photos from before variants existed are processed on first sight
+        for appointment in appointments:
+            image_variants().submit(appointment)
+
+        response = jsonify({
+            'appointments': appointments,
+            'nextCursor': encode_cursor(last_key) if last_key else None,
+            'syncToken': sync_token
+        })
+        response.set_etag(etag)
+        return response
+    except Exception as e:
+        print(f"Error fetching appointments: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+
+def not_modified(etag):
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+def stream_tokens():
+    return URLSafeTimedSerializer(current_app.secret_key, salt='appointment-stream')
+
+@api.route('/api/appointments/stream-token', methods=['POST'])
+@require_auth
+def create_stream_token(user):
+    """Issue a token that can only open the user's event stream, for STREAM_TOKEN_TTL seconds."""
+    return jsonify({
+        'streamToken': stream_tokens().dumps(user['Username']),
+        'expiresIn': STREAM_TOKEN_TTL
+    })
+
+@api.route('/api/appointments/stream', methods=['GET'])
+def stream_appointments():
+    try:
+        user = {'Username': stream_tokens().loads(request.args.get('token', ''), max_age=STREAM_TOKEN_TTL)}
+    except BadSignature:
+        return jsonify({'error': 'Invalid or expired stream token'}), 401
+
+    # Ids from another worker or an earlier process force a resync
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId') or None
+
+    hub = event_hub()
+    subscription = hub.subscribe(user['Username'], last_event_id)
+    if subscription is None:
+        return jsonify({'error': 'Too many open event streams, fall back to polling'}), 503
+
+    def generate():
+        try:
+            yield format_sse(retry=5000)
+            for event in subscription.backlog:
+                yield format_sse(event)
+            while True:
+                if subscription.resync:
+                    subscription.resync = False
+                    yield format_sse(Event(None, user['Username'], 'resync', '{}'))
+                event = subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                yield format_sse(event) if event else format_sse(comment='heartbeat')
+        finally:
+            hub.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@api.route('/api/availability', methods=['GET'])
+def get_availability():
+    try:
+        shop_id = request.args.get('shopId', DEFAULT_SHOP)
+        rules = shop_rules().get(shop_id)
+        if rules is None:
+            return jsonify({'error': f'Unknown shop: {shop_id}'}), 404
+        service = request.args.get('service')
+        if service and service not in rules.services:
+            return jsonify({'error': f"Invalid service type. Must be one of: {', '.join(rules.services)}"}), 400
+
+        try:
+            from_date = date.fromisoformat(request.args['from']) if request.args.get('from') else date.today()
+            days = int(request.args.get('days', rules.max_days_ahead + 1))
+            limit = int(request.args.get('limit', 10))
+        except ValueError:
+            return jsonify({'error': 'from must be YYYY-MM-DD; days and limit must be integers'}), 400
+        if days < 1 or limit < 1 or limit > MAX_AVAILABILITY_RESULTS:
+            return jsonify({'error': f'days must be positive and limit between 1 and {MAX_AVAILABILITY_RESULTS}'}), 400
+
+        slots = availability().index(shop_id).find_open(from_date, days, limit)
+        return jsonify({'shopId': shop_id, 'service': service, 'slots': slots})
+    except Exception as e:
+        print(f"Error fetching availability: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+
+def encode_cursor(last_evaluated_key):
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        return None
+    return key if isinstance(key, dict) else None
+
+# Add this function for appointment validation
+def validate_appointment(appointment_data):
+    """Check an appointment against its shop's rules, reporting every failed rule."""
+    try:
+        return shop_rules().validate(appointment_data)
+    except Exception as e:
+        return {
+            'isValid': False,
+            'message': f'Validation error: {str(e)}',
+            'errors': [f'Validation error: {str(e)}']
+        }
+
+def validate_appointments(entries):
+    """Validate several appointments, through the validator Lambda when one is configured."""
+    validator = remote_validator()
+    if validator is None:
+        return [validate_appointment(entry) for entry in entries]
+    return validator.validate_many(entries)
+
+# Add this new route to handle SNS confirmation
+@api.route('/api/confirm-appointment/<appointment_id>', methods=['GET', 'POST'])
+def confirm_appointment(appointment_id):
+    try:
+        print(f"Starting confirmation process for appointment: {appointment_id}")  # Debug log
+        print(f"Request method: {request.method}")  # Debug log
+        
+        # Update status using the new function
+        appointment = update_appointment_status(appointment_id, 'Confirmed')
+        
+        if not appointment:
+            print(f"No appointment found with ID: {appointment_id}")  # Debug log
+            return jsonify({'error': 'Appointment not found'}), 404
+            
+        print(f"Successfully updated appointment: {appointment}")  # Debug log
+        
+        if appointment.get('notificationPreference'):
+            message = f"""
+            Your appointment has been confirmed!
+            
+            Service: {appointment['serviceType']}
+            Date: {appointment['date']}
+            Time: {appointment['time']}
+            Vehicle: {appointment['carYear']} {appointment['carMake']} {appointment['carModel']}
+            
+            Thank you for choosing our service.
+            """
+            
+            notification_outbox().enqueue(
+                'send_notification',
+                topic_arn=aws_services().sns_topic_arn,
+                message=message,
+                subject='Appointment Confirmed'
+            )
+        
+        # If it's a GET request, return a simple HTML response
+        if request.method == 'GET':
+            return """
+            <html>
+                <body>
+                    <h1>Appointment Confirmed!</h1>
+                    <p>Your appointment has been successfully confirmed.</p>
+                </body>
+            </html>
+            """
+            
+        return jsonify({
+            'message': 'Appointment confirmed successfully', 
+            'appointment': appointment
+        }), 200
+        
+    except Exception as e:
+        print(f"Error confirming appointment: {str(e)}")  # Debug log
+        return jsonify({'error': str(e)}), 400
+
+# Add this new route to handle SNS notifications
+@api.route('/api/sns-notification', methods=['POST'])
+def handle_sns_notification():
+    try:
+        # Parse the SNS message
+        sns_message = json.loads(request.data)
+        print(f"Received SNS message: {sns_message}")  # Debug log
+
+        # Handle subscription confirmation
+        if sns_message.get('Type') == 'SubscriptionConfirmation':
+            subscription_url = sns_message.get('SubscribeURL')
+            import urllib.request
+            urllib.request.urlopen(subscription_url).read()
+            print("SNS subscription confirmed")
+            return jsonify({'message': 'Subscription confirmed'}), 200
+
+        # Handle notification
+        if sns_message.get('Type') == 'Notification':
+            message = json.loads(sns_message.get('Message', '{}'))
+            if message.get('event') == 'email_confirmed':
+                appointment_id = message.get('appointment_id')
+                if appointment_id:
+                    # Update the appointment status
+                    appointment = update_appointment_status(appointment_id, 'Confirmed')
+                    print(f"Updated appointment status: {appointment}")
+                    return jsonify({'message': 'Status updated successfully'}), 200
+
+        return jsonify({'message': 'Notification processed'}), 200
+
+    except Exception as e:
+        print(f"Error handling SNS notification: {str(e)}")  # Debug log
+        return jsonify({'error': str(e)}), 400
+
+# Update the create_appointment function to include SNS notification
+@api.route('/api/appointments', methods=['POST'])
+@require_auth
+def create_appointment(user):
+    try:
+        data = request.json
+        appointment_id = str(uuid.uuid4())
+        
+        # Use the updated validation with all appointment data
+        validation_result = validate_appointments([data])[0]
+        
+        if not validation_result.get('isValid', False):
+            return jsonify({
+                'error': validation_result.get('message', 'Invalid appointment'),
+                'errors': validation_result.get('errors', [])
+            }), 400
+            
+        # Store appointment in DynamoDB
+        appointment_data = build_appointment(user, data, appointment_id)
+        
+        try:
+            put_appointment(appointment_id, appointment_data, capacity=shop_capacity(appointment_data['shopId']),
+                            image_hash=image_hash(appointment_data))
+        except SlotFullError as e:
+            availability().set_free(appointment_data['shopId'], data['date'], data['time'], 0)
+            return jsonify({'error': str(e)}), 409
+        availability().adjust(appointment_data['shopId'], data['date'], data['time'], -1)
+        publish_appointment_event(appointment_data)
+        image_variants().submit(appointment_data)
+        
+        if appointment_data['notificationPreference']:
+            try:
+                # Create a message that includes the appointment ID
+                message = {
+                    'event': 'email_confirmation',
+                    'appointment_id': appointment_id,
+                    'details': f"""
+                    Thank you for booking an appointment with AutoCare Service Manager!
+                    
+                    Appointment Details:
+                    Service: {data['serviceType']}
+                    Date: {data['date']}
+                    Time: {data['time']}
+                    Vehicle: {data['carYear']} {data['carMake']} {data['carModel']}
+                    
+                    Please confirm your email to confirm the appointment.
+                    """
+                }
+                
+                # Subscribe and notify in the background; the booking is already stored
+                topic_arn = aws_services().sns_topic_arn
+                if not get_subscription_registry().is_subscribed(topic_arn, user['Username']):
+                    notification_outbox().enqueue(
+                        'subscribe_email',
+                        topic_arn=topic_arn,
+                        email=user['Username'],
+                        filter_policy={'event': ['email_confirmation']}
+                    )
+                notification_outbox().enqueue(
+                    'send_notification',
+                    topic_arn=aws_services().sns_topic_arn,
+                    message=json.dumps(message),
+                    subject='Appointment Confirmation Required'
+                )
+                
+            except Exception as e:
+                print(f"Error queueing SNS notification: {str(e)}")
+                
+        return jsonify(appointment_data), 201
+        
+    except Exception as e:
+        print(f"Error creating appointment: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+
+def build_appointment(user, data, appointment_id):
+    return {
+        'appointment_id': appointment_id,
+        'userEmail': user['Username'],
+        'carMake': data['carMake'],
+        'carModel': data['carModel'],
+        'carYear': data['carYear'],
+        'serviceType': data['serviceType'],
+        'shopId': data.get('shopId', DEFAULT_SHOP),
+        'date': data['date'],
+        'time': data['time'],
+        'description': data.get('description', ''),
+        'imageUrl': data.get('imageUrl', ''),
+        'status': 'Pending',
+        'createdAt': datetime.utcnow().isoformat(),
+        'notificationPreference': data.get('notificationPreference', True),
+    }
+
+@api.route('/api/appointments/batch', methods=['POST'])
+@require_auth
+def create_appointments_batch(user):
+    try:
+        data = request.json or {}
+        entries = data.get('appointments')
+        if not isinstance(entries, list) or not entries:
+            return jsonify({'error': 'appointments must be a non-empty list'}), 400
+        if len(entries) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_BATCH_SIZE} appointments per batch'}), 400
+
+        # Validate everything first; results are reported per entry, by index
+        results = [None] * len(entries)
+        accepted = {}
+        objects = [index for index, entry in enumerate(entries) if isinstance(entry, dict)]
+        validation_results = dict(zip(objects, validate_appointments([entries[i] for i in objects])))
+        for index, entry in enumerate(entries):
+            validation_result = validation_results.get(index, {
+                'isValid': False, 'message': 'Each appointment must be an object'
+            })
+            if not validation_result.get('isValid', False):
+                results[index] = {'index': index, 'status': 'rejected',
+                                  'error': validation_result.get('message', 'Invalid appointment'),
+                                  'errors': validation_result.get('errors', [])}
+                continue
+            accepted[index] = build_appointment(user, entry, str(uuid.uuid4()))
+
+        # Take the places in each slot with one conditional update per slot;
+        # entries beyond what is free are rejected, in the order they came
+        by_slot = {}
+        for index, appointment in accepted.items():
+            by_slot.setdefault((appointment['shopId'], appointment['date'], appointment['time']), []).append(index)
+        reserved = []
+        try:
+            for (shop_id, slot_date, slot_time), indexes in by_slot.items():
+                taken = reserve_slot_capacity(slot_date, slot_time, len(indexes),
+                                              capacity=shop_capacity(shop_id), shop_id=shop_id)
+                if taken:
+                    reserved.append((shop_id, slot_date, slot_time, taken))
+                if taken < len(indexes):
+                    availability().refresh_slot(shop_id, slot_date, slot_time)
+                    for index in indexes[taken:]:
+                        del accepted[index]
+                        results[index] = {'index': index, 'status': 'rejected',
+                                          'error': f'Not enough capacity left on {slot_date} at {slot_time}'}
+
+            written, failed = put_appointments_batch(list(accepted.values()))
+            written, failed = set(written), set(failed)
+        except Exception:
+            # Nothing was stored; give back every place taken above
+            for shop_id, slot_date, slot_time, taken in reserved:
+                release_slot_capacity(slot_date, slot_time, taken, shop_id=shop_id)
+            raise
+
+        image_counts = Counter(image_hash(a) for a in accepted.values() if a['appointment_id'] in written)
+        image_counts.pop(None, None)
+        if image_counts:
+            try:
+                add_image_references(image_counts)
+            except Exception as e:
+                print(f"Error counting image references: {str(e)}")
+
+        created = []
+        for index, appointment in accepted.items():
+            if appointment['appointment_id'] in failed:
+                release_slot_capacity(appointment['date'], appointment['time'], 1, shop_id=appointment['shopId'])
+                results[index] = {'index': index, 'status': 'failed',
+                                  'error': 'Could not store appointment, please retry'}
+            else:
+                availability().adjust(appointment['shopId'], appointment['date'], appointment['time'], -1)
+                publish_appointment_event(appointment)
+                image_variants().submit(appointment)
+                created.append(appointment)
+                results[index] = {'index': index, 'status': 'created', 'appointment': appointment}
+
+        # One summary notification for the whole batch
+        if created and data.get('notificationPreference', True):
+            try:
+                lines = '\n'.join(
+                    f"{a['date']} {a['time']} - {a['serviceType']} - {a['carYear']} {a['carMake']} {a['carModel']}"
+                    for a in created
+                )
+                notification_outbox().enqueue(
+                    'send_notification',
+                    topic_arn=aws_services().sns_topic_arn,
+                    message=f"""
+                    Thank you for booking {len(created)} appointments with AutoCare Service Manager!
+                    
+                    {lines}
+                    """,
+                    subject=f'{len(created)} Appointments Booked'
+                )
+            except Exception as e:
+                print(f"Error queueing batch notification: {str(e)}")
+
+        if len(created) == len(entries):
+            status_code = 201
+        elif created:
+            status_code = 207
+        else:
+            status_code = 400
+        return jsonify({'created': len(created), 'results': results}), status_code
+
+    except Exception as e:
+        print(f"Error creating appointments batch: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+
+@api.route('/api/appointments/<appointment_id>/cancel', methods=['POST'])
+@require_auth
+def cancel_appointment(user, appointment_id):
+    try:
+        appointment = get_appointment(appointment_id)
+        if not appointment or appointment.get('userEmail') != user['Username']:
+            return jsonify({'error': 'Appointment not found'}), 404
+
+        appointment = update_appointment_status(appointment_id, CANCELLED_STATUS)
+        return jsonify(appointment), 200
+    except Exception as e:
+        print(f"Error cancelling appointment: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+
+@api.route('/<path:path>')
+def serve_static_files(path):
+    return send_from_directory(current_app.static_folder, path)
+
+# Example of sending notification when appointment status changes
+def update_appointment_status(appointment_id, new_status):
+    try:
+        # Update the appointment status (and its slot's capacity counter)
+        appointment, previous_status = update_appointment_record(appointment_id, new_status,
+                                                                 capacity_for=shop_capacity)
+        if not appointment:
+            return None
+        
+        # Send notification about status change
+        invalidate_user_appointments(appointment.get('userEmail'))
+        # Only cancelling or un-cancelling moves the slot's counter
+        if (previous_status == CANCELLED_STATUS) != (new_status == CANCELLED_STATUS):
+            availability().refresh_slot(appointment.get('shopId', DEFAULT_SHOP), appointment['date'], appointment['time'])
+        publish_appointment_event(appointment)
+        if appointment.get('notificationPreference'):
+            message = f"""
+            Your appointment status has been updated.
+            
+            New Status: {new_status}
+            Service: {appointment['serviceType']}
+            Date: {appointment['date']}
+            Time: {appointment['time']}
+            """
+            
+            notification_outbox().enqueue(
+                'send_notification',
+                topic_arn=aws_services().sns_topic_arn,
+                message=message,
+                subject=f'Appointment Status Update: {new_status}'
+            )
+            
+        return appointment
+    except Exception as e:
+        print(f"Error updating appointment status: {str(e)}")
+        raise e
+
+app = create_app()
+
+if __name__ == '__main__':
+    # Update for production
+    port = int(os.environ.get('PORT', 5555))
+    app.run(host='0.0.0.0', port=port)
@@ -0,0 +1,119 @@
+import json
+import os
+import queue
+import threading
+from collections import deque, namedtuple
+
+# ``id`` is what clients see, "<epoch>-<seq>"; ``seq`` orders events within one hub
+Event = namedtuple('Event', ['id', 'user_email', 'name', 'data', 'seq'], defaults=(None,))
+
+
+class Subscription:
+    """One open stream: a queue of events for a single user."""
+
+    def __init__(self, user_email, backlog, resync, max_queue):
+        self.user_email = user_email
+        self.backlog = backlog
+        self.resync = resync
+        self.queue = queue.Queue(maxsize=max_queue)
+
+    def get(self, timeout):
+        """Return the next event, or None if nothing arrived within ``timeout``."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventHub:
+    """In-process pub/sub of appointment changes, fanned out per user.
+
+    Events get increasing ids and the most recent ``replay_size`` are kept,
+    so a client reconnecting with ``Last-Event-ID`` receives what it missed.
+    Ids carry a random per-hub epoch, so an id issued by another process
+    (or before a restart) is recognised. If the epoch differs or the id is
+    no longer in the buffer, the client is told to resync instead. At most
+    ``max_streams`` subscriptions may be open at once.
+    """
+
+    def __init__(self, replay_size=500, max_streams=100, max_queue=100):
+        self.max_streams = max_streams
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._replay = deque(maxlen=replay_size)
+        self._subscribers = {}
+        self.epoch = os.urandom(6).hex()
+        self._last_id = 0
+        self._open_streams = 0
+
+    @property
+    def open_streams(self):
+        return self._open_streams
+
+    def publish(self, user_email, name, data):
+        with self._lock:
+            self._last_id += 1
+            event = Event(f"{self.epoch}-{self._last_id}", user_email, name, json.dumps(data, default=str),
+                          self._last_id)
+            self._replay.append(event)
+            subscribers = list(self._subscribers.get(user_email, ()))
+
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                # A stalled client; it will be told to reload everything
+                subscription.resync = True
+        return event.id
+
+    def _sequence(self, event_id):
+        """The sequence number of one of this hub's event ids, or None for any other id."""
+        epoch, _, seq = str(event_id).rpartition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def subscribe(self, user_email, last_event_id=None):
+        """Open a subscription, or return None if the stream cap is reached."""
+        with self._lock:
+            if self._open_streams >= self.max_streams:
+                return None
+
+            backlog, resync = [], False
+            if last_event_id is not None:
+                last_seq = self._sequence(last_event_id)
+                oldest = self._replay[0].seq if self._replay else self._last_id + 1
+                if last_seq is None or last_seq > self._last_id or last_seq < oldest - 1:
+                    resync = True
+                else:
+                    backlog = [e for e in self._replay
+                               if e.seq > last_seq and e.user_email == user_email]
+
+            subscription = Subscription(user_email, backlog, resync, self.max_queue)
+            self._subscribers.setdefault(user_email, set()).add(subscription)
+            self._open_streams += 1
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_email)
+            if subscribers and subscription in subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_email]
+                self._open_streams -= 1
+
+
+def format_sse(event=None, comment=None, retry=None):
+    """Serialize one Server-Sent Events frame."""
+    lines = []
+    if comment is not None:
+        lines.append(f": {comment}")
+    if retry is not None:
+        lines.append(f"retry: {retry}")
+    if event is not None:
+        if event.id is not None:
+            lines.append(f"id: {event.id}")
+        lines.append(f"event: {event.name}")
+        lines.append(f"data: {event.data}")
+    return "\n".join(lines) + "\n\n"
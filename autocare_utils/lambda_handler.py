@@ -0,0 +1,18 @@
+"""Lambda entry point for appointment validation.
+
+Handler: ``autocare_utils.lambda_handler.handler``. The event is one
+appointment, or ``{"appointments": [...]}`` for several. Results have the
+same shape as ``validate_appointment`` in app.py, which uses the same rules.
+"""
+import os
+
+from autocare_utils.rules import RuleBook
+
+# Built once per container and reused by warm invocations
+_rules = RuleBook(os.environ.get('SHOP_RULES_FILE', 'shop_rules.json'))
+
+
+def handler(event, context=None):
+    if 'appointments' in event:
+        return {'results': [_rules.validate(appointment) for appointment in event['appointments']]}
+    return _rules.validate(event)
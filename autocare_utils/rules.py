@@ -0,0 +1,244 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+DEFAULT_SHOP = 'default'
+# Places per slot for shops whose config does not set serviceBays
+DEFAULT_SERVICE_BAYS = int(os.environ.get('SERVICE_BAYS', 3))
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+# Used when no rules file exists; AppointmentValidator's constants come from it
+DEFAULT_RULES = {
+    'default': {
+        'hours': {'open': '09:00', 'close': '17:00'},
+        'slotMinutes': 60,
+        'closedSlots': ['12:00'],
+        'weekdayHours': {},
+        'holidays': [],
+        'services': ['oil-change', 'tire-rotation', 'brake-service', 'general-inspection', 'repair'],
+        'leadTimeHours': 0,
+        'maxDaysAhead': 90,
+        'minCarYear': 1900,
+        'serviceBays': DEFAULT_SERVICE_BAYS,
+    },
+    'shops': {}
+}
+
+
+def _minutes(hhmm):
+    hours, minutes = hhmm.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def _slot_times(hours, slot_minutes, closed_slots):
+    """Start times of every slot that fits between opening and closing."""
+    if not hours:
+        return frozenset()
+    opening, closing = _minutes(hours['open']), _minutes(hours['close'])
+    times = (f"{m // 60:02d}:{m % 60:02d}" for m in range(opening, closing - slot_minutes + 1, slot_minutes))
+    return frozenset(t for t in times if t not in closed_slots)
+
+
+class ShopRules:
+    """One shop's booking rules, compiled from its config section.
+
+    Slot times are precomputed per weekday and holidays and services are
+    sets, so validating an appointment is a few lookups and comparisons.
+    Every rule runs; ``validate`` returns all failures, not just the first.
+    """
+
+    def __init__(self, shop_id, config):
+        self.shop_id = shop_id
+        slot_minutes = int(config.get('slotMinutes', 60))
+        closed_slots = frozenset(config.get('closedSlots', ()))
+        weekday_hours = config.get('weekdayHours', {})
+        for name in weekday_hours:
+            if name not in WEEKDAYS:
+                raise ValueError(f"{shop_id}: unknown weekday {name!r}")
+
+        # weekday() -> bookable times; a weekday mapped to null is closed
+        self.times_by_weekday = tuple(
+            _slot_times(weekday_hours.get(name, config['hours']), slot_minutes, closed_slots)
+            for name in WEEKDAYS
+        )
+        self.all_times = frozenset().union(*self.times_by_weekday)
+        self.holidays = frozenset(datetime.strptime(d, '%Y-%m-%d').date() for d in config.get('holidays', ()))
+        self.services = tuple(config['services'])
+        self.lead_time = timedelta(hours=float(config.get('leadTimeHours', 0)))
+        self.max_days_ahead = int(config.get('maxDaysAhead', 90))
+        self.min_car_year = int(config.get('minCarYear', 1900))
+        # Bookings one slot can hold, i.e. how many cars the shop works on at once
+        self.service_bays = int(config.get('serviceBays', DEFAULT_SERVICE_BAYS))
+        if self.service_bays < 1:
+            raise ValueError(f"{shop_id}: serviceBays must be at least 1")
+        self._field_checks = self._compile_field_checks()
+        self._date_checks = self._compile_date_checks()
+
+    def _compile_field_checks(self):
+        services = frozenset(self.services)
+        service_list = ', '.join(self.services)
+        min_year = self.min_car_year
+
+        def name_check(field, label):
+            def check(data, now):
+                value = data.get(field)
+                if not isinstance(value, str) or len(value.strip()) < 2:
+                    return f"{label} must be at least 2 characters"
+            return check
+
+        def year_check(data, now):
+            try:
+                year = int(data.get('carYear'))
+            except (TypeError, ValueError):
+                return "Invalid year format"
+            if year < min_year or year > now.year + 1:
+                return f"Car year must be between {min_year} and {now.year + 1}"
+
+        def service_check(data, now):
+            if data.get('serviceType') not in services:
+                return f"Invalid service type. Must be one of: {service_list}"
+
+        return (name_check('carMake', 'Car make'), name_check('carModel', 'Car model'),
+                year_check, service_check)
+
+    def _compile_date_checks(self):
+        times_by_weekday, holidays = self.times_by_weekday, self.holidays
+        max_ahead, lead_time = timedelta(days=self.max_days_ahead), self.lead_time
+
+        def window_check(day, time_str, now):
+            if day < now.date():
+                return "Appointment date cannot be in the past"
+            if day > now.date() + max_ahead:
+                return f"Appointment cannot be scheduled more than {max_ahead.days} days in advance"
+
+        def open_check(day, time_str, now):
+            if day in holidays:
+                return f"The shop is closed on {day.isoformat()}"
+            times = times_by_weekday[day.weekday()]
+            if not times:
+                return f"The shop is closed on {day.strftime('%A')}s"
+            if time_str not in times:
+                return f"Invalid appointment time. Available times: {', '.join(sorted(times))}"
+
+        def lead_time_check(day, time_str, now):
+            if not lead_time or time_str not in times_by_weekday[day.weekday()]:
+                return None
+            starts = datetime.combine(day, datetime.strptime(time_str, '%H:%M').time())
+            if starts < now + lead_time:
+                return f"Appointments must be booked at least {lead_time.total_seconds() / 3600:g} hours ahead"
+
+        return (window_check, open_check, lead_time_check)
+
+    def is_open(self, day, time_str):
+        """True if ``time_str`` on ``day`` is a bookable slot, ignoring the booking window."""
+        return day not in self.holidays and time_str in self.times_by_weekday[day.weekday()]
+
+    def validate(self, data, now=None):
+        """Return the list of rule violations; empty when the appointment is valid."""
+        now = now or datetime.now()
+        errors = [error for error in (check(data, now) for check in self._field_checks) if error]
+        try:
+            day = datetime.strptime(data.get('date'), '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            errors.append("Invalid date format")
+            return errors
+
+        time_str = data.get('time')
+        errors.extend(error for error in (check(day, time_str, now) for check in self._date_checks) if error)
+        return errors
+
+
+def compile_rules(config):
+    """Compile a rules document into {shop_id: ShopRules}.
+
+    Each entry under ``shops`` overrides keys of ``default``.
+    """
+    default = config['default']
+    shops = {DEFAULT_SHOP: ShopRules(DEFAULT_SHOP, default)}
+    for shop_id, overrides in config.get('shops', {}).items():
+        shops[shop_id] = ShopRules(shop_id, dict(default, **overrides))
+    return shops
+
+
+class RuleBook:
+    """Shop rules loaded from a JSON file and reloaded when it changes.
+
+    The file's mtime is checked at most every ``check_interval`` seconds.
+    A new version is compiled completely before it replaces the old one,
+    so readers never see a mix; a file that fails to compile is reported
+    and the previous rules stay in force.
+    """
+
+    def __init__(self, path, check_interval=5):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._shops = compile_rules(DEFAULT_RULES)
+        self._mtime = None
+        self._checked_at = 0
+        self.load()
+
+    def load(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            print(f"{self.path} not found, using the built-in booking rules")
+            return False
+
+        try:
+            with open(self.path) as f:
+                shops = compile_rules(json.load(f))
+        except Exception as e:
+            print(f"Error loading booking rules from {self.path}: {str(e)}")
+            self._mtime = mtime  # Do not retry until the file changes again
+            return False
+
+        self._shops, self._mtime = shops, mtime
+        print(f"Loaded booking rules for {len(shops)} shops from {self.path}")
+        return True
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            try:
+                changed = os.stat(self.path).st_mtime != self._mtime
+            except FileNotFoundError:
+                changed = False
+            if changed:
+                self.load()
+
+    def version(self):
+        """Changes whenever a new rules file is loaded."""
+        self._reload_if_changed()
+        return self._mtime
+
+    def shop_ids(self):
+        self._reload_if_changed()
+        return list(self._shops)
+
+    def get(self, shop_id=DEFAULT_SHOP):
+        """Return the rules for ``shop_id``, or None for an unknown shop."""
+        self._reload_if_changed()
+        return self._shops.get(shop_id)
+
+    def validate(self, data):
+        """Validate one appointment against its shop's rules.
+
+        Returns ``{'isValid', 'errors'}`` plus a joined ``message`` on failure.
+        """
+        rules = self.get(data.get('shopId', DEFAULT_SHOP))
+        if rules is None:
+            errors = [f"Unknown shop: {data.get('shopId')}"]
+        else:
+            errors = rules.validate(data)
+
+        if errors:
+            return {'isValid': False, 'message': '; '.join(errors), 'errors': errors}
+        return {'isValid': True, 'errors': []}
@@ -1,6 +1,36 @@
 from datetime import datetime, timedelta
 
+from autocare_utils.rules import DEFAULT_RULES, DEFAULT_SHOP, compile_rules
+
+try:
+    import numpy as np
+except ImportError:  # validate_many then returns plain lists
+    np = None
+
+# The built-in default shop; the per-field checks below follow its rules
+DEFAULT_SHOP_RULES = compile_rules(DEFAULT_RULES)[DEFAULT_SHOP]
+
 class AppointmentValidator:
+    # Bookable slots (9 AM to 4 PM, closed at noon), services and booking horizon
+    VALID_TIMES = tuple(sorted(DEFAULT_SHOP_RULES.all_times))
+    VALID_SERVICES = DEFAULT_SHOP_RULES.services
+    MAX_DAYS_AHEAD = DEFAULT_SHOP_RULES.max_days_ahead
+    MIN_CAR_YEAR = DEFAULT_SHOP_RULES.min_car_year
+
+    # Error bits reported per row by validate_many; 0 means the row is valid
+    ERROR_CAR_MAKE = 1
+    ERROR_CAR_MODEL = 2
+    ERROR_CAR_YEAR_FORMAT = 4
+    ERROR_CAR_YEAR_RANGE = 8
+    ERROR_DATE_FORMAT = 16
+    ERROR_DATE_PAST = 32
+    ERROR_DATE_TOO_FAR = 64
+    ERROR_TIME = 128
+    ERROR_SERVICE = 256
+    ERROR_CLOSED = 512
+    ERROR_LEAD_TIME = 1024
+    COLUMNS = ('carMake', 'carModel', 'carYear', 'date', 'time', 'serviceType')
+
     @staticmethod
     def validate_car_info(make, model, year):
         """Validate car information."""
@@ -14,8 +44,8 @@ class AppointmentValidator:
             
         try:
             year = int(year)
-            if year < 1900 or year > current_year + 1:
-                return False, f"Car year must be between 1900 and {current_year + 1}"
+            if year < AppointmentValidator.MIN_CAR_YEAR or year > current_year + 1:
+                return False, f"Car year must be between {AppointmentValidator.MIN_CAR_YEAR} and {current_year + 1}"
         except ValueError:
             return False, "Invalid year format"
             
@@ -33,13 +63,12 @@ class AppointmentValidator:
                 return False, "Appointment date cannot be in the past"
                 
             # Check if date is too far in the future (e.g., 3 months)
-            max_future_date = datetime.now() + timedelta(days=90)
+            max_future_date = datetime.now() + timedelta(days=AppointmentValidator.MAX_DAYS_AHEAD)
             if appointment_date.date() > max_future_date.date():
                 return False, "Appointment cannot be scheduled more than 3 months in advance"
                 
             # Validate business hours (9 AM to 4 PM)
-            valid_times = ['09:00', '10:00', '11:00', '13:00', '14:00', '15:00', '16:00']
-            if time_str not in valid_times:
+            if time_str not in AppointmentValidator.VALID_TIMES:
                 return False, "Invalid appointment time. Please select a time between 9 AM and 4 PM"
                 
             return True, "Valid appointment time"
@@ -50,10 +79,123 @@ class AppointmentValidator:
     @staticmethod
     def validate_service_type(service_type):
         """Validate service type."""
-        valid_services = ['oil-change', 'tire-rotation', 'brake-service', 
-                         'general-inspection', 'repair']
+        valid_services = AppointmentValidator.VALID_SERVICES
         
         if service_type not in valid_services:
             return False, f"Invalid service type. Must be one of: {', '.join(valid_services)}"
             
         return True, "Valid service type"
+
+    @classmethod
+    def validate_many(cls, columns, rules=None, now=None):
+        """Validate many appointments given column by column.
+
+        ``columns`` maps each name in COLUMNS to an equal-length sequence: a
+        list, a NumPy array or a DataFrame column. Rows are checked against
+        one shop's ShopRules (default: the built-in default shop), the same
+        rules ShopRules.validate applies: weekday hours, holidays and lead
+        time included. Returns ``(mask, codes)`` where ``mask[i]`` is True
+        for a valid row and ``codes[i]`` ORs the ERROR_* bits of every check
+        row ``i`` failed. Both are NumPy arrays when NumPy is installed,
+        lists otherwise.
+
+        Bounds are computed once and each distinct value (each distinct
+        date and time pair for the slot checks) is checked once, so the
+        repeated dates, makes and services of an import cost a dict lookup
+        per row.
+        """
+        rules = rules or DEFAULT_SHOP_RULES
+        now = now or datetime.now()
+        today = now.date()
+        max_date = today + timedelta(days=rules.max_days_ahead)
+        max_year = today.year + 1
+        min_year = rules.min_car_year
+        valid_services = frozenset(rules.services)
+        times_by_weekday, holidays = rules.times_by_weekday, rules.holidays
+        earliest = now + rules.lead_time if rules.lead_time else None
+
+        def name_code(error):
+            def check(value):
+                return 0 if isinstance(value, str) and len(value.strip()) >= 2 else error
+            return check
+
+        def year_code(value):
+            try:
+                year = int(value)
+            except (TypeError, ValueError):
+                return cls.ERROR_CAR_YEAR_FORMAT
+            return 0 if min_year <= year <= max_year else cls.ERROR_CAR_YEAR_RANGE
+
+        def slot_code(slot):
+            date_value, time_value = slot
+            try:
+                appointment_date = datetime.strptime(date_value, '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                return cls.ERROR_DATE_FORMAT
+            code = 0
+            if appointment_date < today:
+                code |= cls.ERROR_DATE_PAST
+            elif appointment_date > max_date:
+                code |= cls.ERROR_DATE_TOO_FAR
+            times = times_by_weekday[appointment_date.weekday()]
+            if appointment_date in holidays or not times:
+                code |= cls.ERROR_CLOSED
+            elif time_value not in times:
+                code |= cls.ERROR_TIME
+            elif earliest and datetime.combine(
+                    appointment_date, datetime.strptime(time_value, '%H:%M').time()) < earliest:
+                code |= cls.ERROR_LEAD_TIME
+            return code
+
+        dates, times = _as_list(columns['date']), _as_list(columns['time'])
+        if len(dates) != len(times):
+            raise ValueError(f"Column time has {len(times)} rows, expected {len(dates)}")
+        checks = (
+            ('carMake', _as_list(columns['carMake']), name_code(cls.ERROR_CAR_MAKE)),
+            ('carModel', _as_list(columns['carModel']), name_code(cls.ERROR_CAR_MODEL)),
+            ('carYear', _as_list(columns['carYear']), year_code),
+            ('date', list(zip(dates, times)), slot_code),
+            ('serviceType', _as_list(columns['serviceType']),
+             lambda value: 0 if value in valid_services else cls.ERROR_SERVICE),
+        )
+
+        codes = None
+        for name, values, check in checks:
+            column_codes = _map_distinct(values, check)
+            if codes is None:
+                codes = column_codes
+            elif len(column_codes) != len(codes):
+                raise ValueError(f"Column {name} has {len(column_codes)} rows, expected {len(codes)}")
+            else:
+                codes = [a | b for a, b in zip(codes, column_codes)]
+
+        if np is not None:
+            codes = np.array(codes, dtype=np.int16)
+            return codes == 0, codes
+        return [code == 0 for code in codes], codes
+
+    @classmethod
+    def describe_errors(cls, code):
+        """Names of the ERROR_* bits set in one row's code."""
+        return [name for name in dir(cls)
+                if name.startswith('ERROR_') and code & getattr(cls, name)]
+
+
+def _as_list(values):
+    # NumPy arrays and pandas Series convert to Python objects in one call
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+def _map_distinct(values, check):
+    """Apply ``check`` once per distinct value and return the per-row results."""
+    results = {}
+    codes = []
+    for value in values:
+        try:
+            codes.append(results[value])
+        except KeyError:
+            code = results[value] = check(value)
+            codes.append(code)
+        except TypeError:  # Unhashable value
+            codes.append(check(value))
+    return codes
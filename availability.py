@@ -0,0 +1,226 @@
+import threading
+import time
+from array import array
+from datetime import date, datetime, timedelta
+
+from autocare_utils.rules import DEFAULT_SHOP
+from aws.dynamodb_utils import get_slot_bookings
+
+
+class AvailabilityIndex:
+    """Free capacity for every bookable slot of one shop in its booking window.
+
+    One signed 16-bit counter per (day, slot time), laid out day by day, so
+    the whole window fits in a couple of kilobytes and a search is a linear
+    scan. Slot times are every time the shop opens on any weekday; a time
+    the shop is closed on a given day (weekday hours, holidays) stays at 0.
+    The counters are loaded from the shop's slot counter items once,
+    adjusted as bookings happen, and fully reloaded in the background every
+    ``refresh_interval`` seconds to pick up other workers' bookings. When
+    the date changes the counters are shifted by the days that passed, so
+    lookups stay on the right day while the reload runs in the background.
+    """
+
+    def __init__(self, rules, refresh_interval=60, load_bookings=get_slot_bookings):
+        self.rules = rules
+        self.shop_id = rules.shop_id
+        self.capacity = rules.service_bays
+        self.times = tuple(sorted(rules.all_times))
+        self.days = rules.max_days_ahead + 1
+        self.refresh_interval = refresh_interval
+        self._load_bookings = load_bookings
+        self._time_index = {t: i for i, t in enumerate(self.times)}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._free = None
+        self._start = None
+        self._loaded_at = 0
+        self._reloading = False
+
+    def _grid(self, start, days=None):
+        """Every (day, time) cell in order, with whether the shop is open then."""
+        for d in range(self.days if days is None else days):
+            day = start + timedelta(days=d)
+            for t in self.times:
+                yield day, t, self.rules.is_open(day, t)
+
+    def load(self):
+        """Rebuild the counters from the store."""
+        start = date.today()
+        grid = list(self._grid(start))
+        bookings = self._load_bookings([(day.isoformat(), t) for day, t, is_open in grid if is_open], self.shop_id)
+        free = array('h', (max(0, self.capacity - bookings[(day.isoformat(), t)]) if is_open else 0
+                           for day, t, is_open in grid))
+        with self._lock:
+            self._free, self._start = free, start
+            self._loaded_at = time.monotonic()
+
+    def warm(self):
+        """Load the counters unless they are loaded; concurrent callers share one scan."""
+        with self._load_lock:
+            if self._free is None:
+                self.load()
+
+    def reload_in_background(self):
+        """Start a full reload unless one is running; the current counters are served meanwhile."""
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+
+        def reload():
+            try:
+                with self._load_lock:
+                    self.load()
+            except Exception as e:
+                print(f"Error reloading availability for {self.shop_id}: {str(e)}")
+            finally:
+                self._reloading = False
+
+        threading.Thread(target=reload, name='availability-reload', daemon=True).start()
+
+    def _roll_forward(self, today):
+        """Drop the days before ``today`` and open the new days at the end; call with _lock held.
+
+        The new days start at full capacity until the background reload
+        reads their counters.
+        """
+        passed = (today - self._start).days
+        if passed <= 0:
+            return False
+        per_day = len(self.times)
+        kept = self._free[min(passed, self.days) * per_day:]
+        new_start = today + timedelta(days=len(kept) // per_day)
+        added = array('h', (self.capacity if is_open else 0
+                            for _, _, is_open in self._grid(new_start, self.days - len(kept) // per_day)))
+        self._free, self._start = kept + added, today
+        return True
+
+    def _ensure_loaded(self):
+        if self._free is None:
+            self.warm()
+            return
+
+        with self._lock:
+            rolled = self._roll_forward(date.today())
+        if rolled or time.monotonic() - self._loaded_at >= self.refresh_interval:
+            self.reload_in_background()
+
+    def _offset(self, date_str, time_str):
+        """Counter index of an open slot, or None if it is outside the window or closed."""
+        day = date.fromisoformat(date_str)
+        days = (day - self._start).days
+        slot = self._time_index.get(time_str)
+        if slot is None or not 0 <= days < self.days or not self.rules.is_open(day, time_str):
+            return None
+        return days * len(self.times) + slot
+
+    def adjust(self, date_str, time_str, delta):
+        """Apply a booking (-1) or a released place (+1) to one slot."""
+        with self._lock:
+            if self._free is None:
+                return
+            self._roll_forward(date.today())
+            offset = self._offset(date_str, time_str)
+            if offset is not None:
+                self._free[offset] = max(0, min(self.capacity, self._free[offset] + delta))
+
+    def set_free(self, date_str, time_str, free):
+        with self._lock:
+            if self._free is None:
+                return
+            self._roll_forward(date.today())
+            offset = self._offset(date_str, time_str)
+            if offset is not None:
+                self._free[offset] = max(0, min(self.capacity, free))
+
+    def refresh_slot(self, date_str, time_str):
+        """Re-read one slot's counter, e.g. after a status change."""
+        if self._free is None:
+            return
+        booked = self._load_bookings([(date_str, time_str)], self.shop_id)[(date_str, time_str)]
+        self.set_free(date_str, time_str, self.capacity - booked)
+
+    def find_open(self, from_date, days, limit):
+        """Return up to ``limit`` open slots in [from_date, from_date + days).
+
+        Slots starting sooner than the shop's lead time are skipped.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            free, start = self._free, self._start
+
+        first_day = max(0, (from_date - start).days)
+        last_day = min(self.days, (from_date - start).days + days)
+        per_day = len(self.times)
+        earliest = datetime.now() + self.rules.lead_time if self.rules.lead_time else None
+
+        open_slots = []
+        for offset in range(first_day * per_day, last_day * per_day):
+            if free[offset] > 0:
+                day, slot = divmod(offset, per_day)
+                day = start + timedelta(days=day)
+                if earliest and datetime.combine(day, datetime.strptime(self.times[slot], '%H:%M').time()) < earliest:
+                    continue
+                open_slots.append({
+                    'date': day.isoformat(),
+                    'time': self.times[slot],
+                    'available': free[offset]
+                })
+                if len(open_slots) >= limit:
+                    break
+        return open_slots
+
+
+class ShopAvailability:
+    """One AvailabilityIndex per shop, built lazily from the shop's current rules.
+
+    When the rule book reloads, a shop's index is rebuilt on its next use,
+    so changed hours, holidays or service bays show up without a restart.
+    Calls for shops the rule book does not know are ignored.
+    """
+
+    def __init__(self, rule_book, refresh_interval=60, load_bookings=get_slot_bookings):
+        self.rule_book = rule_book
+        self.refresh_interval = refresh_interval
+        self._load_bookings = load_bookings
+        self._lock = threading.Lock()
+        self._indexes = {}
+
+    def index(self, shop_id=DEFAULT_SHOP):
+        """The shop's index, or None for an unknown shop."""
+        rules = self.rule_book.get(shop_id)
+        if rules is None:
+            return None
+        with self._lock:
+            index = self._indexes.get(shop_id)
+            if index is None or index.rules is not rules:
+                index = self._indexes[shop_id] = AvailabilityIndex(
+                    rules, self.refresh_interval, self._load_bookings
+                )
+            return index
+
+    def warm(self, shop_ids):
+        """Load the shops' counters ahead of their first search; run it off the request path."""
+        for shop_id in shop_ids:
+            index = self.index(shop_id)
+            try:
+                if index is not None:
+                    index.warm()
+            except Exception as e:
+                print(f"Error loading availability for {shop_id}: {str(e)}")
+
+    def adjust(self, shop_id, date_str, time_str, delta):
+        index = self.index(shop_id)
+        if index is not None:
+            index.adjust(date_str, time_str, delta)
+
+    def set_free(self, shop_id, date_str, time_str, free):
+        index = self.index(shop_id)
+        if index is not None:
+            index.set_free(date_str, time_str, free)
+
+    def refresh_slot(self, shop_id, date_str, time_str):
+        index = self.index(shop_id)
+        if index is not None:
+            index.refresh_slot(date_str, time_str)
@@ -0,0 +1,181 @@
+"""Upload a directory of images (e.g. a shop's photo dump) to S3 in parallel.
+
+    python -m aws.bulk_upload photos/ --bucket autocare-images1-... --prefix shop-42/
+
+Files whose object already exists with the same content are skipped: the
+object's ``sha256`` metadata is compared with the local file, falling back to
+the ETag, which is the MD5 for single-part uploads. Finished keys are appended
+to a progress file so an interrupted run picks up where it stopped.
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+
+from aws.clients import get_client
+from aws.s3_utils import upload_car_image
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic')
+DEFAULT_WORKERS = 8
+MULTIPART_THRESHOLD = 16 * 1024 * 1024
+MULTIPART_CHUNKSIZE = 16 * 1024 * 1024
+# Part uploads per file; workers * this should stay under the client's
+# connection pool (aws.clients.MAX_POOL_CONNECTIONS)
+MULTIPART_CONCURRENCY = 4
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def transfer_config(threshold=MULTIPART_THRESHOLD, chunksize=MULTIPART_CHUNKSIZE,
+                    concurrency=MULTIPART_CONCURRENCY):
+    return TransferConfig(
+        multipart_threshold=threshold,
+        multipart_chunksize=chunksize,
+        max_concurrency=concurrency,
+        use_threads=concurrency > 1
+    )
+
+
+def find_images(directory, extensions=IMAGE_EXTENSIONS):
+    """Yield (path, key) for every image below ``directory``; keys use '/'."""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(extensions):
+                path = os.path.join(root, name)
+                yield path, os.path.relpath(path, directory).replace(os.sep, '/')
+
+
+def file_digests(path):
+    """Return the hex MD5 and SHA-256 of a file, read once."""
+    md5, sha256 = hashlib.md5(), hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            md5.update(block)
+            sha256.update(block)
+    return md5.hexdigest(), sha256.hexdigest()
+
+
+def object_matches(s3_client, bucket_name, key, md5, sha256):
+    """True if ``key`` already holds this content."""
+    try:
+        head = s3_client.head_object(Bucket=bucket_name, Key=key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
+    if 'sha256' in head.get('Metadata', {}):
+        return head['Metadata']['sha256'] == sha256
+    # Multipart ETags ("<md5 of md5s>-<parts>") are not a content MD5
+    etag = head.get('ETag', '').strip('"')
+    return '-' not in etag and etag == md5
+
+
+class UploadProgress:
+    """Keys already uploaded by this job, one JSON line each."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self.done[record['key']] = record['sha256']
+                    except (ValueError, KeyError):
+                        continue  # Partial line from an interrupted run
+
+    def record(self, key, sha256):
+        with self._lock:
+            self.done[key] = sha256
+            if self.path:
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps({'key': key, 'sha256': sha256}) + '\n')
+
+
+def bulk_upload(directory, bucket_name, prefix='', workers=DEFAULT_WORKERS, config=None,
+                progress_path=None, region=None):
+    """Upload every image below ``directory``; return a summary dict."""
+    s3_client = get_client('s3', region)
+    config = config or transfer_config()
+    progress = UploadProgress(progress_path)
+    stats = {'uploaded': 0, 'skipped': 0, 'failed': 0, 'bytes': 0}
+    stats_lock = threading.Lock()
+
+    def count(outcome, size=0):
+        with stats_lock:
+            stats[outcome] += 1
+            stats['bytes'] += size
+
+    def upload_one(path, key):
+        md5, sha256 = file_digests(path)
+        if progress.done.get(key) == sha256:
+            count('skipped')
+            return
+        if object_matches(s3_client, bucket_name, key, md5, sha256):
+            progress.record(key, sha256)
+            count('skipped')
+            return
+
+        url = upload_car_image(s3_client, bucket_name, key, path,
+                               transfer_config=config, metadata={'sha256': sha256})
+        if not url:
+            count('failed')
+            return
+        progress.record(key, sha256)
+        count('uploaded', os.path.getsize(path))
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(upload_one, path, prefix + key): key
+                   for path, key in find_images(directory)}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Error uploading {futures[future]}: {str(e)}")
+                count('failed')
+
+    elapsed = time.monotonic() - started
+    stats['seconds'] = round(elapsed, 2)
+    stats['filesPerSecond'] = round(stats['uploaded'] / elapsed, 2) if elapsed else 0
+    stats['megabytesPerSecond'] = round(stats['bytes'] / elapsed / 1e6, 2) if elapsed else 0
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk upload images to S3")
+    parser.add_argument('directory')
+    parser.add_argument('--bucket', required=True)
+    parser.add_argument('--prefix', default='')
+    parser.add_argument('--region', default=None)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--multipart-threshold-mb', type=int, default=MULTIPART_THRESHOLD // (1024 * 1024))
+    parser.add_argument('--multipart-chunksize-mb', type=int, default=MULTIPART_CHUNKSIZE // (1024 * 1024))
+    parser.add_argument('--multipart-concurrency', type=int, default=MULTIPART_CONCURRENCY)
+    parser.add_argument('--progress-file', default='bulk_upload_progress.jsonl',
+                        help="Resume log; pass '' to disable")
+    args = parser.parse_args()
+
+    summary = bulk_upload(
+        args.directory,
+        args.bucket,
+        prefix=args.prefix,
+        workers=args.workers,
+        config=transfer_config(
+            args.multipart_threshold_mb * 1024 * 1024,
+            args.multipart_chunksize_mb * 1024 * 1024,
+            args.multipart_concurrency
+        ),
+        progress_path=args.progress_file or None,
+        region=args.region
+    )
+    print(json.dumps(summary, indent=2))
@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class AppointmentCache:
+    """Interface for per-user caches of appointment queries.
+
+    Entries are grouped by user so one write can drop everything cached for
+    that user. A shared backend (e.g. Redis) only needs these methods.
+    """
+
+    def get(self, user_email, key):
+        """Return the cached value, or None on a miss."""
+        raise NotImplementedError
+
+    def generation(self, user_email):
+        """Return a token that changes whenever the user's entries are invalidated.
+
+        Read it before loading a value and pass it to ``set``, so a result
+        read before a concurrent write is not stored after that write's
+        invalidation.
+        """
+        return None
+
+    def set(self, user_email, key, value, generation=None):
+        raise NotImplementedError
+
+    def invalidate(self, user_email):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+
+class NullCache(AppointmentCache):
+    """Cache that never stores anything; used to switch caching off."""
+
+    def get(self, user_email, key):
+        return None
+
+    def set(self, user_email, key, value, generation=None):
+        pass
+
+    def invalidate(self, user_email):
+        pass
+
+
+class LRUTTLCache(AppointmentCache):
+    """In-process cache holding up to ``max_users`` users for ``ttl`` seconds.
+
+    A user's entries expire together ``ttl`` seconds after the first one was
+    stored, and the least recently used user is evicted when full.
+    Invalidation only reaches this process, so ``ttl`` bounds how stale
+    another worker's copy can get.
+
+    Every invalidation gets a number from a process-wide sequence; the
+    last ``max_users`` users' numbers are remembered, and forgotten ones
+    are covered by ``_generation_floor``, so a forgotten user can only
+    cause a skipped store, never a stale one.
+    """
+
+    def __init__(self, max_users=10000, ttl=15):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+        self._generations = OrderedDict()
+        self._generation_floor = 0
+        self._sequence = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_sets = 0
+
+    def get(self, user_email, key):
+        with self._lock:
+            entry = self._users.get(user_email)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._users[user_email]
+                self.expirations += 1
+                entry = None
+
+            if entry is None or key not in entry[1]:
+                self.misses += 1
+                return None
+
+            self._users.move_to_end(user_email)
+            self.hits += 1
+            return entry[1][key]
+
+    def generation(self, user_email):
+        with self._lock:
+            return self._generations.get(user_email, self._generation_floor)
+
+    def set(self, user_email, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generations.get(user_email, self._generation_floor):
+                # Invalidated while the value was being loaded
+                self.stale_sets += 1
+                return
+            entry = self._users.get(user_email)
+            if entry is None or entry[0] <= time.monotonic():
+                entry = (time.monotonic() + self.ttl, {})
+                self._users[user_email] = entry
+            entry[1][key] = value
+            self._users.move_to_end(user_email)
+
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_email):
+        with self._lock:
+            self._sequence += 1
+            self._generations[user_email] = self._sequence
+            self._generations.move_to_end(user_email)
+            while len(self._generations) > self.max_users:
+                _, forgotten = self._generations.popitem(last=False)
+                self._generation_floor = max(self._generation_floor, forgotten)
+
+            if self._users.pop(user_email, None) is not None:
+                self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'users': len(self._users),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'staleSets': self.stale_sets,
+            }
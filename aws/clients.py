@@ -0,0 +1,114 @@
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+# Connection settings shared by every client; override with environment variables
+DEFAULT_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', 50))
+CONNECT_TIMEOUT = float(os.environ.get('AWS_CONNECT_TIMEOUT', 3))
+READ_TIMEOUT = float(os.environ.get('AWS_READ_TIMEOUT', 10))
+RETRY_MODE = os.environ.get('AWS_RETRY_MODE', 'standard')
+MAX_ATTEMPTS = int(os.environ.get('AWS_MAX_ATTEMPTS', 3))
+
+_lock = threading.Lock()
+_session = None
+_config = None
+_clients = {}
+# (event name, handler) pairs registered on every session; see register_event_handler()
+_event_handlers = []
+
+
+def configure(max_pool_connections=None, connect_timeout=None, read_timeout=None,
+              retry_mode=None, max_attempts=None, session=None):
+    """Change the settings used for new clients and drop the cached ones."""
+    global MAX_POOL_CONNECTIONS, CONNECT_TIMEOUT, READ_TIMEOUT, RETRY_MODE, MAX_ATTEMPTS, _session
+    with _lock:
+        if max_pool_connections is not None:
+            MAX_POOL_CONNECTIONS = max_pool_connections
+        if connect_timeout is not None:
+            CONNECT_TIMEOUT = connect_timeout
+        if read_timeout is not None:
+            READ_TIMEOUT = read_timeout
+        if retry_mode is not None:
+            RETRY_MODE = retry_mode
+        if max_attempts is not None:
+            MAX_ATTEMPTS = max_attempts
+        if session is not None:
+            _session = session
+            _register_handlers(session)
+        _reset_locked()
+
+
+def reset():
+    """Drop every cached client, e.g. after a fork or in tests."""
+    global _session
+    with _lock:
+        _session = None
+        _reset_locked()
+
+
+def register_event_handler(event_name, handler):
+    """Register a botocore event handler for every client.
+
+    Clients copy the session's handlers when they are built, so the cached
+    ones are dropped and rebuilt with the handler on next use.
+    """
+    with _lock:
+        _event_handlers.append((event_name, handler))
+        if _session is not None:
+            _session.events.register(event_name, handler)
+        _reset_locked()
+
+
+def _register_handlers(session):
+    for event_name, handler in _event_handlers:
+        session.events.register(event_name, handler)
+
+
+def _reset_locked():
+    global _config
+    _config = None
+    _clients.clear()
+
+
+def get_config():
+    global _config
+    if _config is None:
+        _config = Config(
+            max_pool_connections=MAX_POOL_CONNECTIONS,
+            connect_timeout=CONNECT_TIMEOUT,
+            read_timeout=READ_TIMEOUT,
+            retries={'mode': RETRY_MODE, 'max_attempts': MAX_ATTEMPTS},
+        )
+    return _config
+
+
+def get_session():
+    global _session
+    if _session is None:
+        _session = boto3.session.Session()
+        _register_handlers(_session)
+    return _session
+
+
+def get_client(service, region=None):
+    """Return the shared client for (service, region), creating it on first use.
+
+    Clients are thread safe, so one instance (and its connection pool) is
+    reused by every thread in the process.
+    """
+    key = (service, region or DEFAULT_REGION)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            # Sessions are not thread safe, so clients are only built under the lock
+            client = get_session().client(service, region_name=key[1], config=get_config())
+            _clients[key] = client
+        return client
+
@@ -1,7 +1,4 @@
-import boto3
-
-# Initialize a Cognito client
-cognito_client = boto3.client('cognito-idp', region_name='us-east-1')
+from aws.clients import get_client
 
 # Global variables to store IDs
 USER_POOL_ID = None
@@ -10,13 +7,15 @@ CLIENT_ID = None
 def create_user_pool(pool_name):
     global USER_POOL_ID  # Add global declaration
     try:
+        cognito_client = get_client('cognito-idp')
         # List existing user pools
-        response = cognito_client.list_user_pools(MaxResults=60)
-        for pool in response['UserPools']:
-            if pool['Name'] == pool_name:
-                print(f"User pool {pool_name} already exists")
-                USER_POOL_ID = pool['Id']  # Store in global variable
-                return pool['Id']
+        paginator = cognito_client.get_paginator('list_user_pools')
+        for page in paginator.paginate(MaxResults=60):
+            for pool in page['UserPools']:
+                if pool['Name'] == pool_name:
+                    print(f"User pool {pool_name} already exists")
+                    USER_POOL_ID = pool['Id']  # Store in global variable
+                    return pool['Id']
 
         # Create new pool if it doesn't exist
         response = cognito_client.create_user_pool(
@@ -42,17 +41,15 @@ def create_user_pool(pool_name):
 def create_app_client(user_pool_id):
     global CLIENT_ID  # Add global declaration
     try:
+        cognito_client = get_client('cognito-idp')
         # List existing clients
-        response = cognito_client.list_user_pool_clients(
-            UserPoolId=user_pool_id,
-            MaxResults=60
-        )
-        
-        for client in response['UserPoolClients']:
-            if client['ClientName'] == 'car-app-client':
-                print("App client already exists")
-                CLIENT_ID = client['ClientId']  # Store in global variable
-                return CLIENT_ID
+        paginator = cognito_client.get_paginator('list_user_pool_clients')
+        for page in paginator.paginate(UserPoolId=user_pool_id, MaxResults=60):
+            for client in page['UserPoolClients']:
+                if client['ClientName'] == 'car-app-client':
+                    print("App client already exists")
+                    CLIENT_ID = client['ClientId']  # Store in global variable
+                    return CLIENT_ID
 
         # Create new client if it doesn't exist
         response = cognito_client.create_user_pool_client(
@@ -76,11 +73,11 @@ def get_user_pool_id():
 def get_client_id():
     return CLIENT_ID
 
-# Initialize the values when the module is imported
-pool_id = create_user_pool('CarServiceUserPool')
-if pool_id:  # Check if pool_id is valid
-    app_client_id = create_app_client(pool_id)
-    print("User Pool ID:", USER_POOL_ID)
-    print("App Client ID:", CLIENT_ID)
-else:
-    print("Failed to create user pool, app client will not be created.")
+if __name__ == "__main__":
+    pool_id = create_user_pool('CarServiceUserPool')
+    if pool_id:  # Check if pool_id is valid
+        app_client_id = create_app_client(pool_id)
+        print("User Pool ID:", USER_POOL_ID)
+        print("App Client ID:", CLIENT_ID)
+    else:
+        print("Failed to create user pool, app client will not be created.")
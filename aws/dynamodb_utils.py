@@ -1,42 +1,116 @@
-import boto3
+import os
+import random
 import time
+from datetime import datetime, timedelta
 
-dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+from autocare_utils.rules import DEFAULT_SERVICE_BAYS, DEFAULT_SHOP
+from aws.cache import LRUTTLCache
+from aws.clients import get_client
+
+APPOINTMENTS_TABLE = 'Appointments'
+USER_SLOT_INDEX = 'UserEmailSlotIndex'
+USER_UPDATED_INDEX = 'UserEmailUpdatedIndex'
+CANCELLED_STATUS = 'Cancelled'
+
+# updatedAt is stamped before the write commits and the index is eventually
+# consistent, so delta queries reach this far back before the sync token
+SYNC_OVERLAP = timedelta(seconds=int(os.environ.get('SYNC_OVERLAP_SECONDS', 60)))
+
+# Read-through cache for per-user index queries; see set_appointment_cache()
+_appointment_cache = LRUTTLCache(
+    max_users=int(os.environ.get('APPOINTMENT_CACHE_USERS', 10000)),
+    ttl=float(os.environ.get('APPOINTMENT_CACHE_TTL', 15))
+)
+
+# Items are converted by hand so every call goes through the shared client
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+def _dynamodb():
+    return get_client('dynamodb')
+
+def _attributes(values):
+    """Plain values to DynamoDB attribute values, for Item, Key and expression values."""
+    return {name: _serializer.serialize(value) for name, value in values.items()}
+
+def _item(attributes):
+    """DynamoDB attribute values to plain values; numbers come back as Decimal."""
+    return {name: _deserializer.deserialize(value) for name, value in attributes.items()}
+
+def get_appointment_cache():
+    return _appointment_cache
+
+def set_appointment_cache(cache):
+    """Swap the cache backend, e.g. for a shared one or NullCache to disable it."""
+    global _appointment_cache
+    _appointment_cache = cache
+
+def invalidate_user_appointments(user_email):
+    if user_email:
+        _appointment_cache.invalidate(user_email)
+
+def _start_key_token(start_key):
+    return tuple(sorted(start_key.items())) if start_key else None
+
+def slot_key(date, time):
+    """Composite GSI sort key; ISO dates and HH:MM times sort correctly as strings."""
+    return f"{date}#{time}"
+
+def timestamp():
+    """Current UTC time in the ISO format used for createdAt/updatedAt."""
+    return datetime.utcnow().isoformat()
+
+def _gsi(name, hash_key, range_key):
+    return {
+        'IndexName': name,
+        'KeySchema': [
+            {'AttributeName': hash_key, 'KeyType': 'HASH'},
+            {'AttributeName': range_key, 'KeyType': 'RANGE'}
+        ],
+        'Projection': {
+            'ProjectionType': 'ALL'
+        },
+        'ProvisionedThroughput': {
+            'ReadCapacityUnits': 5,
+            'WriteCapacityUnits': 5
+        }
+    }
+
+# Every GSI the app queries, with the attribute definitions their keys need
+GLOBAL_SECONDARY_INDEXES = [
+    _gsi(USER_SLOT_INDEX, 'userEmail', 'slotKey'),
+    _gsi(USER_UPDATED_INDEX, 'userEmail', 'updatedAt'),
+]
+INDEX_ATTRIBUTE_DEFINITIONS = [
+    {'AttributeName': 'userEmail', 'AttributeType': 'S'},
+    {'AttributeName': 'slotKey', 'AttributeType': 'S'},
+    {'AttributeName': 'updatedAt', 'AttributeType': 'S'}
+]
 
 def create_appointments_table():
     try:
-        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+        client = _dynamodb()
         
         # Check if table exists
-        existing_tables = dynamodb.tables.all()
-        if any(table.name == 'Appointments' for table in existing_tables):
-            return dynamodb.Table('Appointments')
+        try:
+            client.describe_table(TableName=APPOINTMENTS_TABLE)
+            ensure_indexes()
+            return APPOINTMENTS_TABLE
+        except client.exceptions.ResourceNotFoundException:
+            pass
 
-        # Create table with GSI
-        table = dynamodb.create_table(
-            TableName='Appointments',
+        # Create table with GSIs
+        client.create_table(
+            TableName=APPOINTMENTS_TABLE,
             KeySchema=[
                 {'AttributeName': 'appointment_id', 'KeyType': 'HASH'}
             ],
             AttributeDefinitions=[
-                {'AttributeName': 'appointment_id', 'AttributeType': 'S'},
-                {'AttributeName': 'userEmail', 'AttributeType': 'S'}
-            ],
-            GlobalSecondaryIndexes=[
-                {
-                    'IndexName': 'UserEmailIndex',
-                    'KeySchema': [
-                        {'AttributeName': 'userEmail', 'KeyType': 'HASH'}
-                    ],
-                    'Projection': {
-                        'ProjectionType': 'ALL'
-                    },
-                    'ProvisionedThroughput': {
-                        'ReadCapacityUnits': 5,
-                        'WriteCapacityUnits': 5
-                    }
-                }
-            ],
+                {'AttributeName': 'appointment_id', 'AttributeType': 'S'}
+            ] + INDEX_ATTRIBUTE_DEFINITIONS,
+            GlobalSecondaryIndexes=GLOBAL_SECONDARY_INDEXES,
             BillingMode='PROVISIONED',
             ProvisionedThroughput={
                 'ReadCapacityUnits': 5,
@@ -45,55 +119,585 @@ def create_appointments_table():
         )
         
         # Wait for the table to be created
-        table.meta.client.get_waiter('table_exists').wait(TableName='Appointments')
+        client.get_waiter('table_exists').wait(TableName=APPOINTMENTS_TABLE)
         print("Appointments table created successfully with GSI")
-        return table
+        return APPOINTMENTS_TABLE
         
     except Exception as e:
         print(f"Error creating appointments table: {str(e)}")
         raise e
 
-def put_appointment(appointment_id, appointment_data):
+def ensure_indexes(poll_interval=5):
+    """Add any GSI in GLOBAL_SECONDARY_INDEXES that an existing table is missing.
+
+    DynamoDB only allows one index to be created per update_table call, so
+    they are added one at a time. Existing items are backfilled afterwards.
+    """
+    client = _dynamodb()
+    description = client.describe_table(TableName=APPOINTMENTS_TABLE)['Table']
+    existing = {index['IndexName'] for index in description.get('GlobalSecondaryIndexes', [])}
+
+    added = False
+    for index in GLOBAL_SECONDARY_INDEXES:
+        if index['IndexName'] in existing:
+            continue
+
+        print(f"Adding index {index['IndexName']} to {APPOINTMENTS_TABLE}")
+        client.update_table(
+            TableName=APPOINTMENTS_TABLE,
+            AttributeDefinitions=INDEX_ATTRIBUTE_DEFINITIONS,
+            GlobalSecondaryIndexUpdates=[{'Create': index}]
+        )
+        while True:
+            description = client.describe_table(TableName=APPOINTMENTS_TABLE)['Table']
+            statuses = [i.get('IndexStatus') for i in description.get('GlobalSecondaryIndexes', [])]
+            if all(status == 'ACTIVE' for status in statuses):
+                break
+            time.sleep(poll_interval)
+        added = True
+
+    if added:
+        backfill_index_keys()
+
+def backfill_index_keys():
+    """Write index key attributes onto appointments stored before they existed."""
+    client = _dynamodb()
+    scan_kwargs = {
+        'TableName': APPOINTMENTS_TABLE,
+        'FilterExpression': 'attribute_exists(userEmail) AND '
+                            '(attribute_not_exists(slotKey) OR attribute_not_exists(updatedAt))',
+        'ProjectionExpression': 'appointment_id, #date, #time, createdAt',
+        'ExpressionAttributeNames': {'#date': 'date', '#time': 'time'}
+    }
+    count = 0
+    while True:
+        response = client.scan(**scan_kwargs)
+        for item in map(_item, response.get('Items', [])):
+            client.update_item(
+                TableName=APPOINTMENTS_TABLE,
+                Key=_attributes({'appointment_id': item['appointment_id']}),
+                UpdateExpression='SET slotKey = :slot, updatedAt = if_not_exists(updatedAt, :updated)',
+                ExpressionAttributeValues=_attributes({
+                    ':slot': slot_key(item['date'], item['time']),
+                    ':updated': item.get('createdAt') or timestamp()
+                })
+            )
+            count += 1
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    print(f"Backfilled index keys on {count} appointments")
+
+class SlotFullError(Exception):
+    """Raised when a booking would exceed the capacity of its time slot."""
+
+def slot_counter_key(date, time, shop_id=DEFAULT_SHOP):
+    """Key of the item counting bookings in one shop's slot; it shares the table.
+
+    The default shop keeps the key it had before shops had their own
+    counters, so its existing bookings still count.
+    """
+    if shop_id == DEFAULT_SHOP:
+        return {'appointment_id': f"slot#{date}#{time}"}
+    return {'appointment_id': f"slot#{shop_id}#{date}#{time}"}
+
+def _slot_increment(date, time, capacity, shop_id=DEFAULT_SHOP):
+    return {
+        'Update': {
+            'TableName': APPOINTMENTS_TABLE,
+            'Key': _attributes(slot_counter_key(date, time, shop_id)),
+            'UpdateExpression': 'SET booked = if_not_exists(booked, :zero) + :one, slotCapacity = :capacity',
+            'ConditionExpression': 'attribute_not_exists(booked) OR booked < :capacity',
+            'ExpressionAttributeValues': _attributes({':zero': 0, ':one': 1, ':capacity': capacity})
+        }
+    }
+
+def _slot_decrement(date, time, shop_id=DEFAULT_SHOP):
+    return {
+        'Update': {
+            'TableName': APPOINTMENTS_TABLE,
+            'Key': _attributes(slot_counter_key(date, time, shop_id)),
+            'UpdateExpression': 'SET booked = booked - :one',
+            'ConditionExpression': 'booked > :zero',
+            'ExpressionAttributeValues': _attributes({':zero': 0, ':one': 1})
+        }
+    }
+
+def _is_condition_failure(error, index):
+    reasons = error.response.get('CancellationReasons', [])
+    return len(reasons) > index and reasons[index].get('Code') == 'ConditionalCheckFailed'
+
+def image_reference_key(sha256):
+    """Key of the item counting appointments that use one stored image."""
+    return {'appointment_id': f"image#{sha256}"}
+
+def _image_reference_add(sha256, count=1):
+    return {
+        'Update': {
+            'TableName': APPOINTMENTS_TABLE,
+            'Key': _attributes(image_reference_key(sha256)),
+            'UpdateExpression': 'ADD refCount :count SET updatedAt = :updated',
+            'ExpressionAttributeValues': _attributes({':count': count, ':updated': timestamp()})
+        }
+    }
+
+def put_appointment(appointment_id, appointment_data, capacity=None, image_hash=None):
+    """Store an appointment and take one place in its shop's slot in one transaction.
+
+    Raises SlotFullError if the slot already holds ``capacity`` bookings
+    (default DEFAULT_SERVICE_BAYS). ``image_hash`` names a content-addressed image
+    whose reference count is raised in the same transaction.
+    """
     try:
-        # Ensure appointment_id is in the data
+        # Ensure appointment_id and the index sort key are in the data
         appointment_data['appointment_id'] = appointment_id
+        appointment_data['slotKey'] = slot_key(appointment_data['date'], appointment_data['time'])
+        appointment_data['updatedAt'] = timestamp()
         
-        table = dynamodb.Table('Appointments')
-        table.put_item(Item=appointment_data)
+        transact_items = [
+            _slot_increment(appointment_data['date'], appointment_data['time'], capacity or DEFAULT_SERVICE_BAYS,
+                            appointment_data.get('shopId', DEFAULT_SHOP)),
+            {
+                'Put': {
+                    'TableName': APPOINTMENTS_TABLE,
+                    'Item': _attributes(appointment_data),
+                    'ConditionExpression': 'attribute_not_exists(appointment_id)'
+                }
+            }
+        ]
+        if image_hash:
+            transact_items.append(_image_reference_add(image_hash))
+
+        client = _dynamodb()
+        try:
+            client.transact_write_items(TransactItems=transact_items)
+        except client.exceptions.TransactionCanceledException as e:
+            if _is_condition_failure(e, 0):
+                raise SlotFullError(
+                    f"No capacity left on {appointment_data['date']} at {appointment_data['time']}"
+                )
+            raise
+
+        invalidate_user_appointments(appointment_data.get('userEmail'))
         print(f"Appointment {appointment_id} added successfully.")
     except Exception as e:
         print(f"Error putting appointment in DynamoDB: {str(e)}")
         raise e
 
-def update_appointment_status(appointment_id, new_status):
+def update_appointment_status(appointment_id, new_status, capacity_for=None):
+    """Set an appointment's status; returns ``(appointment, previous_status)``.
+
+    The appointment is None if it does not exist. Cancelling gives the slot's place back; moving a cancelled appointment
+    to any other status takes a place again and raises SlotFullError if
+    none is left. Both happen in the same transaction as the status change.
+    ``capacity_for(shop_id)`` gives the capacity of the appointment's shop
+    (default DEFAULT_SERVICE_BAYS).
+
+    A change that does not involve Cancelled, the common case, is a single
+    conditional UpdateItem that returns the old item; only moves into or
+    out of Cancelled read the item and run a transaction.
+    """
     try:
         print(f"Updating appointment {appointment_id} to status: {new_status}")  # Debug log
-        table = dynamodb.Table('Appointments')
-        
-        response = table.update_item(
-            Key={'appointment_id': appointment_id},
-            UpdateExpression='SET #status = :status',
-            ExpressionAttributeNames={'#status': 'status'},
-            ExpressionAttributeValues={':status': new_status},
-            ReturnValues='ALL_NEW'
-        )
-        
-        print(f"DynamoDB response: {response}")  # Debug log
-        
-        if 'Attributes' not in response:
-            print("No attributes returned from update")
-            return None
-            
-        return response['Attributes']
+        client = _dynamodb()
+        key = _attributes({'appointment_id': appointment_id})
+
+        if new_status != CANCELLED_STATUS:
+            updated_at = timestamp()
+            try:
+                response = client.update_item(
+                    TableName=APPOINTMENTS_TABLE,
+                    Key=key,
+                    UpdateExpression='SET #status = :status, updatedAt = :updated',
+                    # Slot and image counters share the table but have no userEmail
+                    ConditionExpression='attribute_exists(userEmail) AND #status <> :cancelled',
+                    ExpressionAttributeNames={'#status': 'status'},
+                    ExpressionAttributeValues=_attributes({
+                        ':status': new_status,
+                        ':updated': updated_at,
+                        ':cancelled': CANCELLED_STATUS
+                    }),
+                    ReturnValues='ALL_OLD'
+                )
+                previous = _item(response['Attributes'])
+                appointment = dict(previous, status=new_status, updatedAt=updated_at)
+                invalidate_user_appointments(appointment.get('userEmail'))
+                return appointment, previous.get('status')
+            except client.exceptions.ConditionalCheckFailedException:
+                pass  # Missing, or cancelled and so needing a place again: see below
+
+        current = client.get_item(TableName=APPOINTMENTS_TABLE, Key=key, ConsistentRead=True).get('Item')
+        current = _item(current) if current else None
+        if not current or 'userEmail' not in current:
+            print("No appointment found to update")
+            return None, None
+
+        old_status = current.get('status')
+        updated_at = timestamp()
+        releases = new_status == CANCELLED_STATUS and old_status != CANCELLED_STATUS
+        reclaims = old_status == CANCELLED_STATUS and new_status != CANCELLED_STATUS
+
+        if not (releases or reclaims):
+            try:
+                response = client.update_item(
+                    TableName=APPOINTMENTS_TABLE,
+                    Key=key,
+                    UpdateExpression='SET #status = :status, updatedAt = :updated',
+                    ConditionExpression='attribute_exists(appointment_id)',
+                    ExpressionAttributeNames={'#status': 'status'},
+                    ExpressionAttributeValues=_attributes({':status': new_status, ':updated': updated_at}),
+                    ReturnValues='ALL_NEW'
+                )
+            except client.exceptions.ConditionalCheckFailedException:
+                print("No appointment found to update")
+                return None, None
+
+            print(f"DynamoDB response: {response}")  # Debug log
+            appointment = _item(response['Attributes'])
+        else:
+            shop_id = current.get('shopId', DEFAULT_SHOP)
+            if releases:
+                slot_update = _slot_decrement(current['date'], current['time'], shop_id)
+            else:
+                capacity = capacity_for(shop_id) if capacity_for else None
+                slot_update = _slot_increment(current['date'], current['time'],
+                                              capacity or DEFAULT_SERVICE_BAYS, shop_id)
+
+            try:
+                client.transact_write_items(TransactItems=[
+                    slot_update,
+                    {
+                        'Update': {
+                            'TableName': APPOINTMENTS_TABLE,
+                            'Key': key,
+                            'UpdateExpression': 'SET #status = :status, updatedAt = :updated',
+                            # Guard against a concurrent status change since the read
+                            'ConditionExpression': '#status = :old',
+                            'ExpressionAttributeNames': {'#status': 'status'},
+                            'ExpressionAttributeValues': _attributes({
+                                ':status': new_status,
+                                ':updated': updated_at,
+                                ':old': old_status
+                            })
+                        }
+                    }
+                ])
+            except client.exceptions.TransactionCanceledException as e:
+                if reclaims and _is_condition_failure(e, 0):
+                    raise SlotFullError(f"No capacity left on {current['date']} at {current['time']}")
+                if not (releases and _is_condition_failure(e, 0)):
+                    raise
+                # Booked before slot counters existed: nothing to give back
+                client.update_item(
+                    TableName=APPOINTMENTS_TABLE,
+                    Key=key,
+                    UpdateExpression='SET #status = :status, updatedAt = :updated',
+                    ConditionExpression='#status = :old',
+                    ExpressionAttributeNames={'#status': 'status'},
+                    ExpressionAttributeValues=_attributes({
+                        ':status': new_status,
+                        ':updated': updated_at,
+                        ':old': old_status
+                    })
+                )
+
+            appointment = dict(current, status=new_status, updatedAt=updated_at)
+
+        invalidate_user_appointments(appointment.get('userEmail'))
+        return appointment, old_status
     except Exception as e:
         print(f"Error updating appointment status: {str(e)}")
         raise e
 
+def reserve_slot_capacity(date, time, count, capacity=None, shop_id=DEFAULT_SHOP, max_attempts=5):
+    """Take up to ``count`` places in a slot; returns how many were taken.
+
+    Asks for all of them with one conditional update. If they do not fit,
+    the counter is read and whatever is still free is asked for instead,
+    so 4 bookings against 3 free places take 3 rather than none.
+    """
+    capacity = capacity or DEFAULT_SERVICE_BAYS
+    client = _dynamodb()
+    key = _attributes(slot_counter_key(date, time, shop_id))
+    wanted = min(count, capacity)
+    for _ in range(max_attempts):
+        if wanted <= 0:
+            return 0
+        try:
+            client.update_item(
+                TableName=APPOINTMENTS_TABLE,
+                Key=key,
+                UpdateExpression='SET booked = if_not_exists(booked, :zero) + :count, slotCapacity = :capacity',
+                ConditionExpression='attribute_not_exists(booked) OR booked <= :limit',
+                ExpressionAttributeValues=_attributes({
+                    ':zero': 0,
+                    ':count': wanted,
+                    ':capacity': capacity,
+                    ':limit': capacity - wanted
+                })
+            )
+            return wanted
+        except client.exceptions.ConditionalCheckFailedException:
+            # Someone else booked in between; retry with what is left now
+            current = client.get_item(TableName=APPOINTMENTS_TABLE, Key=key, ConsistentRead=True).get('Item')
+            booked = int(_item(current).get('booked', 0)) if current else 0
+            wanted = min(count, capacity - booked)
+    return 0
+
+def release_slot_capacity(date, time, count, shop_id=DEFAULT_SHOP):
+    """Give back places taken by reserve_slot_capacity()."""
+    client = _dynamodb()
+    try:
+        client.update_item(
+            TableName=APPOINTMENTS_TABLE,
+            Key=_attributes(slot_counter_key(date, time, shop_id)),
+            UpdateExpression='SET booked = booked - :count',
+            ConditionExpression='booked >= :count',
+            ExpressionAttributeValues=_attributes({':count': count})
+        )
+    except client.exceptions.ConditionalCheckFailedException:
+        print(f"Slot counter for {date} {time} is lower than the places being released")
+
+def put_appointments_batch(appointments, max_attempts=6, base_delay=0.05):
+    """Write many appointments with BatchWriteItem, 25 per call.
+
+    ``appointments`` must already contain ``appointment_id``. Items that
+    DynamoDB leaves unprocessed are retried with exponential backoff and
+    jitter. Returns ``(written_ids, failed_ids)``; nothing is raised, an
+    item that cannot be serialized or a call that errors only fails the
+    items it covers. Slot capacity is not checked here; reserve it first
+    with reserve_slot_capacity().
+    """
+    client = _dynamodb()
+    written, failed = [], []
+
+    for start in range(0, len(appointments), 25):
+        chunk = appointments[start:start + 25]
+        pending, unprocessed = [], set()
+        for appointment in chunk:
+            appointment['slotKey'] = slot_key(appointment['date'], appointment['time'])
+            appointment['updatedAt'] = timestamp()
+            try:
+                pending.append({'PutRequest': {'Item': _attributes(appointment)}})
+            except Exception as e:
+                print(f"Error serializing appointment {appointment['appointment_id']}: {str(e)}")
+                unprocessed.add(appointment['appointment_id'])
+
+        for attempt in range(max_attempts):
+            if not pending:
+                break
+            if attempt:
+                time.sleep(random.uniform(0, base_delay * 2 ** attempt))
+            try:
+                response = client.batch_write_item(RequestItems={APPOINTMENTS_TABLE: pending})
+            except client.exceptions.ProvisionedThroughputExceededException:
+                continue
+            except Exception as e:
+                # Whatever is still pending in this chunk is reported as failed
+                print(f"Error writing appointments batch: {str(e)}")
+                break
+            pending = response.get('UnprocessedItems', {}).get(APPOINTMENTS_TABLE, [])
+
+        unprocessed.update(request['PutRequest']['Item']['appointment_id']['S'] for request in pending)
+        for appointment in chunk:
+            if appointment['appointment_id'] in unprocessed:
+                failed.append(appointment['appointment_id'])
+            else:
+                written.append(appointment['appointment_id'])
+                invalidate_user_appointments(appointment.get('userEmail'))
+
+    print(f"Batch wrote {len(written)} appointments, {len(failed)} failed")
+    return written, failed
+
+def _batch_get(keys, projection):
+    """Yield the items stored under ``keys`` (plain dicts), 100 keys per BatchGetItem.
+
+    UnprocessedKeys are retried with exponential backoff; keys without an
+    item are skipped.
+    """
+    client = _dynamodb()
+    keys = list(keys)
+    for start in range(0, len(keys), 100):
+        request = {
+            APPOINTMENTS_TABLE: {
+                'Keys': [_attributes(key) for key in keys[start:start + 100]],
+                'ProjectionExpression': projection
+            }
+        }
+        delay = 0.05
+        while request:
+            response = client.batch_get_item(RequestItems=request)
+            yield from map(_item, response.get('Responses', {}).get(APPOINTMENTS_TABLE, []))
+            request = response.get('UnprocessedKeys')
+            if request:
+                time.sleep(delay)
+                delay = min(delay * 2, 1)
+
+def get_slot_bookings(slots, shop_id=DEFAULT_SHOP):
+    """Return {(date, time): booked} for one shop's slots; missing counters are 0."""
+    bookings = {slot: 0 for slot in slots}
+    slot_ids = {slot_counter_key(date, time, shop_id)['appointment_id']: (date, time) for date, time in bookings}
+    keys = [{'appointment_id': slot_id} for slot_id in slot_ids]
+    for item in _batch_get(keys, 'appointment_id, booked'):
+        bookings[slot_ids[item['appointment_id']]] = int(item.get('booked', 0))
+    return bookings
+
+def add_image_references(counts):
+    """Raise reference counts for content-addressed images, {sha256: count}."""
+    client = _dynamodb()
+    for sha256, count in counts.items():
+        client.update_item(**_image_reference_add(sha256, count)['Update'])
+
+def touch_image_reference(sha256):
+    """Mark an image as just handed out again, so image GC spares it for a grace period.
+
+    Creates the counter item, with no references, if the image has none yet.
+    """
+    _dynamodb().update_item(**_image_reference_add(sha256, 0)['Update'])
+
+def get_image_references(hashes):
+    """Return {sha256: (refCount, updatedAt)} for the hashes that have a counter item."""
+    references = {}
+    keys = [image_reference_key(sha256) for sha256 in hashes]
+    for item in _batch_get(keys, 'appointment_id, refCount, updatedAt'):
+        sha256 = item['appointment_id'].split('#', 1)[1]
+        references[sha256] = (int(item.get('refCount', 0)), item.get('updatedAt'))
+    return references
+
+def get_appointment(appointment_id):
+    item = _dynamodb().get_item(
+        TableName=APPOINTMENTS_TABLE, Key=_attributes({'appointment_id': appointment_id})
+    ).get('Item')
+    item = _item(item) if item else None
+    # Slot counters share the table but are not appointments
+    return item if item and 'userEmail' in item else None
+
+def set_image_variants(appointment_id, variants):
+    """Store resized image URLs ({name: url}) on an appointment; None if it is missing."""
+    client = _dynamodb()
+    try:
+        response = client.update_item(
+            TableName=APPOINTMENTS_TABLE,
+            Key=_attributes({'appointment_id': appointment_id}),
+            UpdateExpression='SET imageVariants = :variants, updatedAt = :updated',
+            ConditionExpression='attribute_exists(userEmail)',
+            ExpressionAttributeValues=_attributes({':variants': variants, ':updated': timestamp()}),
+            ReturnValues='ALL_NEW'
+        )
+    except client.exceptions.ConditionalCheckFailedException:
+        return None
+
+    appointment = _item(response['Attributes'])
+    invalidate_user_appointments(appointment['userEmail'])
+    return appointment
+
+def _query_page(query_kwargs, start_key):
+    """Run one Query page; returns ``(items, last_evaluated_key)`` as plain values."""
+    if start_key:
+        query_kwargs['ExclusiveStartKey'] = _attributes(start_key)
+    response = _dynamodb().query(**query_kwargs)
+    last_key = response.get('LastEvaluatedKey')
+    return [_item(item) for item in response.get('Items', [])], _item(last_key) if last_key else None
+
+def query_user_appointments(user_email, limit=50, start_key=None, date_from=None, date_to=None):
+    """Return one page of a user's appointments ordered by date and time.
+
+    ``date_from``/``date_to`` are inclusive ``YYYY-MM-DD`` bounds. Returns
+    ``(items, last_evaluated_key)``; the key is None on the last page.
+    """
+    cache_key = ('list', limit, _start_key_token(start_key), date_from, date_to)
+    cached = _appointment_cache.get(user_email, cache_key)
+    if cached is not None:
+        return cached
+    # Taken before the read, so a write landing meanwhile keeps this result out
+    generation = _appointment_cache.generation(user_email)
+
+    key_condition = 'userEmail = :user'
+    values = {':user': user_email}
+    if date_from and date_to:
+        key_condition += ' AND slotKey BETWEEN :from AND :to'
+        values.update({':from': date_from, ':to': f"{date_to}#~"})
+    elif date_from:
+        key_condition += ' AND slotKey >= :from'
+        values[':from'] = date_from
+    elif date_to:
+        key_condition += ' AND slotKey <= :to'
+        values[':to'] = f"{date_to}#~"
+
+    query_kwargs = {
+        'TableName': APPOINTMENTS_TABLE,
+        'IndexName': USER_SLOT_INDEX,
+        'KeyConditionExpression': key_condition,
+        'ExpressionAttributeValues': _attributes(values),
+        'Limit': limit
+    }
+    result = _query_page(query_kwargs, start_key)
+    _appointment_cache.set(user_email, cache_key, result, generation)
+    return result
+
+def _overlap_start(since):
+    """``since`` moved back by SYNC_OVERLAP; left as is if it is not an ISO timestamp."""
+    try:
+        return (datetime.fromisoformat(since) - SYNC_OVERLAP).isoformat()
+    except (TypeError, ValueError):
+        return since
+
+def query_user_changes(user_email, since, limit=50, start_key=None):
+    """Return one page of a user's appointments updated after ``since``.
+
+    The window starts SYNC_OVERLAP before ``since``: a write that commits
+    late with an older updatedAt, or that the index has not caught up
+    with, is still returned on the next poll. Rows changed shortly before
+    ``since`` therefore come back again; clients merge by appointment_id.
+    Rows are ordered by updatedAt. Returns ``(items, last_evaluated_key)``.
+    """
+    cache_key = ('changes', since, limit, _start_key_token(start_key))
+    cached = _appointment_cache.get(user_email, cache_key)
+    if cached is not None:
+        return cached
+    # Taken before the read, so a write landing meanwhile keeps this result out
+    generation = _appointment_cache.generation(user_email)
+
+    query_kwargs = {
+        'TableName': APPOINTMENTS_TABLE,
+        'IndexName': USER_UPDATED_INDEX,
+        'KeyConditionExpression': 'userEmail = :user AND updatedAt > :since',
+        'ExpressionAttributeValues': _attributes({':user': user_email, ':since': _overlap_start(since)}),
+        'Limit': limit
+    }
+    result = _query_page(query_kwargs, start_key)
+    _appointment_cache.set(user_email, cache_key, result, generation)
+    return result
+
+def latest_user_update(user_email):
+    """Return the newest updatedAt across a user's appointments, or None.
+
+    Reads a single index entry, so it is cheap enough to run on every poll.
+    """
+    cached = _appointment_cache.get(user_email, ('latest',))
+    if cached is not None:
+        return cached[0]
+    generation = _appointment_cache.generation(user_email)
+
+    response = _dynamodb().query(
+        TableName=APPOINTMENTS_TABLE,
+        IndexName=USER_UPDATED_INDEX,
+        KeyConditionExpression='userEmail = :user',
+        ExpressionAttributeValues=_attributes({':user': user_email}),
+        ProjectionExpression='updatedAt',
+        ScanIndexForward=False,
+        Limit=1
+    )
+    items = response.get('Items', [])
+    latest = _item(items[0])['updatedAt'] if items else None
+    _appointment_cache.set(user_email, ('latest',), (latest,), generation)
+    return latest
+
 if __name__ == "__main__":
     # Test the create_appointments_table function
     try:
-        table = create_appointments_table()
-        print("Table created or already exists:", table.table_status)
+        table_name = create_appointments_table()
+        print("Table created or already exists:", table_name)
         
         # Test adding an appointment
         appointment_data = {
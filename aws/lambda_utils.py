@@ -1,14 +1,37 @@
-import boto3
+import argparse
+import base64
+import hashlib
+import io
 import json
+import os
+import zipfile
 
-def create_lambda_function(function_name, role_arn, handler, zip_file_path, runtime="python3.9"):
+from botocore.exceptions import ClientError
+
+from aws.clients import get_client
+
+VALIDATOR_FUNCTION_NAME = 'autocare-validate-appointment'
+VALIDATOR_HANDLER = 'autocare_utils.lambda_handler.handler'
+VALIDATOR_RUNTIME = 'python3.12'
+# Packaged into the validator zip: the rules code plus the shop rules file
+VALIDATOR_PACKAGE = 'autocare_utils'
+VALIDATOR_EXTRA_FILES = ('shop_rules.json',)
+# Fixed zip metadata so identical sources give identical bytes
+ZIP_TIMESTAMP = (1980, 1, 1, 0, 0, 0)
+ZIP_FILE_MODE = 0o644 << 16
+
+def create_lambda_function(function_name, role_arn, handler, zip_file_path=None, runtime="python3.9",
+                           zipped_code=None):
     """
     Create a Lambda function programmatically.
+
+    The code comes from ``zip_file_path`` or, if given, the ``zipped_code`` bytes.
     """
-    client = boto3.client('lambda')
+    client = get_client('lambda')
 
-    with open(zip_file_path, 'rb') as zip_file:
-        zipped_code = zip_file.read()
+    if zipped_code is None:
+        with open(zip_file_path, 'rb') as zip_file:
+            zipped_code = zip_file.read()
 
     try:
         response = client.create_function(
@@ -16,7 +39,7 @@ def create_lambda_function(function_name, role_arn, handler, zip_file_path, runt
             Runtime=runtime,
             Role=role_arn,
             Handler=handler,
-            Code={'./validate_appointment.zip': './validate_appointment.py'},
+            Code={'ZipFile': zipped_code},
             Description="Validates appointment data",
             Timeout=10,  # seconds
             MemorySize=128,
@@ -26,16 +49,93 @@ def create_lambda_function(function_name, role_arn, handler, zip_file_path, runt
     except Exception as e:
         return {"Error": str(e)}
 
-def invoke_lambda_function(function_name, payload):
+def invoke_lambda_function(function_name, payload, invocation_type='RequestResponse'):
     """
     Invoke a Lambda function programmatically.
+
+    'RequestResponse' returns the decoded result and raises if the function
+    failed; 'Event' queues the invocation and returns its status code.
     """
-    client = boto3.client('lambda')
+    client = get_client('lambda')
 
     response = client.invoke(
         FunctionName=function_name,
-        InvocationType='RequestResponse',
-        Payload=json.dumps(payload),
+        InvocationType=invocation_type,
+        Payload=json.dumps(payload, default=str),
     )
+    if invocation_type != 'RequestResponse':
+        return {'StatusCode': response['StatusCode']}
+
     response_payload = json.loads(response['Payload'].read())
+    if response.get('FunctionError'):
+        raise RuntimeError(f"{function_name} failed: {response_payload.get('errorMessage', response_payload)}")
     return response_payload
+
+def build_validator_zip(root='.', package=VALIDATOR_PACKAGE, extra_files=VALIDATOR_EXTRA_FILES):
+    """Zip the validator's Python sources reproducibly and return the bytes.
+
+    Entries are added in sorted order with a fixed timestamp and mode, so
+    the archive (and its hash) only changes when a packaged file does.
+    """
+    paths = []
+    package_dir = os.path.join(root, package)
+    for directory, dirs, files in os.walk(package_dir):
+        dirs[:] = [d for d in dirs if d != '__pycache__' and not d.endswith('.egg-info') and d != 'dist']
+        for name in files:
+            if name.endswith('.py') and name != 'setup.py':
+                paths.append(os.path.relpath(os.path.join(directory, name), root))
+    paths.extend(name for name in extra_files if os.path.exists(os.path.join(root, name)))
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for path in sorted(p.replace(os.sep, '/') for p in paths):
+            info = zipfile.ZipInfo(path, date_time=ZIP_TIMESTAMP)
+            info.external_attr = ZIP_FILE_MODE
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(os.path.join(root, path), 'rb') as f:
+                archive.writestr(info, f.read(), compresslevel=9)
+    return buffer.getvalue()
+
+def code_sha256(zipped_code):
+    """Hash in the format Lambda reports as CodeSha256 (base64 of the SHA-256)."""
+    return base64.b64encode(hashlib.sha256(zipped_code).digest()).decode()
+
+def deploy_validator_function(role_arn, function_name=VALIDATOR_FUNCTION_NAME, root='.'):
+    """Create or update the validator function only when its code changed.
+
+    Returns {'action': 'created' | 'updated' | 'unchanged', 'CodeSha256': ...}.
+    """
+    zipped_code = build_validator_zip(root)
+    sha256 = code_sha256(zipped_code)
+    client = get_client('lambda')
+
+    try:
+        deployed = client.get_function_configuration(FunctionName=function_name)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ResourceNotFoundException':
+            raise
+        deployed = None
+
+    if deployed is None:
+        response = create_lambda_function(function_name, role_arn, VALIDATOR_HANDLER,
+                                          runtime=VALIDATOR_RUNTIME, zipped_code=zipped_code)
+        if 'Error' in response:
+            raise RuntimeError(f"Could not create {function_name}: {response['Error']}")
+        action = 'created'
+    elif deployed['CodeSha256'] == sha256:
+        action = 'unchanged'
+    else:
+        client.update_function_code(FunctionName=function_name, ZipFile=zipped_code, Publish=True)
+        action = 'updated'
+
+    print(f"{function_name}: {action} ({sha256})")
+    return {'action': action, 'CodeSha256': sha256}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deploy the appointment validator Lambda")
+    parser.add_argument('--role-arn', required=True)
+    parser.add_argument('--function-name', default=VALIDATOR_FUNCTION_NAME)
+    parser.add_argument('--root', default='.', help="Repository root holding autocare_utils/")
+    args = parser.parse_args()
+
+    deploy_validator_function(args.role_arn, args.function_name, args.root)
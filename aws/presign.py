@@ -0,0 +1,136 @@
+import base64
+import os
+import uuid
+from urllib.parse import unquote, urlparse
+
+from aws.clients import get_client
+from aws.dynamodb_utils import touch_image_reference
+from aws.s3_utils import CONTENT_ADDRESSED_UPLOADS, content_exists, content_key, is_sha256
+
+UPLOAD_URL_EXPIRES = int(os.environ.get('UPLOAD_URL_EXPIRES', 3600))
+# Largest object a presigned POST policy will accept
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', 10 * 1024 * 1024))
+
+
+class PresignService:
+    """Issues presigned S3 upload URLs for the image bucket.
+
+    Presigning is local signing with the cached client's credentials, so
+    no request touches S3. ``validate`` checks the bucket once at startup;
+    if it fails the error is kept and URLs are still signed, as S3 will
+    reject the upload itself.
+
+    With ``content_addressed`` on, a request carrying the file's SHA-256 is
+    signed for a hash-derived key, and answered with ``exists`` instead of a
+    URL when that object is already stored.
+    """
+
+    def __init__(self, bucket_name, region, content_addressed=CONTENT_ADDRESSED_UPLOADS):
+        self.bucket_name = bucket_name
+        self.region = region
+        self.content_addressed = content_addressed
+        self.error = None
+
+    @property
+    def client(self):
+        return get_client('s3', self.region)
+
+    def validate(self):
+        try:
+            self.client.head_bucket(Bucket=self.bucket_name)
+            self.error = None
+            return True
+        except Exception as e:
+            self.error = str(e)
+            print(f"S3 bucket {self.bucket_name} not reachable: {str(e)}")
+            return False
+
+    def new_key(self, file_name):
+        return f"{uuid.uuid4()}-{file_name}"
+
+    def image_url(self, key):
+        return f"https://{self.bucket_name}.s3.{self.region}.amazonaws.com/{key}"
+
+    def key_from_url(self, image_url):
+        """Return the object key for an image in this bucket, or None."""
+        parsed = urlparse(image_url or '')
+        if not parsed.hostname or not parsed.hostname.startswith(f"{self.bucket_name}.s3."):
+            return None
+        return unquote(parsed.path.lstrip('/')) or None
+
+    def _content_key(self, file_name, sha256):
+        """Hash-derived key, or None when the upload is not content-addressed."""
+        if not self.content_addressed or sha256 is None:
+            return None
+        if not is_sha256(sha256):
+            raise ValueError('sha256 must be 64 lowercase hex characters')
+        return content_key(sha256, file_name)
+
+    def _already_stored(self, key, sha256):
+        """True if the object exists and image GC has been told it is in use again.
+
+        Without the touch, an unreferenced object past the GC grace period
+        could be deleted while clients are still being told it exists.
+        """
+        if not content_exists(self.client, self.bucket_name, key):
+            return False
+        try:
+            touch_image_reference(sha256)
+            return True
+        except Exception as e:
+            # Safer to have the client upload it again than to risk a dangling URL
+            print(f"Error touching image reference for {sha256}: {str(e)}")
+            return False
+
+    def _existing(self, key):
+        return {'exists': True, 'imageUrl': self.image_url(key), 'key': key}
+
+    def presign_put(self, file_name, content_type, expires_in=UPLOAD_URL_EXPIRES, sha256=None):
+        """Return a presigned PUT; the client must send every header in ``headers``."""
+        key = self._content_key(file_name, sha256)
+        params = {'ContentType': content_type, 'ACL': 'public-read'}
+        headers = {'Content-Type': content_type}
+        if key is not None:
+            if self._already_stored(key, sha256):
+                return self._existing(key)
+            # S3 rejects the body unless it hashes to the key's digest
+            checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+            params['ChecksumSHA256'] = checksum
+            headers['x-amz-checksum-sha256'] = checksum
+        else:
+            key = self.new_key(file_name)
+
+        url = self.client.generate_presigned_url(
+            'put_object',
+            Params=dict(params, Bucket=self.bucket_name, Key=key),
+            ExpiresIn=expires_in
+        )
+        return {'uploadUrl': url, 'headers': headers, 'imageUrl': self.image_url(key), 'key': key}
+
+    def presign_post(self, file_name, content_type, max_bytes=MAX_UPLOAD_BYTES,
+                     expires_in=UPLOAD_URL_EXPIRES, sha256=None):
+        """Return a presigned POST policy limited to one content type and size."""
+        key = self._content_key(file_name, sha256)
+        fields = {'acl': 'public-read', 'Content-Type': content_type}
+        if key is not None:
+            if self._already_stored(key, sha256):
+                return self._existing(key)
+            fields['x-amz-checksum-sha256'] = base64.b64encode(bytes.fromhex(sha256)).decode()
+        else:
+            key = self.new_key(file_name)
+
+        post = self.client.generate_presigned_post(
+            Bucket=self.bucket_name,
+            Key=key,
+            Fields=fields,
+            Conditions=[{name: value} for name, value in fields.items()] + [
+                ['content-length-range', 1, max_bytes]
+            ],
+            ExpiresIn=expires_in
+        )
+        return {
+            'uploadUrl': post['url'],
+            'fields': post['fields'],
+            'imageUrl': self.image_url(key),
+            'key': key
+        }
@@ -0,0 +1,114 @@
+"""Provision the AWS resources the web app needs and record them in a state file.
+
+Run this once per environment (and again whenever the resources change):
+
+    python -m aws.provision --state-file aws_resources.json
+
+Every resource is resolved first and only created when missing, so the
+command is safe to re-run. The web app reads the state file at startup and
+makes no control-plane calls of its own.
+"""
+import argparse
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from aws.clients import get_client, DEFAULT_REGION
+from aws.cognito_utils import create_user_pool, create_app_client
+from aws.dynamodb_utils import create_appointments_table
+from aws.s3_utils import create_bucket, configure_bucket_cors
+
+STATE_FILE = os.environ.get('AUTOCARE_STATE_FILE', 'aws_resources.json')
+USER_POOL_NAME = 'CarServiceUserPool'
+SNS_TOPIC_NAME = 'appointment-notifications'
+
+
+def load_state(path=STATE_FILE):
+    """Return the recorded resources, or None if the state file does not exist."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_state(state, path=STATE_FILE):
+    # Write to a temp file and rename so readers never see a partial file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def resolve_cognito():
+    user_pool_id = create_user_pool(USER_POOL_NAME)
+    if not user_pool_id:
+        raise RuntimeError(f"Could not resolve user pool {USER_POOL_NAME}")
+
+    client_id = create_app_client(user_pool_id)
+    if not client_id:
+        raise RuntimeError("Could not resolve app client")
+
+    return {'user_pool_id': user_pool_id, 'client_id': client_id}
+
+
+def resolve_bucket(bucket_name, region):
+    s3_client = get_client('s3', region)
+    try:
+        s3_client.head_bucket(Bucket=bucket_name)
+        print(f"Bucket {bucket_name} already exists")
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('404', 'NoSuchBucket', 'NotFound'):
+            raise
+        if not create_bucket(s3_client, bucket_name, region):
+            raise RuntimeError(f"Could not create bucket {bucket_name}")
+
+    if not configure_bucket_cors(s3_client, bucket_name):
+        raise RuntimeError(f"Could not configure CORS for bucket {bucket_name}")
+
+    return {'bucket_name': bucket_name}
+
+
+def resolve_table():
+    return {'appointments_table': create_appointments_table()}
+
+
+def resolve_topic(region):
+    # create_topic is idempotent and returns the existing ARN
+    response = get_client('sns', region).create_topic(Name=SNS_TOPIC_NAME)
+    return {'sns_topic_arn': response['TopicArn']}
+
+
+def provision(region=DEFAULT_REGION, bucket_name=None, state_file=STATE_FILE):
+    """Resolve or create every resource concurrently and write the state file."""
+    previous = load_state(state_file) or {}
+    # Reuse the recorded bucket so re-running never creates a second one
+    bucket_name = bucket_name or previous.get('bucket_name') or f"autocare-images1-{uuid.uuid4()}"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [
+            executor.submit(resolve_cognito),
+            executor.submit(resolve_bucket, bucket_name, region),
+            executor.submit(resolve_table),
+            executor.submit(resolve_topic, region),
+        ]
+        state = {'region': region}
+        for future in futures:
+            state.update(future.result())
+
+    save_state(state, state_file)
+    print(f"Wrote resource state to {state_file}")
+    return state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Provision AutoCare AWS resources")
+    parser.add_argument('--region', default=DEFAULT_REGION)
+    parser.add_argument('--bucket-name', default=os.environ.get('BUCKET_NAME'))
+    parser.add_argument('--state-file', default=STATE_FILE)
+    args = parser.parse_args()
+
+    provision(args.region, args.bucket_name, args.state_file)
@@ -1,16 +1,29 @@
-import boto3
 from botocore.exceptions import ClientError
 import mimetypes
 import os
 import json
+import re
+import threading
+import time
+
+from aws.clients import get_client
+
+# Content-addressed mode: uploads are stored under a key derived from the
+# client-supplied SHA-256, so the same photo is only ever stored once
+CONTENT_ADDRESSED_UPLOADS = os.environ.get('CONTENT_ADDRESSED_UPLOADS', 'false').lower() == 'true'
+CONTENT_PREFIX = 'sha256'
+# How long a positive existence check is trusted. Every hit handed to a
+# client also touches the image's reference item (aws.presign), and image
+# GC spares images touched within its grace period; keep this well under it
+CONTENT_EXISTS_TTL = 3600
+_SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+_known_content = {}
+_known_content_lock = threading.Lock()
 
 def get_s3_client(region=None):
     """Initialize S3 client with optional region."""
     try:
-        if region is None:
-            s3_client = boto3.client('s3')
-        else:
-            s3_client = boto3.client('s3', region_name=region)
+        s3_client = get_client('s3', region)
         
         # Test credentials by making a simple API call
         s3_client.list_buckets()
@@ -104,8 +117,12 @@ def create_bucket(s3_client, bucket_name, region=None):
         print(f"Error creating bucket: {e.response['Error']['Message']}")
         return None
 
-def upload_car_image(s3_client, bucket_name, image_name, file_path):
-    """Upload a car image to the S3 bucket."""
+def upload_car_image(s3_client, bucket_name, image_name, file_path, transfer_config=None, metadata=None):
+    """Upload a car image to the S3 bucket.
+
+    ``transfer_config`` tunes multipart thresholds and concurrency; ``metadata``
+    is stored as user metadata on the object.
+    """
     if s3_client is None:
         print("Error: S3 client not initialized.")
         return False
@@ -114,15 +131,20 @@ def upload_car_image(s3_client, bucket_name, image_name, file_path):
         # Clean the file path
         clean_path = file_path.strip('"\'')
         
+        extra_args = {
+            'ACL': 'public-read',
+            'ContentType': mimetypes.guess_type(clean_path)[0] or 'application/octet-stream'
+        }
+        if metadata:
+            extra_args['Metadata'] = metadata
+
         # Upload the file with public-read ACL
         s3_client.upload_file(
             clean_path, 
             bucket_name, 
             image_name,
-            ExtraArgs={
-                'ACL': 'public-read',
-                'ContentType': mimetypes.guess_type(clean_path)[0] or 'application/octet-stream'
-            }
+            ExtraArgs=extra_args,
+            Config=transfer_config
         )
         
         # Generate and return the URL
@@ -137,6 +159,46 @@ def upload_car_image(s3_client, bucket_name, image_name, file_path):
         print(f"Error: File not found at path: {clean_path}")
         return None
 
+def is_sha256(value):
+    return isinstance(value, str) and bool(_SHA256_PATTERN.match(value))
+
+def content_key(sha256, file_name=''):
+    """Key for content-addressed storage, e.g. sha256/ab/ab12....jpeg."""
+    extension = os.path.splitext(file_name)[1].lower()
+    return f"{CONTENT_PREFIX}/{sha256[:2]}/{sha256}{extension}"
+
+def hash_from_key(key):
+    """Return the SHA-256 in a content-addressed key, or None for other keys."""
+    parts = key.split('/')
+    if len(parts) != 3 or parts[0] != CONTENT_PREFIX:
+        return None
+    digest = parts[2].split('.', 1)[0]
+    return digest if is_sha256(digest) else None
+
+def content_exists(s3_client, bucket_name, key):
+    """Check whether a content-addressed object is already stored.
+
+    Hits are cached for CONTENT_EXISTS_TTL seconds; misses are not, as the
+    object may be uploaded at any moment.
+    """
+    now = time.monotonic()
+    with _known_content_lock:
+        if _known_content.get(key, 0) > now:
+            return True
+
+    try:
+        s3_client.head_object(Bucket=bucket_name, Key=key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
+    with _known_content_lock:
+        if len(_known_content) >= 100000:
+            _known_content.clear()
+        _known_content[key] = now + CONTENT_EXISTS_TTL
+    return True
+
 def configure_bucket_cors(s3_client, bucket_name):
     """Configure CORS for the S3 bucket."""
     cors_configuration = {
@@ -0,0 +1,110 @@
+import threading
+import time
+
+from aws.presign import PresignService
+from aws.provision import load_state, STATE_FILE
+from aws.sns_utils import get_subscription_registry
+from aws.token_verifier import TokenVerifier
+
+
+class AWSServices:
+    """Handles to the AWS resources the app uses, loaded once per process."""
+
+    def __init__(self, region, auth_mode='cognito', state_file=STATE_FILE):
+        self.region = region
+        self.auth_mode = auth_mode
+        self.state_file = state_file
+        self.bucket_name = None
+        self.user_pool_id = None
+        self.client_id = None
+        self.token_verifier = None
+        self.appointments_table = None
+        self.sns_topic_arn = None
+        self.presigner = None
+        self.error = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._warm_ups = []
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def wait_until_ready(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def init(self):
+        """Load the resource IDs written by ``python -m aws.provision``.
+
+        No AWS calls are made here. Returns True on success.
+        """
+        try:
+            state = load_state(self.state_file)
+            if state is None:
+                self.error = f"{self.state_file} not found, run 'python -m aws.provision' first"
+                print(f"Failed to initialize AWS services: {self.error}")
+                return False
+
+            self.region = state.get('region', self.region)
+            self.user_pool_id = state['user_pool_id']
+            self.client_id = state['client_id']
+            self.bucket_name = state['bucket_name']
+            self.appointments_table = state['appointments_table']
+            self.sns_topic_arn = state['sns_topic_arn']
+            self.presigner = PresignService(self.bucket_name, self.region)
+
+            print(f"Initialized with User Pool ID: {self.user_pool_id}")
+            print(f"Initialized with Client ID: {self.client_id}")
+
+            if self.auth_mode == 'local':
+                print("WARNING: Using locally generated signing keys for access tokens")
+                self.token_verifier = TokenVerifier.local(self.region, self.user_pool_id, self.client_id)
+            else:
+                self.token_verifier = TokenVerifier(self.region, self.user_pool_id, self.client_id)
+
+            self.error = None
+            self._ready.set()
+            return True
+        except Exception as e:
+            self.error = str(e)
+            print(f"Error initializing AWS services: {str(e)}")
+            return False
+
+    def add_warm_up(self, warm_up):
+        """Also run ``warm_up()`` on the bootstrap thread once the resources are known."""
+        self._warm_ups.append(warm_up)
+
+    def warm_up(self):
+        """Fill caches that save calls later; failures are logged, not fatal."""
+        self.presigner.validate()
+        try:
+            get_subscription_registry().sync(self.sns_topic_arn)
+        except Exception as e:
+            print(f"Error loading SNS subscriptions: {str(e)}")
+        for warm_up in self._warm_ups:
+            try:
+                warm_up()
+            except Exception as e:
+                print(f"Error warming up: {str(e)}")
+
+    def start(self, retry_interval=5, max_retry_interval=60):
+        """Bootstrap in a background thread, retrying with backoff until it succeeds.
+
+        Only the first call starts a thread; later calls are no-ops.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return self._thread
+
+            def run():
+                delay = retry_interval
+                while not self.init():
+                    print(f"WARNING: Failed to initialize AWS services, retrying in {delay}s")
+                    time.sleep(delay)
+                    delay = min(delay * 2, max_retry_interval)
+                self.warm_up()
+
+            self._thread = threading.Thread(target=run, name='aws-bootstrap', daemon=True)
+            self._thread.start()
+            return self._thread
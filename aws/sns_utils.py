@@ -1,27 +1,326 @@
-import boto3
+import atexit
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
 
-def send_notification(topic_arn, message, subject):
+try:
+    import fcntl
+except ImportError:  # Not on Windows; saves are then only serialized per process
+    fcntl = None
+
+from aws.clients import get_client
+
+# Local copy of the topic's email subscriptions; see SubscriptionRegistry
+SUBSCRIPTIONS_FILE = os.environ.get('SNS_SUBSCRIPTIONS_FILE', 'sns_subscriptions.json')
+
+class PublishError(Exception):
+    """An entry that SNS rejected inside a PublishBatch call."""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+
+class BatchPublisher:
+    """Coalesce SNS publishes into PublishBatch calls.
+
+    Messages for the same topic are buffered until ``max_batch`` (the SNS
+    limit is 10) have arrived or the oldest has waited ``linger_ms``, then
+    sent together. Each caller gets a Future resolved with the entry's
+    MessageId, or failed with the entry's error.
+    """
+
+    MAX_BATCH_BYTES = 256 * 1024
+
+    def __init__(self, max_batch=10, linger_ms=20, max_workers=4):
+        self.max_batch = max_batch
+        self.linger = linger_ms / 1000
+        # Plain threads rather than a ThreadPoolExecutor: the interpreter
+        # stops executors before atexit hooks run, which would leave close()
+        # unable to send what is still buffered
+        self._batches = queue.Queue()
+        self._senders = [
+            threading.Thread(target=self._send_loop, name=f'sns-publish-{i}', daemon=True)
+            for i in range(max_workers)
+        ]
+        for sender in self._senders:
+            sender.start()
+        self._cond = threading.Condition()
+        self._buffers = {}
+        self._closed = False
+        self._flusher = threading.Thread(target=self._run, name='sns-batch-flusher', daemon=True)
+        self._flusher.start()
+
+    def submit(self, topic_arn, message, subject=None):
+        future = Future()
+        entry = {'Message': message}
+        if subject:
+            entry['Subject'] = subject
+        size = len(message.encode()) + len((subject or '').encode())
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Publisher is closed")
+            buffer = self._buffers.get(topic_arn)
+            if buffer and buffer['bytes'] + size > self.MAX_BATCH_BYTES:
+                self._send(topic_arn, self._buffers.pop(topic_arn))
+                buffer = None
+            if buffer is None:
+                buffer = self._buffers[topic_arn] = {'entries': [], 'bytes': 0, 'since': time.monotonic()}
+            buffer['entries'].append((entry, future))
+            buffer['bytes'] += size
+            if len(buffer['entries']) >= self.max_batch:
+                self._send(topic_arn, self._buffers.pop(topic_arn))
+            else:
+                self._cond.notify()
+        return future
+
+    def flush(self):
+        """Send everything buffered now."""
+        with self._cond:
+            buffers, self._buffers = self._buffers, {}
+            for topic_arn, buffer in buffers.items():
+                self._send(topic_arn, buffer)
+
+    def close(self, timeout=10):
+        """Flush and wait for in-flight batches; used as the shutdown hook."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self.flush()
+        for _ in self._senders:
+            self._batches.put(None)
+        deadline = time.monotonic() + timeout
+        for sender in self._senders:
+            sender.join(max(0, deadline - time.monotonic()))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                now = time.monotonic()
+                due = [topic for topic, buffer in self._buffers.items() if now - buffer['since'] >= self.linger]
+                for topic_arn in due:
+                    self._send(topic_arn, self._buffers.pop(topic_arn))
+                if self._buffers:
+                    oldest = min(buffer['since'] for buffer in self._buffers.values())
+                    self._cond.wait(max(0, oldest + self.linger - now))
+                else:
+                    self._cond.wait()
+
+    def _send(self, topic_arn, buffer):
+        self._batches.put((topic_arn, buffer['entries']))
+
+    def _send_loop(self):
+        while True:
+            batch = self._batches.get()
+            if batch is None:
+                return
+            self._publish_batch(*batch)
+
+    def _publish_batch(self, topic_arn, entries):
+        futures = {}
+        request_entries = []
+        for i, (entry, future) in enumerate(entries):
+            futures[str(i)] = future
+            request_entries.append(dict(entry, Id=str(i)))
+
+        try:
+            response = get_client('sns').publish_batch(
+                TopicArn=topic_arn,
+                PublishBatchRequestEntries=request_entries
+            )
+        except Exception as e:
+            for future in futures.values():
+                future.set_exception(e)
+            return
+
+        for success in response.get('Successful', []):
+            futures.pop(success['Id']).set_result({'MessageId': success['MessageId']})
+        for failure in response.get('Failed', []):
+            futures.pop(failure['Id']).set_exception(
+                PublishError(failure.get('Code'), failure.get('Message', 'Publish failed'))
+            )
+        for future in futures.values():
+            future.set_exception(PublishError('Unknown', 'No result returned for entry'))
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+def get_publisher():
+    global _publisher
+    if _publisher is None:
+        with _publisher_lock:
+            if _publisher is None:
+                _publisher = BatchPublisher()
+                atexit.register(_publisher.close)
+    return _publisher
+
+def flush_notifications():
+    """Send any buffered notifications immediately."""
+    if _publisher is not None:
+        _publisher.flush()
+
+def publish_notification(topic_arn, message, subject):
+    """Queue a message on the shared batch publisher and return its Future."""
+    return get_publisher().submit(topic_arn, message, subject)
+
+def send_notification(topic_arn, message, subject, timeout=30):
     try:
-        client = boto3.client('sns')
-        response = client.publish(
-            TopicArn=topic_arn,
-            Message=message,
-            Subject=subject
-        )
+        response = publish_notification(topic_arn, message, subject).result(timeout)
         print(f"Successfully sent SNS notification: {response['MessageId']}")
         return response
     except Exception as e:
         print(f"Error sending SNS notification: {str(e)}")
         raise e
 
-def subscribe_email(topic_arn, email):
+class SubscriptionRegistry:
+    """Known email subscriptions per topic, cached in memory and persisted to a JSON file.
+
+    Entries map an email to its SubscriptionArn and status ('pending' until
+    SNS reports the subscription as confirmed). sync() rebuilds a topic from
+    list_subscriptions_by_topic; subscribe_email/unsubscribe_email keep it
+    current in between.
+
+    Several worker processes may share the file. Each change is applied to
+    the in-memory copy, then merged into the file's current contents under
+    an exclusive lock on ``<path>.lock`` and written through a temp file of
+    its own, so workers do not drop each other's entries. A failed save is
+    only logged: the subscription itself already happened.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._topics = {}
+        try:
+            with open(path) as f:
+                self._topics = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Ignoring unreadable subscription registry {path}: {str(e)}")
+
+    def get(self, topic_arn, email):
+        return self._topics.get(topic_arn, {}).get(email.lower())
+
+    def is_subscribed(self, topic_arn, email):
+        return self.get(topic_arn, email) is not None
+
+    def set(self, topic_arn, email, subscription_arn, status):
+        entry = {'SubscriptionArn': subscription_arn, 'status': status}
+
+        def change(topics):
+            topics.setdefault(topic_arn, {})[email.lower()] = dict(entry)
+        self._update(change)
+
+    def remove(self, subscription_arn):
+        def change(topics):
+            for subscriptions in topics.values():
+                for email, entry in list(subscriptions.items()):
+                    if entry['SubscriptionArn'] == subscription_arn:
+                        del subscriptions[email]
+        self._update(change)
+
+    def sync(self, topic_arn):
+        """Replace a topic's entries with what SNS currently reports."""
+        subscriptions = {}
+        paginator = get_client('sns').get_paginator('list_subscriptions_by_topic')
+        for page in paginator.paginate(TopicArn=topic_arn):
+            for subscription in page['Subscriptions']:
+                if subscription['Protocol'] != 'email':
+                    continue
+                email = subscription['Endpoint'].lower()
+                arn = subscription['SubscriptionArn']
+                if arn == 'PendingConfirmation':
+                    previous = self.get(topic_arn, email)
+                    subscriptions[email] = {
+                        'SubscriptionArn': previous['SubscriptionArn'] if previous else None,
+                        'status': 'pending'
+                    }
+                else:
+                    subscriptions[email] = {'SubscriptionArn': arn, 'status': 'confirmed'}
+
+        def change(topics):
+            topics[topic_arn] = json.loads(json.dumps(subscriptions))
+        self._update(change)
+        print(f"Loaded {len(subscriptions)} email subscriptions for {topic_arn}")
+        return subscriptions
+
+    def _update(self, change):
+        """Apply ``change(topics)`` in memory and to the file, merged with other processes' entries."""
+        with self._lock:
+            change(self._topics)
+            try:
+                with self._file_lock():
+                    topics = self._read_file()
+                    change(topics)
+                    self._write_file(topics)
+                # Also picks up what other processes saved since we last read
+                self._topics = topics
+            except Exception as e:
+                print(f"WARNING: Could not save subscription registry {self.path}: {str(e)}")
+
+    def _file_lock(self):
+        lock_file = open(f"{self.path}.lock", 'a')
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # Released when the file is closed
+        return lock_file
+
+    def _read_file(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            print(f"Replacing unreadable subscription registry {self.path}")
+            return json.loads(json.dumps(self._topics))
+
+    def _write_file(self, topics):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('w', dir=directory, prefix='.subscriptions-', suffix='.tmp',
+                                         delete=False) as f:
+            json.dump(topics, f, indent=2, sort_keys=True)
+        try:
+            os.replace(f.name, self.path)
+        except Exception:
+            os.unlink(f.name)
+            raise
+
+_registry = None
+
+def get_subscription_registry():
+    global _registry
+    if _registry is None:
+        with _publisher_lock:
+            if _registry is None:
+                _registry = SubscriptionRegistry(SUBSCRIPTIONS_FILE)
+    return _registry
+
+def subscribe_email(topic_arn, email, filter_policy=None):
+    """Subscribe an email to a topic unless the registry already knows it."""
     try:
-        client = boto3.client('sns')
-        response = client.subscribe(
-            TopicArn=topic_arn,
-            Protocol='email',
-            Endpoint=email
-        )
+        registry = get_subscription_registry()
+        existing = registry.get(topic_arn, email)
+        if existing is not None:
+            return {'SubscriptionArn': existing['SubscriptionArn']}
+
+        client = get_client('sns')
+        subscribe_kwargs = {
+            'TopicArn': topic_arn,
+            'Protocol': 'email',
+            'Endpoint': email,
+            'ReturnSubscriptionArn': True
+        }
+        if filter_policy:
+            subscribe_kwargs['Attributes'] = {'FilterPolicy': json.dumps(filter_policy)}
+        response = client.subscribe(**subscribe_kwargs)
+        registry.set(topic_arn, email, response['SubscriptionArn'], 'pending')
         return response
     except Exception as e:
         print(f"Error subscribing to SNS topic: {str(e)}")
@@ -29,10 +328,11 @@ def subscribe_email(topic_arn, email):
 
 def unsubscribe_email(subscription_arn):
     try:
-        client = boto3.client('sns')
+        client = get_client('sns')
         response = client.unsubscribe(
             SubscriptionArn=subscription_arn
         )
+        get_subscription_registry().remove(subscription_arn)
         return response
     except Exception as e:
         print(f"Error unsubscribing from SNS topic: {str(e)}")
@@ -0,0 +1,133 @@
+import json
+import threading
+import time
+import urllib.request
+import uuid
+
+import jwt
+
+
+class TokenVerifier:
+    """Verify Cognito access tokens locally against the user pool's JWKS.
+
+    The key set is fetched once and cached. A token signed with an unknown
+    key id triggers a refresh (at most once per ``min_refresh_interval``
+    seconds) so key rotation is picked up without a restart. If a refresh
+    fails, the cached keys stay in use and the next attempt waits
+    ``min_refresh_interval`` seconds, so an unreachable JWKS endpoint does
+    not stall or reject requests.
+    """
+
+    def __init__(self, region, user_pool_id, client_id, jwks_ttl=3600, min_refresh_interval=60):
+        self.issuer = f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}"
+        self.jwks_url = f"{self.issuer}/.well-known/jwks.json"
+        self.client_id = client_id
+        self.jwks_ttl = jwks_ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._keys = {}
+        self._fetched_at = 0
+        self._attempted_at = float('-inf')
+        self._lock = threading.Lock()
+        self._private_key = None
+
+    @classmethod
+    def local(cls, region, user_pool_id, client_id):
+        """Build a verifier backed by a self-generated RSA key pair.
+
+        Used for local development and tests: no JWKS is fetched and tokens
+        are minted with :meth:`issue_token`.
+        """
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        verifier = cls(region, user_pool_id, client_id)
+        verifier._private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        kid = str(uuid.uuid4())
+        public_jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(verifier._private_key.public_key()))
+        public_jwk.update({'kid': kid, 'alg': 'RS256', 'use': 'sig'})
+        verifier._local_kid = kid
+        verifier._load_jwks({'keys': [public_jwk]})
+        verifier._fetched_at = float('inf')
+        return verifier
+
+    @property
+    def is_local(self):
+        return self._private_key is not None
+
+    def issue_token(self, username, expires_in=3600):
+        """Mint an access token shaped like Cognito's (local mode only)."""
+        if not self.is_local:
+            raise RuntimeError("issue_token is only available in local mode")
+
+        now = int(time.time())
+        claims = {
+            'sub': str(uuid.uuid5(uuid.NAMESPACE_URL, username)),
+            'iss': self.issuer,
+            'client_id': self.client_id,
+            'token_use': 'access',
+            'scope': 'aws.cognito.signin.user.admin',
+            'auth_time': now,
+            'iat': now,
+            'exp': now + expires_in,
+            'jti': str(uuid.uuid4()),
+            'username': username,
+        }
+        return jwt.encode(claims, self._private_key, algorithm='RS256', headers={'kid': self._local_kid})
+
+    def _load_jwks(self, jwks):
+        self._keys = {key['kid']: jwt.PyJWK(key).key for key in jwks.get('keys', [])}
+
+    def _fetch_jwks(self):
+        with urllib.request.urlopen(self.jwks_url, timeout=5) as response:
+            self._load_jwks(json.loads(response.read()))
+        self._fetched_at = time.monotonic()
+
+    def _get_key(self, kid):
+        key = self._keys.get(kid)
+        if key is not None and time.monotonic() - self._fetched_at < self.jwks_ttl:
+            return key
+
+        # A cached key keeps being served while another thread refreshes
+        if not self._lock.acquire(blocking=key is None):
+            return key
+        try:
+            key = self._keys.get(kid)
+            now = time.monotonic()
+            stale = now - self._fetched_at >= self.jwks_ttl
+            if (key is None or stale) and now - self._attempted_at >= self.min_refresh_interval:
+                self._attempted_at = now
+                try:
+                    self._fetch_jwks()
+                except Exception as e:
+                    # Keep verifying with the keys we have; retried after min_refresh_interval
+                    print(f"Error refreshing JWKS from {self.jwks_url}: {str(e)}")
+                key = self._keys.get(kid)
+        finally:
+            self._lock.release()
+        return key
+
+    def verify(self, token):
+        """Return the ``get_user``-shaped user dict for a valid access token.
+
+        Raises ``jwt.InvalidTokenError`` if the token is invalid.
+        """
+        header = jwt.get_unverified_header(token)
+        key = self._get_key(header.get('kid'))
+        if key is None:
+            raise jwt.InvalidTokenError("Unknown signing key")
+
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=['RS256'],
+            issuer=self.issuer,
+            options={'require': ['exp', 'iss', 'client_id', 'token_use', 'username']}
+        )
+        if claims['token_use'] != 'access':
+            raise jwt.InvalidTokenError("Not an access token")
+        if claims['client_id'] != self.client_id:
+            raise jwt.InvalidTokenError("Token was issued for a different client")
+
+        return {
+            'Username': claims['username'],
+            'UserAttributes': [{'Name': 'sub', 'Value': claims['sub']}],
+        }
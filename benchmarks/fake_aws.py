@@ -0,0 +1,126 @@
+"""Offline AWS for benchmarks: moto's in-memory services plus provisioned resources."""
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from botocore.awsrequest import AWSResponse
+
+
+_moto_lock = threading.Lock()
+_faults = None
+
+
+def _patch_moto():
+    """Route every request moto answers through the fault injector, one at a time.
+
+    botocore runs all ``before-send`` handlers even after one has answered,
+    so a throttle returned from a separate hook would still reach moto and
+    be applied; it has to be decided here instead. Requests are serialized
+    because moto's backends are not thread-safe (concurrent transactions
+    fail inside moto with errors real AWS never returns); the injected
+    latency is spent before the lock, so requests still overlap on the
+    "network".
+    """
+    from moto.core.botocore_stubber import BotocoreStubber
+    if getattr(BotocoreStubber.__call__, 'patched', False):
+        return
+    call = BotocoreStubber.__call__
+
+    def patched(self, event_name, request, **kwargs):
+        if _faults is not None:
+            response = _faults.before_send(request, event_name)
+            if response is not None:
+                return response
+        with _moto_lock:
+            return call(self, event_name, request, **kwargs)
+    patched.patched = True
+    BotocoreStubber.__call__ = patched
+
+
+def start_fake_aws(state_file=None, region='us-east-1'):
+    """Start moto, provision the app's resources and point the app at them.
+
+    Must run before ``app`` is imported, since the app reads its state file
+    location from the environment at import time. Returns the state dict.
+    """
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+    os.environ['AWS_DEFAULT_REGION'] = region
+    os.environ.setdefault('AUTH_MODE', 'local')
+    state_file = state_file or os.path.join(tempfile.mkdtemp(prefix='autocare-bench-'), 'aws_resources.json')
+    os.environ['AUTOCARE_STATE_FILE'] = state_file
+    os.environ.setdefault('SNS_SUBSCRIPTIONS_FILE', os.path.join(os.path.dirname(state_file), 'subscriptions.json'))
+    os.environ.setdefault('NOTIFICATION_DEAD_LETTER_FILE', os.path.join(os.path.dirname(state_file), 'deadletter.jsonl'))
+
+    from moto import mock_aws
+    _patch_moto()
+    mock = mock_aws()
+    mock.start()
+
+    from aws.provision import provision
+    return provision(region=region, state_file=state_file)
+
+
+class _Body:
+    def __init__(self, data):
+        self.data = data
+
+    def stream(self, **kwargs):
+        yield self.data
+
+
+def _throttle_response(service, url):
+    """A throttling error in the wire format each service's protocol expects."""
+    if service == 's3':
+        body = b'<Error><Code>SlowDown</Code><Message>Please reduce your request rate.</Message></Error>'
+        return AWSResponse(url, 503, {'Content-Type': 'application/xml'}, _Body(body))
+    if service == 'sns':
+        body = (b'<ErrorResponse><Error><Type>Sender</Type><Code>Throttling</Code>'
+                b'<Message>Rate exceeded</Message></Error></ErrorResponse>')
+        return AWSResponse(url, 400, {'Content-Type': 'text/xml'}, _Body(body))
+    body = json.dumps({'__type': 'ThrottlingException', 'message': 'Rate exceeded'}).encode()
+    return AWSResponse(url, 400, {'Content-Type': 'application/x-amz-json-1.0',
+                                  'x-amzn-ErrorType': 'ThrottlingException'}, _Body(body))
+
+
+class FaultInjector:
+    """Adds latency, jitter and throttling to every AWS call answered by moto.
+
+    Each request attempt sleeps ``latency_ms`` plus up to ``jitter_ms`` and
+    is then answered with a throttling error with probability
+    ``throttle_rate``, so botocore's retry logic runs as it would against AWS.
+    """
+
+    def __init__(self, latency_ms=0, jitter_ms=0, throttle_rate=0.0, seed=None):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.throttle_rate = throttle_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.throttled = 0
+
+    def install(self):
+        """Apply to every AWS call answered by moto from now on."""
+        global _faults
+        _faults = self
+
+    def before_send(self, request, event_name):
+        """Wait out the injected latency; return a throttling response or None."""
+        with self._lock:
+            self.attempts += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            throttle = self._random.random() < self.throttle_rate
+            if throttle:
+                self.throttled += 1
+        if delay:
+            time.sleep(delay)
+        if throttle:
+            return _throttle_response(event_name.split('.')[1], request.url)
+        return None
+
+    def stats(self):
+        return {'attempts': self.attempts, 'throttled': self.throttled}
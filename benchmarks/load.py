@@ -0,0 +1,286 @@
+"""Load test: virtual users booking, polling and uploading against the app.
+
+    python -m benchmarks.load --users 200 --duration 120
+    python -m benchmarks.load --users 50 --latency-ms 20 --jitter-ms 30 --throttle-rate 0.05
+    python -m benchmarks.load --url http://localhost:5555 --users 100
+
+Without --url the app runs in-process on moto (see benchmarks.fake_aws),
+with every AWS call delayed and throttled as configured; each virtual user
+gets its own thread and test client, so requests really do overlap. With
+--url, requests go over HTTP to a running server and fault injection is up
+to that server's backends.
+
+Each user signs up and logs in, polls GET /api/appointments every
+--poll-interval seconds (sending If-None-Match, as the frontend does) and,
+between polls, books appointments and requests upload URLs after a random
+think time. Latency percentiles and throughput are reported per route.
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+from benchmarks.fake_aws import FaultInjector, start_fake_aws
+
+PASSWORD = 'LoadTest123!'
+MAKES = [('Toyota', 'Camry'), ('Honda', 'Civic'), ('Ford', 'Focus'), ('BMW', 'X5'), ('Tesla', 'Model 3')]
+SERVICES = ['oil-change', 'tire-rotation', 'brake-service', 'general-inspection', 'repair']
+TIMES = ['09:00', '10:00', '11:00', '13:00', '14:00', '15:00', '16:00']
+DEFAULT_MIX = 'book=1,upload=1'
+
+
+class TestClientTransport:
+    """Requests through Flask's test client; one per virtual user."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self.client.open(path, method=method, json=body, headers=headers or {})
+        return response.status_code, response.headers, response.get_json(silent=True)
+
+
+class HttpTransport:
+    """Requests over HTTP to a running server."""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                status, response_headers, payload = response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            status, response_headers, payload = e.code, e.headers, e.read()
+        try:
+            payload = json.loads(payload) if payload else None
+        except ValueError:
+            payload = None
+        return status, response_headers, payload
+
+
+class Recorder:
+    """Collects (route, status, seconds) samples from every user thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.started = self.finished = None
+
+    def record(self, route, status, seconds):
+        with self._lock:
+            self.samples[route].append(seconds)
+            self.statuses[route][status] += 1
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(recorder):
+    elapsed = max(recorder.finished - recorder.started, 1e-9)
+    routes = {}
+    for route, samples in sorted(recorder.samples.items()):
+        samples = sorted(samples)
+        statuses = recorder.statuses[route]
+        routes[route] = {
+            'requests': len(samples),
+            'throughput_rps': round(len(samples) / elapsed, 2),
+            'p50_ms': round(percentile(samples, 50) * 1000, 2),
+            'p95_ms': round(percentile(samples, 95) * 1000, 2),
+            'p99_ms': round(percentile(samples, 99) * 1000, 2),
+            'max_ms': round(samples[-1] * 1000, 2),
+            # 0 is a request that never got a response
+            'errors': sum(count for status, count in statuses.items() if status == 0 or status >= 500),
+            'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        }
+    return {'elapsed_s': round(elapsed, 2), 'routes': routes}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ('book', 'upload'):
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}; use book and upload")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class VirtualUser:
+    def __init__(self, index, transport, recorder, args, deadline, seed):
+        self.transport = transport
+        self.recorder = recorder
+        self.args = args
+        self.deadline = deadline
+        self.random = random.Random(seed)
+        self.email = f"load-{uuid.uuid4().hex[:12]}-{index}@example.com"
+        self.headers = {}
+        self.etag = None
+
+    def call(self, route, method, path, body=None, headers=None):
+        method_headers = dict(self.headers, **(headers or {}))
+        started = time.perf_counter()
+        try:
+            status, response_headers, payload = self.transport.request(method, path, body, method_headers)
+        except Exception as e:
+            print(f"{route} failed: {str(e)}", file=sys.stderr)
+            status, response_headers, payload = 0, {}, None
+        self.recorder.record(route, status, time.perf_counter() - started)
+        return status, response_headers, payload
+
+    def login(self):
+        credentials = {'email': self.email, 'password': PASSWORD}
+        self.call('POST /api/auth/signup', 'POST', '/api/auth/signup', credentials)
+        status, _, payload = self.call('POST /api/auth/login', 'POST', '/api/auth/login', credentials)
+        if status != 200 or not payload:
+            return False
+        self.headers = {'Authorization': payload['token']}
+        return True
+
+    def poll(self):
+        headers = {'If-None-Match': f'"{self.etag}"'} if self.etag else {}
+        status, response_headers, _ = self.call('GET /api/appointments', 'GET', '/api/appointments', headers=headers)
+        if status == 200:
+            self.etag = (response_headers.get('ETag') or '').strip('"') or None
+
+    def book(self):
+        make, model = self.random.choice(MAKES)
+        day = date.today() + timedelta(days=self.random.randint(1, self.args.days_ahead))
+        self.call('POST /api/appointments', 'POST', '/api/appointments', {
+            'carMake': make, 'carModel': model, 'carYear': str(self.random.randint(2000, 2024)),
+            'serviceType': self.random.choice(SERVICES),
+            'date': day.isoformat(), 'time': self.random.choice(TIMES),
+            'description': 'Load test booking',
+            'notificationPreference': self.args.notify,
+        })
+
+    def upload(self):
+        self.call('POST /api/upload-url', 'POST', '/api/upload-url',
+                  {'fileName': f"car-{self.random.randint(1, 10 ** 6)}.jpg", 'fileType': 'image/jpeg'})
+
+    def run(self):
+        # Spread logins over the ramp-up so they do not all land at once
+        time.sleep(self.random.uniform(0, self.args.ramp))
+        if time.monotonic() >= self.deadline or not self.login():
+            return
+
+        actions = [getattr(self, name) for name in self.args.mix]
+        weights = list(self.args.mix.values())
+        next_poll = time.monotonic()
+        while True:
+            now = time.monotonic()
+            if now >= self.deadline:
+                return
+            if now >= next_poll:
+                self.poll()
+                next_poll += self.args.poll_interval
+                continue
+
+            think = self.random.expovariate(1 / self.args.think) if self.args.think else 0
+            if now + think >= next_poll:
+                time.sleep(max(0, min(next_poll, self.deadline) - now))
+                continue
+            time.sleep(think)
+            if time.monotonic() < self.deadline:
+                self.random.choices(actions, weights)[0]()
+
+
+def run(args):
+    injector = None
+    if args.url:
+        transport_factory = lambda: HttpTransport(args.url)
+    else:
+        # The code under test logs with print; keep it (and its cost) but not the noise
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start_fake_aws()
+            injector = FaultInjector(args.latency_ms, args.jitter_ms, args.throttle_rate, args.seed)
+            injector.install()
+            import app as app_module
+            app = app_module.app
+            if not app.extensions['aws_services'].wait_until_ready(60):
+                raise SystemExit("The app did not become ready")
+        transport_factory = lambda: TestClientTransport(app)
+
+    recorder = Recorder()
+    recorder.started = time.perf_counter()
+    deadline = time.monotonic() + args.duration
+    users = [VirtualUser(i, transport_factory(), recorder, args, deadline, (args.seed or 0) * 100003 + i)
+             for i in range(args.users)]
+    threads = [threading.Thread(target=user.run, name=f"load-user-{i}", daemon=True) for i, user in enumerate(users)]
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    recorder.finished = time.perf_counter()
+
+    report = summarize(recorder)
+    report['config'] = {
+        'target': args.url or 'in-process', 'users': args.users, 'duration_s': args.duration,
+        'poll_interval_s': args.poll_interval, 'think_s': args.think, 'mix': args.mix,
+    }
+    if injector:
+        report['config'].update(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                throttle_rate=args.throttle_rate)
+        report['aws'] = injector.stats()
+    return report
+
+
+def print_report(report):
+    print(f"{report['config']['users']} users for {report['elapsed_s']}s against {report['config']['target']}")
+    if 'aws' in report:
+        print(f"AWS attempts: {report['aws']['attempts']}, throttled: {report['aws']['throttled']}")
+    print(f"{'route':28} {'reqs':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>7}  statuses")
+    for route, row in report['routes'].items():
+        statuses = ' '.join(f"{status}:{count}" for status, count in row['statuses'].items())
+        print(f"{route:28} {row['requests']:>7} {row['throughput_rps']:>8.2f} {row['p50_ms']:>9.2f} "
+              f"{row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['max_ms']:>9.2f} {row['errors']:>7}  {statuses}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a load test against the AutoCare app")
+    parser.add_argument('--url', help="Base URL of a running server; in-process on moto if omitted")
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=60, help="Seconds to run")
+    parser.add_argument('--ramp', type=float, default=5, help="Seconds over which users log in")
+    parser.add_argument('--poll-interval', type=float, default=30, help="Seconds between appointment polls")
+    parser.add_argument('--think', type=float, default=10, help="Mean seconds between other actions")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Relative weights of the actions between polls (default {DEFAULT_MIX})")
+    parser.add_argument('--days-ahead', type=int, default=60, help="Book dates up to this many days out")
+    parser.add_argument('--notify', action='store_true', help="Ask for booking notifications (SNS traffic)")
+    parser.add_argument('--latency-ms', type=float, default=0, help="Added to every AWS call (in-process only)")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="Random extra AWS latency, up to this much")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Share of AWS calls answered with throttling")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--output', help="Also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
@@ -0,0 +1,173 @@
+"""Microbenchmarks for the hot paths, run offline against moto.
+
+    python -m benchmarks.micro --output bench.json
+    python -m benchmarks.micro --compare bench.json --threshold 0.2
+
+AWS-backed cases measure our code plus moto's in-memory service, not real
+network latency; they are meant for spotting regressions between runs on
+the same machine. With --compare, any case whose median got slower than
+the baseline by more than the threshold is flagged and the exit status is 1.
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from benchmarks.fake_aws import start_fake_aws
+
+USER = 'bench@example.com'
+
+
+def measure(fn, iterations, repeat):
+    """Return per-call timings in microseconds: the median and best of ``repeat`` runs."""
+    fn()  # Warm-up: clients, caches, lazy imports
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        runs.append((time.perf_counter() - started) / iterations * 1e6)
+    return {'median_us': round(statistics.median(runs), 2), 'min_us': round(min(runs), 2),
+            'iterations': iterations, 'repeat': repeat}
+
+
+def build_cases(app_module):
+    from autocare_utils.validators import AppointmentValidator
+    from aws.cache import NullCache
+    from aws.dynamodb_utils import (
+        put_appointment, query_user_appointments, set_appointment_cache, update_appointment_status
+    )
+    from aws.sns_utils import send_notification
+
+    app = app_module.app
+    services = app.extensions['aws_services']
+    services.wait_until_ready(30)
+    # Measure the store, not the per-process query cache
+    set_appointment_cache(NullCache())
+
+    day = (date.today() + timedelta(days=7)).isoformat()
+    appointment = {
+        'carMake': 'Toyota', 'carModel': 'Camry', 'carYear': '2020',
+        'serviceType': 'oil-change', 'date': day, 'time': '10:00'
+    }
+
+    # Every put needs a slot with capacity left, so walk through the window
+    slots = itertools.cycle([
+        ((date.today() + timedelta(days=d)).isoformat(), t)
+        for d in range(1, AppointmentValidator.MAX_DAYS_AHEAD)
+        for t in AppointmentValidator.VALID_TIMES
+    ])
+    ids = itertools.count()
+    created = []
+
+    def put():
+        slot_date, slot_time = next(slots)
+        appointment_id = f"bench-{next(ids)}"
+        put_appointment(appointment_id, dict(appointment, date=slot_date, time=slot_time,
+                                             userEmail=USER, status='Pending',
+                                             createdAt=datetime.utcnow().isoformat()),
+                        capacity=10 ** 6)
+        created.append(appointment_id)
+
+    # Give the query and the status update something to work on
+    for _ in range(50):
+        put()
+    statuses = itertools.cycle(['Confirmed', 'Pending'])
+
+    def validate_appointment():
+        with app.app_context():
+            app_module.validate_appointment(appointment)
+
+    return {
+        'validator.validate_car_info': lambda: AppointmentValidator.validate_car_info('Toyota', 'Camry', '2020'),
+        'validator.validate_appointment_time': lambda: AppointmentValidator.validate_appointment_time(day, '10:00'),
+        'validator.validate_service_type': lambda: AppointmentValidator.validate_service_type('repair'),
+        'app.validate_appointment': validate_appointment,
+        'dynamodb.put_appointment': put,
+        'dynamodb.query_user_appointments': lambda: query_user_appointments(USER, limit=50),
+        'dynamodb.update_appointment_status': lambda: update_appointment_status(created[0], next(statuses)),
+        's3.presign_put': lambda: services.presigner.presign_put('car.jpg', 'image/jpeg'),
+        'sns.send_notification': lambda: send_notification(services.sns_topic_arn, 'benchmark', 'Benchmark'),
+    }
+
+
+# Pure-Python cases need many calls per run to rise above timer noise
+ITERATIONS = {
+    'validator.validate_car_info': 20000,
+    'validator.validate_appointment_time': 20000,
+    'validator.validate_service_type': 50000,
+    'app.validate_appointment': 5000,
+}
+DEFAULT_ITERATIONS = 50
+
+
+def run(selected=None, repeat=5, scale=1.0):
+    results = {}
+    # The code under test logs with print; keep it (and its cost) but not the noise
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start_fake_aws()
+        import app as app_module
+
+        for name, fn in build_cases(app_module).items():
+            if selected and not any(pattern in name for pattern in selected):
+                continue
+            iterations = max(1, int(ITERATIONS.get(name, DEFAULT_ITERATIONS) * scale))
+            results[name] = measure(fn, iterations, repeat)
+            print(f"{name:40} {results[name]['median_us']:>12.2f} us/op", file=sys.stderr)
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.utcnow().isoformat(),
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Return (name, baseline_us, current_us, ratio, regressed) for every shared case."""
+    rows = []
+    for name, result in sorted(current['results'].items()):
+        previous = baseline['results'].get(name)
+        if previous is None:
+            continue
+        ratio = result['median_us'] / previous['median_us'] if previous['median_us'] else float('inf')
+        rows.append((name, previous['median_us'], result['median_us'], ratio, ratio > 1 + threshold))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the AutoCare microbenchmarks")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--compare', metavar='BASELINE', help="Baseline JSON from an earlier run")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Allowed slowdown before a case is flagged (0.2 = 20%%)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiply every iteration count")
+    parser.add_argument('--only', nargs='*', help="Run cases whose name contains any of these")
+    args = parser.parse_args()
+
+    current = run(args.only, args.repeat, args.scale)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressed = False
+        print(f"{'case':40} {'baseline':>12} {'current':>12} {'change':>8}")
+        for name, before, after, ratio, flagged in compare(current, baseline, args.threshold):
+            regressed = regressed or flagged
+            print(f"{name:40} {before:>10.2f}us {after:>10.2f}us {ratio - 1:>+7.0%}{'  REGRESSED' if flagged else ''}")
+        sys.exit(1 if regressed else 0)
+
+    if not args.output:
+        print(json.dumps(current, indent=2, sort_keys=True))
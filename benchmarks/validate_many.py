@@ -0,0 +1,70 @@
+"""Compare AppointmentValidator.validate_many with validating row by row.
+
+    python -m benchmarks.validate_many --rows 100000
+
+Rows mimic a bulk import: a few thousand distinct dates, a handful of
+makes and services, and a small share of invalid values.
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from autocare_utils.validators import DEFAULT_SHOP_RULES, AppointmentValidator
+
+MAKES = ['Toyota', 'Honda', 'Ford', 'BMW', 'Tesla', 'X', '']
+MODELS = ['Camry', 'Civic', 'F-150', 'X5', 'Model 3', 'Y']
+YEARS = [str(y) for y in range(1995, 2027)] + ['19x0', '1800']
+
+
+def make_columns(rows, seed=1):
+    rng = random.Random(seed)
+    today = date.today()
+    dates = [(today + timedelta(days=d)).isoformat() for d in range(-10, 120)] + ['2024/01/01']
+    times = list(AppointmentValidator.VALID_TIMES) + ['12:00']
+    services = list(AppointmentValidator.VALID_SERVICES) + ['detailing']
+    return {
+        'carMake': [rng.choice(MAKES) for _ in range(rows)],
+        'carModel': [rng.choice(MODELS) for _ in range(rows)],
+        'carYear': [rng.choice(YEARS) for _ in range(rows)],
+        'date': [rng.choice(dates) for _ in range(rows)],
+        'time': [rng.choice(times) for _ in range(rows)],
+        'serviceType': [rng.choice(services) for _ in range(rows)],
+    }
+
+
+def validate_rows(columns):
+    """The per-record path, as validate_appointment in app.py runs it."""
+    valid = []
+    for row in zip(*(columns[c] for c in AppointmentValidator.COLUMNS)):
+        valid.append(not DEFAULT_SHOP_RULES.validate(dict(zip(AppointmentValidator.COLUMNS, row))))
+    return valid
+
+
+def best_of(repeat, fn, *args):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark AppointmentValidator.validate_many")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    columns = make_columns(args.rows)
+    per_row, expected = best_of(args.repeat, validate_rows, columns)
+    columnar, (mask, codes) = best_of(args.repeat, AppointmentValidator.validate_many, columns)
+
+    if list(mask) != expected:
+        raise SystemExit("validate_many disagrees with ShopRules.validate")
+
+    print(f"rows:          {args.rows}")
+    print(f"valid:         {sum(expected)}")
+    print(f"per-row:       {per_row:.3f}s ({args.rows / per_row:,.0f} rows/s)")
+    print(f"validate_many: {columnar:.3f}s ({args.rows / columnar:,.0f} rows/s)")
+    print(f"speedup:       {per_row / columnar:.1f}x")
@@ -162,12 +162,19 @@ appointmentForm.addEventListener('submit', async (e) => {
 
         showSuccess('Appointment booked successfully!');
         appointmentForm.reset();
-        await loadUserAppointments();
+        await syncAppointments();
     } catch (error) {
         showError(error.message);
     }
 });
 
+// Hex SHA-256 of a file, or undefined where Web Crypto is unavailable (plain HTTP)
+async function hashFile(file) {
+    if (!window.crypto || !window.crypto.subtle) return undefined;
+    const digest = await window.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+    return Array.from(new Uint8Array(digest), byte => byte.toString(16).padStart(2, '0')).join('');
+}
+
 // Update the Image Upload Handler
 async function uploadImage(file) {
     try {
@@ -176,7 +183,7 @@ async function uploadImage(file) {
             throw new Error('Please login to upload images');
         }
 
-        // Get presigned URL
+        // Get presigned URL; the hash lets the server reuse an identical stored photo
         const response = await fetch(`${API_ENDPOINT}/upload-url`, {
             method: 'POST',
             headers: { 
@@ -185,7 +192,8 @@ async function uploadImage(file) {
             },
             body: JSON.stringify({ 
                 fileName: file.name, 
-                fileType: file.type 
+                fileType: file.type,
+                sha256: await hashFile(file)
             })
         });
 
@@ -194,13 +202,14 @@ async function uploadImage(file) {
             throw new Error(errorData.error || 'Failed to get upload URL');
         }
         
-        const { uploadUrl, imageUrl } = await response.json();
+        const { uploadUrl, imageUrl, headers, exists } = await response.json();
+        if (exists) return imageUrl;
 
         // Upload to S3 using the presigned URL
         const uploadResponse = await fetch(uploadUrl, {
             method: 'PUT',
             body: file,
-            headers: { 'Content-Type': file.type }
+            headers: headers || { 'Content-Type': file.type }
         });
 
         if (!uploadResponse.ok) {
@@ -214,28 +223,102 @@ async function uploadImage(file) {
     }
 }
 
+// Appointments are kept client-side and refreshed with delta syncs
+let appointmentsById = new Map();
+let syncToken = null;
+let syncEtag = null;
+let refreshTimer = null;
+let appointmentStream = null;
+let lastStreamEventId = null;
+
+// Fetch every page of a listing. Only the first page is sent with
+// If-None-Match, so `notModified` means nothing changed since `etag`.
+async function fetchAppointmentPages(baseParams, etag) {
+    const token = localStorage.getItem('token');
+    if (!token) {
+        throw new Error('No authentication token found');
+    }
+
+    const result = { appointments: [], syncToken: null, etag: null, notModified: false };
+    let cursor = null;
+    let firstPage = true;
+    do {
+        const params = new URLSearchParams({ limit: 100, ...baseParams });
+        if (cursor) params.set('cursor', cursor);
+
+        const headers = {
+            'Authorization': token,
+            'Content-Type': 'application/json'
+        };
+        if (firstPage && etag) headers['If-None-Match'] = etag;
+
+        const response = await fetch(`${API_ENDPOINT}/appointments?${params}`, {
+            method: 'GET',
+            headers
+        });
+
+        if (response.status === 304) {
+            result.notModified = true;
+            return result;
+        }
+        if (!response.ok) throw new Error('Failed to load appointments');
+
+        const page = await response.json();
+        if (firstPage) {
+            result.syncToken = page.syncToken;
+            result.etag = response.headers.get('ETag');
+            firstPage = false;
+        }
+        result.appointments.push(...page.appointments);
+        cursor = page.nextCursor;
+    } while (cursor);
+
+    return result;
+}
+
+function renderAppointments() {
+    const appointments = Array.from(appointmentsById.values());
+    appointments.sort((a, b) => (a.date + a.time).localeCompare(b.date + b.time));
+    displayAppointments(appointments);
+}
+
 // Load User Appointments
 async function loadUserAppointments() {
     if (!currentUser) return;
 
     try {
-        const token = localStorage.getItem('token');
-        if (!token) {
-            throw new Error('No authentication token found');
-        }
+        const result = await fetchAppointmentPages({});
+        appointmentsById = new Map(result.appointments.map(a => [a.appointment_id, a]));
+        syncToken = result.syncToken;
+        syncEtag = null;
+        renderAppointments();
+    } catch (error) {
+        showError('Failed to load appointments: ' + error.message);
+    }
+}
 
-        const response = await fetch(`${API_ENDPOINT}/appointments`, {
-            method: 'GET',
-            headers: {
-                'Authorization': token,
-                'Content-Type': 'application/json'
-            }
-        });
+// Keep whichever copy of an appointment was updated last
+function mergeAppointment(appointment) {
+    const known = appointmentsById.get(appointment.appointment_id);
+    if (!known || !known.updatedAt || (appointment.updatedAt || '') >= known.updatedAt) {
+        appointmentsById.set(appointment.appointment_id, appointment);
+    }
+}
 
-        if (!response.ok) throw new Error('Failed to load appointments');
+// Fetch only the appointments that changed since the last sync
+async function syncAppointments() {
+    if (!currentUser) return;
+    if (!syncToken) return loadUserAppointments();
 
-        const appointments = await response.json();
-        displayAppointments(appointments);
+    try {
+        const result = await fetchAppointmentPages({ since: syncToken }, syncEtag);
+        if (result.notModified) return;
+
+        // The server re-sends a margin before the token, so rows may repeat
+        result.appointments.forEach(mergeAppointment);
+        syncEtag = result.etag;
+        if (result.syncToken) syncToken = result.syncToken;
+        if (result.appointments.length) renderAppointments();
     } catch (error) {
         showError('Failed to load appointments: ' + error.message);
     }
@@ -257,6 +340,20 @@ function displayAppointments(appointments) {
             <p><strong>Status:</strong> <span class="status-${appointment.status.toLowerCase()}">${appointment.status}</span></p>
             <p><strong>Description:</strong> ${appointment.description || 'No description provided'}</p>
         `;
+        // Only the small variant is shown in the list; it links to the larger one
+        const variants = appointment.imageVariants;
+        if (variants && variants.thumbnail) {
+            const link = document.createElement('a');
+            link.href = variants.medium || appointment.imageUrl;
+            link.target = '_blank';
+            const thumbnail = document.createElement('img');
+            thumbnail.src = variants.thumbnail;
+            thumbnail.alt = 'Vehicle photo';
+            thumbnail.loading = 'lazy';
+            thumbnail.className = 'appointment-thumbnail';
+            link.appendChild(thumbnail);
+            card.appendChild(link);
+        }
         container.appendChild(card);
     });
 
@@ -268,8 +365,63 @@ function startAppointmentRefresh() {
     // Initial load
     loadUserAppointments();
     
-    // Refresh every 30 seconds
-    setInterval(loadUserAppointments, 30000);
+    // Live updates over Server-Sent Events; poll only if streaming is unavailable
+    if (appointmentStream) appointmentStream.close();
+    if (refreshTimer) clearInterval(refreshTimer);
+    refreshTimer = null;
+
+    const token = localStorage.getItem('token');
+    if (!window.EventSource || !token) {
+        startAppointmentPolling();
+        return;
+    }
+    openAppointmentStream(token, false);
+}
+
+// The stream URL carries a short-lived stream token, never the access token
+async function openAppointmentStream(token, isRetry) {
+    let streamToken;
+    try {
+        const response = await fetch(`${API_ENDPOINT}/appointments/stream-token`, {
+            method: 'POST',
+            headers: { 'Authorization': token }
+        });
+        if (!response.ok) throw new Error('No stream token');
+        streamToken = (await response.json()).streamToken;
+    } catch (error) {
+        startAppointmentPolling();
+        return;
+    }
+    if (!currentUser) return;  // Logged out while the token was requested
+
+    const params = new URLSearchParams({ token: streamToken });
+    if (lastStreamEventId) params.set('lastEventId', lastStreamEventId);
+    const stream = new EventSource(`${API_ENDPOINT}/appointments/stream?${params}`);
+    appointmentStream = stream;
+    stream.addEventListener('open', () => { isRetry = false; });
+    stream.addEventListener('appointment', (e) => {
+        lastStreamEventId = e.lastEventId || lastStreamEventId;
+        mergeAppointment(JSON.parse(e.data));
+        renderAppointments();
+    });
+    stream.addEventListener('resync', () => loadUserAppointments());
+    stream.onerror = () => {
+        // EventSource retries by itself, but with the same, possibly expired,
+        // stream token; CLOSED means the server refused it
+        if (stream.readyState !== EventSource.CLOSED || appointmentStream !== stream) return;
+        appointmentStream = null;
+        if (isRetry) {
+            startAppointmentPolling();
+        } else {
+            openAppointmentStream(token, true);
+        }
+    };
+}
+
+function startAppointmentPolling() {
+    // Poll for changes every 30 seconds
+    if (refreshTimer) clearInterval(refreshTimer);
+    refreshTimer = setInterval(syncAppointments, 30000);
 }
 
 // Update the updateAuthUI function to start the refresh when logged in
@@ -285,6 +437,10 @@ function updateAuthUI() {
         userInfo.style.display = 'none';
         authButtons.style.display = 'block';
         appointmentsList.style.display = 'none';
+        if (appointmentStream) appointmentStream.close();
+        if (refreshTimer) clearInterval(refreshTimer);
+        appointmentStream = null;
+        refreshTimer = null;
     }
 }
 
@@ -0,0 +1,100 @@
+"""Delete content-addressed images that no appointment references.
+
+    python image_gc.py --grace-hours 24 --dry-run
+
+Objects under ``sha256/`` older than the grace period are checked against
+their ``image#<sha256>`` counter items. Objects without a counter (uploaded
+but never attached to a booking) or with a count of zero are deleted along
+with their resized variants, unless the counter was touched within the
+grace period: presigning touches it whenever it tells a client the image
+already exists. The grace period must comfortably exceed how long an
+upload URL or a cached existence check stays valid.
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from aws.clients import get_client
+from aws.dynamodb_utils import get_image_references
+from aws.provision import load_state, STATE_FILE
+from aws.s3_utils import CONTENT_PREFIX, hash_from_key
+from image_variants import EXTENSIONS, VARIANT_SIZES, variant_key
+
+DEFAULT_GRACE_HOURS = 24
+DELETE_BATCH_SIZE = 1000
+
+
+def find_candidates(s3_client, bucket_name, older_than):
+    """Return {sha256: key} for content-addressed objects last written before ``older_than``."""
+    candidates = {}
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=f"{CONTENT_PREFIX}/"):
+        for obj in page.get('Contents', []):
+            sha256 = hash_from_key(obj['Key'])
+            if sha256 and obj['LastModified'] < older_than:
+                candidates[sha256] = obj['Key']
+    return candidates
+
+
+def is_orphan(reference, older_than):
+    """True for an image with no counter, or no references and no touch since ``older_than``."""
+    if reference is None:
+        return True
+    ref_count, updated_at = reference
+    if ref_count > 0:
+        return False
+    # updatedAt is naive UTC, as written by aws.dynamodb_utils.timestamp()
+    return updated_at is None or datetime.fromisoformat(updated_at).replace(tzinfo=timezone.utc) < older_than
+
+
+def collect_garbage(bucket_name, grace=timedelta(hours=DEFAULT_GRACE_HOURS), dry_run=False, region=None):
+    """Delete unreferenced images; return a summary dict."""
+    s3_client = get_client('s3', region)
+    older_than = datetime.now(timezone.utc) - grace
+    candidates = find_candidates(s3_client, bucket_name, older_than)
+    references = get_image_references(candidates)
+    orphans = {sha256: key for sha256, key in candidates.items()
+               if is_orphan(references.get(sha256), older_than)}
+
+    keys = []
+    for key in orphans.values():
+        keys.append(key)
+        # Either format may have been used when the variants were made
+        keys.extend(variant_key(key, name, image_format)
+                    for name in VARIANT_SIZES for image_format in EXTENSIONS)
+
+    deleted = 0
+    if not dry_run:
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            response = s3_client.delete_objects(
+                Bucket=bucket_name,
+                Delete={'Objects': [{'Key': key} for key in keys[start:start + DELETE_BATCH_SIZE]],
+                        'Quiet': True}
+            )
+            for error in response.get('Errors', []):
+                print(f"Error deleting {error['Key']}: {error['Message']}")
+            deleted += len(keys[start:start + DELETE_BATCH_SIZE]) - len(response.get('Errors', []))
+
+    return {
+        'scanned': len(candidates),
+        'referenced': len(candidates) - len(orphans),
+        'orphaned': len(orphans),
+        'deletedKeys': deleted,
+        'dryRun': dry_run
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Garbage-collect unreferenced content-addressed images")
+    parser.add_argument('--state-file', default=STATE_FILE)
+    parser.add_argument('--bucket', help="Defaults to the bucket in the state file")
+    parser.add_argument('--grace-hours', type=float, default=DEFAULT_GRACE_HOURS)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    state = load_state(args.state_file) or {}
+    bucket_name = args.bucket or state.get('bucket_name')
+    if not bucket_name:
+        parser.error("No bucket given and none recorded in the state file")
+
+    summary = collect_garbage(bucket_name, timedelta(hours=args.grace_hours), args.dry_run, state.get('region'))
+    print(summary)
@@ -0,0 +1,155 @@
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from aws.clients import get_client
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it appointments keep only the original
+    Image = None
+
+# name -> bounding box; images are shrunk to fit, never enlarged
+VARIANT_SIZES = {
+    'thumbnail': (240, 240),
+    'medium': (1024, 1024),
+}
+VARIANT_FORMAT = os.environ.get('IMAGE_VARIANT_FORMAT', 'WEBP').upper()
+VARIANT_QUALITY = 80
+VARIANT_PREFIX = 'variants'
+# A failed key is retried after RETRY_AFTER seconds, doubling per failure up to MAX_RETRY_AFTER
+RETRY_AFTER = 60
+MAX_RETRY_AFTER = 3600
+CONTENT_TYPES = {'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+
+def render_variants(data, sizes=VARIANT_SIZES, image_format=VARIANT_FORMAT):
+    """Return {name: encoded bytes} for one original image.
+
+    The image is rotated according to its EXIF orientation first; the
+    encoded variants carry no EXIF or other metadata.
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGBA' if image_format == 'WEBP' and 'A' in image.getbands() else 'RGB')
+        image.info = {}
+
+        rendered = {}
+        for name, size in sizes.items():
+            variant = image.copy()
+            variant.thumbnail(size, Image.LANCZOS)
+            buffer = io.BytesIO()
+            variant.save(buffer, image_format, quality=VARIANT_QUALITY, exif=b'')
+            rendered[name] = buffer.getvalue()
+        return rendered
+
+
+def variant_key(key, name, image_format=VARIANT_FORMAT):
+    """Key of one variant of the original stored at ``key``."""
+    stem = key.rsplit('.', 1)[0]
+    return f"{VARIANT_PREFIX}/{name}/{stem}.{EXTENSIONS[image_format]}"
+
+
+class ImageVariantService:
+    """Builds resized copies of uploaded appointment photos on a worker pool.
+
+    Variants are written to the image bucket under ``variants/<name>/`` and
+    their URLs handed to ``on_ready(appointment_id, variants)``, which stores
+    them on the appointment. Results are also kept in memory by source key
+    for ``ttl`` seconds, up to ``max_entries`` keys, so an image shared by
+    several appointments is only processed once. A key that failed is
+    skipped until its retry time, which backs off with each failure.
+    """
+
+    def __init__(self, services, on_ready, workers=2, max_entries=1000, ttl=600):
+        self.services = services
+        self.on_ready = on_ready
+        self.enabled = Image is not None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-variants')
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._variants = OrderedDict()  # key -> (expires_at, variants)
+        self._pending = set()
+        self._failed = OrderedDict()  # key -> (failures, retry_at)
+        if not self.enabled:
+            print("WARNING: Pillow is not installed, image variants are disabled")
+
+    @property
+    def bucket_name(self):
+        return self.services.bucket_name
+
+    @property
+    def region(self):
+        return self.services.region
+
+    def image_url(self, key):
+        return f"https://{self.bucket_name}.s3.{self.region}.amazonaws.com/{key}"
+
+    def submit(self, appointment):
+        """Queue variant generation for an appointment that has an image but no variants."""
+        key = self.services.presigner.key_from_url(appointment.get('imageUrl'))
+        if not self.enabled or key is None or appointment.get('imageVariants'):
+            return
+
+        appointment_id = appointment['appointment_id']
+        with self._lock:
+            failed = self._failed.get(key)
+            if appointment_id in self._pending or (failed and failed[1] > time.monotonic()):
+                return
+            self._pending.add(appointment_id)
+        self._executor.submit(self._run, appointment_id, key)
+
+    def _run(self, appointment_id, key):
+        try:
+            with self._lock:
+                entry = self._variants.get(key)
+                variants = entry[1] if entry and entry[0] > time.monotonic() else None
+                if variants is not None:
+                    self._variants.move_to_end(key)
+            if variants is None:
+                variants = self.generate(key)
+                with self._lock:
+                    self._remember(self._variants, key, (time.monotonic() + self.ttl, variants))
+                    self._failed.pop(key, None)
+            self.on_ready(appointment_id, variants)
+        except Exception as e:
+            # Backed off, so a broken upload is not re-fetched on every listing
+            with self._lock:
+                failures = self._failed.get(key, (0, 0))[0] + 1
+                retry_after = min(MAX_RETRY_AFTER, RETRY_AFTER * 2 ** (failures - 1))
+                self._remember(self._failed, key, (failures, time.monotonic() + retry_after))
+            print(f"Error creating image variants for {key}: {str(e)}")
+        finally:
+            with self._lock:
+                self._pending.discard(appointment_id)
+
+    def _remember(self, entries, key, value):
+        """Store ``value`` as the newest entry, dropping the oldest past max_entries; call with _lock held."""
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def generate(self, key):
+        """Download ``key``, write its variants to S3 and return {name: url}."""
+        s3_client = get_client('s3', self.region)
+        data = s3_client.get_object(Bucket=self.bucket_name, Key=key)['Body'].read()
+
+        variants = {}
+        for name, body in render_variants(data).items():
+            target_key = variant_key(key, name)
+            s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=target_key,
+                Body=body,
+                ACL='public-read',
+                ContentType=CONTENT_TYPES[VARIANT_FORMAT],
+                CacheControl='public, max-age=31536000, immutable'
+            )
+            variants[name] = self.image_url(target_key)
+        return variants
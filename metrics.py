@@ -0,0 +1,217 @@
+"""Request and AWS call metrics, exposed in the Prometheus text format.
+
+Flask requests are timed with request hooks (``instrument_app``) and every
+botocore call made through aws.clients with its before-call/after-call
+events (``instrument_aws``). Values are kept per process, like /statsz, so
+with several workers each one reports its own.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request
+
+from aws import clients
+
+# Seconds; Prometheus' defaults, which cover both cache hits and slow AWS calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Error codes botocore's standard retry mode treats as throttling
+THROTTLING_ERROR_CODES = frozenset([
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottledException',
+    'TooManyRequestsException', 'ProvisionedThroughputExceededException', 'TransactionInProgressException',
+    'RequestLimitExceeded', 'BandwidthLimitExceeded', 'LimitExceededException', 'RequestThrottled',
+    'SlowDown', 'PriorRequestNotComplete', 'EC2ThrottledException',
+])
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing count per label combination."""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, labels=(), amount=1):
+        """Add ``amount``; ``labels`` are the values for ``labelnames``, in order."""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}"
+
+
+class Histogram:
+    """Observations counted into fixed buckets per label combination.
+
+    ``observe`` only bumps one bucket; the cumulative counts Prometheus
+    expects are computed when the metric is rendered.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                # One count per bucket plus +Inf, then the running sum
+                entry = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[index] += 1
+            entry[-1] += value
+
+    def samples(self):
+        with self._lock:
+            values = sorted((labels, list(entry)) for labels, entry in self._values.items())
+        bounds = self.buckets + (float('inf'),)
+        for labels, entry in values:
+            cumulative = 0
+            for bound, count in zip(bounds, entry):
+                cumulative += count
+                le = f'le="{_format_number(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_number(entry[-1])}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'autocare_http_request_duration_seconds', 'Time spent handling HTTP requests.',
+    ('method', 'route', 'status')
+)
+AWS_CALL_SECONDS = REGISTRY.histogram(
+    'autocare_aws_call_duration_seconds', 'Time spent in AWS API calls, retries included.',
+    ('service', 'operation', 'status')
+)
+AWS_RETRIES = REGISTRY.counter(
+    'autocare_aws_retries_total', 'AWS API requests that were retried.', ('service', 'operation')
+)
+AWS_THROTTLES = REGISTRY.counter(
+    'autocare_aws_throttles_total', 'AWS API attempts answered with a throttling error.',
+    ('service', 'operation', 'code')
+)
+
+
+def instrument_app(app):
+    """Time every request the app handles, labelled by its URL rule."""
+
+    @app.before_request
+    def start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            # The rule, not the path, so IDs in URLs do not create new series
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            HTTP_REQUEST_SECONDS.observe((request.method, route, str(response.status_code)),
+                                         time.perf_counter() - started)
+        return response
+
+
+def _before_call(model, context, **kwargs):
+    context['metrics_call'] = (model.service_model.service_name, model.name, time.perf_counter())
+
+
+def _after_call(http_response, parsed, context, **kwargs):
+    call = context.pop('metrics_call', None)
+    if call is None:
+        return
+    service, operation, started = call
+    AWS_CALL_SECONDS.observe((service, operation, str(http_response.status_code)), time.perf_counter() - started)
+    retries = parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0)
+    if retries:
+        AWS_RETRIES.inc((service, operation), retries)
+
+
+def _after_call_error(context, **kwargs):
+    # Connection errors and timeouts, after any retries; no HTTP status exists
+    call = context.pop('metrics_call', None)
+    if call is not None:
+        service, operation, started = call
+        AWS_CALL_SECONDS.observe((service, operation, 'error'), time.perf_counter() - started)
+
+
+def _needs_retry(response, operation, **kwargs):
+    # Runs after every attempt, so each throttled attempt is counted once
+    if response is None:
+        return None
+    code = response[1].get('Error', {}).get('Code')
+    if code in THROTTLING_ERROR_CODES:
+        AWS_THROTTLES.inc((operation.service_model.service_name, operation.name, code))
+    return None
+
+
+_aws_instrumented = False
+
+
+def instrument_aws():
+    """Time every AWS call made through aws.clients from now on."""
+    global _aws_instrumented
+    if _aws_instrumented:
+        return
+    _aws_instrumented = True
+    clients.register_event_handler('before-call', _before_call)
+    clients.register_event_handler('after-call', _after_call)
+    clients.register_event_handler('after-call-error', _after_call_error)
+    clients.register_event_handler('needs-retry', _needs_retry)
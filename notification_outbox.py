@@ -0,0 +1,160 @@
+import atexit
+import json
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+
+class NotificationOutbox:
+    """Runs notification jobs (SNS publish/subscribe) off the request path.
+
+    Handlers ``enqueue`` a named job and return immediately. ``workers``
+    threads drain the queue, which bounds how many SNS calls are in flight.
+    A handler may return a Future instead of blocking; the job is then
+    settled when it completes, leaving the worker free.
+    A failed job is retried up to ``max_attempts`` times with exponential
+    backoff and full jitter. After that it is appended to ``dead_letter_path``
+    as one JSON line so it can be inspected or replayed.
+
+    The queue lives in memory: jobs still queued when the process is killed
+    are lost. On a normal exit, ``stop`` is called from atexit and drains it.
+    """
+
+    def __init__(self, handlers, workers=4, max_queue=10000, max_attempts=5,
+                 base_delay=0.5, max_delay=30, dead_letter_path='notification_deadletter.jsonl'):
+        self.handlers = handlers
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.dead_letter_path = dead_letter_path
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._retry_timers = {}
+        self._stopping = False
+        self.in_flight = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'notification-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        atexit.register(self.stop)
+
+    def stop(self, timeout=10):
+        """Stop accepting retries and wait up to ``timeout`` seconds for the queue to drain."""
+        self._stopping = True
+        with self._lock:
+            timers, self._retry_timers = list(self._retry_timers.values()), {}
+        for timer in timers:
+            timer.cancel()
+            self._queue.put(timer.args[0])
+
+        deadline = time.monotonic() + timeout
+        while (self._queue.unfinished_tasks or self.in_flight) and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def enqueue(self, job_name, **params):
+        """Queue a job for the handler registered as ``job_name``."""
+        if job_name not in self.handlers:
+            raise ValueError(f"Unknown notification job: {job_name}")
+
+        job = {'name': job_name, 'params': params, 'attempts': 0,
+               'enqueuedAt': datetime.utcnow().isoformat()}
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self._dead_letter(job, 'Outbox queue is full')
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'inFlight': self.in_flight,
+            'waitingRetry': len(self._retry_timers),
+            'succeeded': self.succeeded,
+            'retried': self.retried,
+            'failed': self.failed,
+        }
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                self.in_flight += 1
+            try:
+                self._process(job)
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                self._queue.task_done()
+
+    def _process(self, job):
+        job['attempts'] += 1
+        try:
+            result = self.handlers[job['name']](**job['params'])
+        except Exception as e:
+            self._finish(job, e)
+            return
+
+        if isinstance(result, Future):
+            # Asynchronous handler (e.g. a batched publish): free the worker
+            # and settle the job when the future completes
+            with self._lock:
+                self.in_flight += 1
+            result.add_done_callback(lambda future: self._finish(job, future.exception(), async_done=True))
+        else:
+            self._finish(job, None)
+
+    def _finish(self, job, error, async_done=False):
+        if async_done:
+            with self._lock:
+                self.in_flight -= 1
+
+        if error is None:
+            with self._lock:
+                self.succeeded += 1
+            return
+
+        if job['attempts'] >= self.max_attempts or self._stopping:
+            self._dead_letter(job, str(error))
+            return
+
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** job['attempts']))
+        print(f"Notification job {job['name']} failed ({str(error)}), retrying in {delay:.2f}s")
+        self._schedule_retry(job, delay)
+
+    def _schedule_retry(self, job, delay):
+        # A timer re-queues the job so the worker is free in the meantime
+        timer = threading.Timer(delay, self._requeue, args=(job,))
+        timer.daemon = True
+        with self._lock:
+            self._retry_timers[id(job)] = timer
+            self.retried += 1
+        timer.start()
+
+    def _requeue(self, job):
+        with self._lock:
+            if self._retry_timers.pop(id(job), None) is None:
+                return  # Already re-queued by stop()
+        self._queue.put(job)
+
+    def _dead_letter(self, job, error):
+        record = dict(job, error=error, failedAt=datetime.utcnow().isoformat())
+        with self._lock:
+            self.failed += 1
+            try:
+                with open(self.dead_letter_path, 'a') as f:
+                    f.write(json.dumps(record, default=str) + '\n')
+            except Exception as e:
+                print(f"Error writing notification dead letter: {str(e)}")
+        print(f"Notification job {job['name']} dead-lettered: {error}")
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from aws.lambda_utils import invoke_lambda_function
+
+
+class RemoteValidator:
+    """Validates appointments with the validator Lambda within a latency budget.
+
+    ``validate_many`` invokes the function once per payload on a thread pool
+    and waits at most ``budget_ms`` for the whole set. Payloads that are not
+    answered in time, or whose invocation fails, are validated with
+    ``local_validate`` instead; a late answer is still cached. Results are
+    memoized for ``cache_ttl`` seconds, so retried and repeated submissions
+    do not invoke again. Validity also depends on the rules in force and on
+    the clock (the booking window and lead time), so the memo key includes
+    ``rules_version()`` and the current ``time_bucket``-second interval: a
+    rules reload or a new interval starts over with fresh answers.
+
+    A slow or failing function must not slow every booking down, so the
+    remote call is skipped (and the payload validated locally at once)
+    while ``max_pending`` invocations are already queued or running, and
+    for ``open_seconds`` after ``failure_threshold`` invocations in a row
+    timed out or failed. After that one call is let through to probe it.
+    """
+
+    def __init__(self, function_name, local_validate, invoke=invoke_lambda_function,
+                 budget_ms=250, workers=8, cache_ttl=300, cache_size=10000,
+                 max_pending=None, failure_threshold=5, open_seconds=30, rules_version=None,
+                 time_bucket=60):
+        self.function_name = function_name
+        self.local_validate = local_validate
+        self.invoke = invoke
+        self.budget = budget_ms / 1000
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.rules_version = rules_version
+        self.time_bucket = time_bucket
+        self.max_pending = max_pending or workers * 2
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='remote-validation')
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+        self._pending = 0
+        self._failures = 0
+        self._open_until = 0
+        self.remote = 0
+        self.cached = 0
+        self.fallbacks = 0
+        self.errors = 0
+        self.skipped = 0
+
+    def payload_key(self, payload):
+        version = self.rules_version() if self.rules_version else None
+        scope = [version, int(time.time() // self.time_bucket)]
+        return hashlib.sha256(json.dumps([payload, scope], sort_keys=True, default=str).encode()).hexdigest()
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._results[key]
+                return None
+            self._results.move_to_end(key)
+            self.cached += 1
+            return entry[1]
+
+    def _store(self, key, result):
+        with self._lock:
+            self._results[key] = (time.monotonic() + self.cache_ttl, result)
+            self._results.move_to_end(key)
+            while len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+
+    def _invoke(self, key, payload):
+        result = self.invoke(self.function_name, payload)
+        if not isinstance(result, dict) or 'isValid' not in result:
+            raise ValueError(f"Unexpected validation result: {result!r}")
+        self._store(key, result)
+        return result
+
+    def _finished(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def _submit(self, key, payload):
+        """Start an invocation, or return None if the circuit is open or the pool is saturated."""
+        with self._lock:
+            if self._pending >= self.max_pending or time.monotonic() < self._open_until:
+                self.skipped += 1
+                return None
+            if self._failures >= self.failure_threshold:
+                # Half-open: let this one through and hold the others back
+                self._open_until = time.monotonic() + self.budget
+            self._pending += 1
+        future = self._executor.submit(self._invoke, key, payload)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _record(self, succeeded):
+        with self._lock:
+            if succeeded:
+                self._failures = 0
+                self._open_until = 0
+                return
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._open_until = time.monotonic() + self.open_seconds
+
+    def validate(self, payload):
+        return self.validate_many([payload])[0]
+
+    def validate_many(self, payloads):
+        """Return one result per payload, in order."""
+        results = [None] * len(payloads)
+        pending = {}
+        for index, payload in enumerate(payloads):
+            key = self.payload_key(payload)
+            results[index] = self._cached(key)
+            if results[index] is None:
+                future = self._submit(key, payload)
+                if future is None:
+                    results[index] = self.local_validate(payload)
+                else:
+                    pending[future] = index
+
+        if pending:
+            done, _ = wait(pending, timeout=self.budget)
+            for future, index in pending.items():
+                succeeded = future in done and future.exception() is None
+                self._record(succeeded)
+                if succeeded:
+                    results[index] = future.result()
+                    with self._lock:
+                        self.remote += 1
+                    continue
+
+                with self._lock:
+                    if future in done:
+                        self.errors += 1
+                        print(f"Remote validation failed, validating locally: {future.exception()}")
+                    self.fallbacks += 1
+                results[index] = self.local_validate(payloads[index])
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                'remote': self.remote,
+                'cached': self.cached,
+                'fallbacks': self.fallbacks,
+                'errors': self.errors,
+                'skipped': self.skipped,
+                'pending': self._pending,
+                'circuitOpen': time.monotonic() < self._open_until,
+                'cacheSize': len(self._results),
+            }
+
+
+class LocalLambda:
+    """In-process stand-in for a deployed function, for development and tests.
+
+    ``invoke`` has the signature of ``invoke_lambda_function`` and runs
+    ``handler`` after ``latency`` seconds; payloads and results round-trip
+    through JSON as they would over the wire.
+    """
+
+    def __init__(self, handler, latency=0.0):
+        self.handler = handler
+        self.latency = latency
+        self.invocations = 0
+
+    def invoke(self, function_name, payload, invocation_type='RequestResponse'):
+        self.invocations += 1
+        event = json.loads(json.dumps(payload, default=str))
+        if invocation_type == 'Event':
+            threading.Thread(target=self._run, args=(event,), daemon=True).start()
+            return {'StatusCode': 202}
+        return json.loads(json.dumps(self._run(event), default=str))
+
+    def _run(self, event):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.handler(event, None)
@@ -0,0 +1,200 @@
+import io
+import json
+import threading
+import time
+
+import boto3
+import pytest
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+
+from aws import lambda_utils
+from remote_validation import LocalLambda, RemoteValidator
+
+APPOINTMENT = {'carMake': 'Toyota', 'carModel': 'Camry', 'carYear': '2020', 'serviceType': 'repair'}
+
+
+def remote_handler(event, context):
+    return {'isValid': True, 'errors': [], 'source': 'remote'}
+
+
+def local_validate(payload):
+    return {'isValid': True, 'errors': [], 'source': 'local'}
+
+
+def make_validator(handler=remote_handler, latency=0.0, **kwargs):
+    function = LocalLambda(handler, latency=latency)
+    validator = RemoteValidator('validator', local_validate, invoke=function.invoke, **kwargs)
+    return validator, function
+
+
+def test_answer_within_budget_is_used():
+    validator, function = make_validator(budget_ms=1000)
+
+    assert validator.validate(APPOINTMENT)['source'] == 'remote'
+    assert function.invocations == 1
+    assert validator.stats()['remote'] == 1
+
+
+def test_repeated_payload_is_served_from_cache():
+    validator, function = make_validator(budget_ms=1000)
+
+    validator.validate(APPOINTMENT)
+    result = validator.validate(dict(APPOINTMENT))
+
+    assert result['source'] == 'remote'
+    assert function.invocations == 1
+    assert validator.stats()['cached'] == 1
+
+
+def test_cached_results_expire():
+    validator, function = make_validator(budget_ms=1000, cache_ttl=0)
+
+    validator.validate(APPOINTMENT)
+    validator.validate(APPOINTMENT)
+
+    assert function.invocations == 2
+
+
+def test_slow_answer_falls_back_to_local_and_is_cached_late():
+    validator, function = make_validator(latency=0.2, budget_ms=20)
+
+    started = time.monotonic()
+    result = validator.validate(APPOINTMENT)
+
+    assert result['source'] == 'local'
+    assert time.monotonic() - started < 0.15
+    assert validator.stats()['fallbacks'] == 1
+    assert validator.stats()['errors'] == 0
+
+    # The late answer is kept for the next identical submission
+    time.sleep(0.3)
+    assert validator.validate(APPOINTMENT)['source'] == 'remote'
+    assert function.invocations == 1
+
+
+def test_failing_function_falls_back_to_local():
+    def failing_handler(event, context):
+        raise RuntimeError('boom')
+
+    validator, _ = make_validator(failing_handler, budget_ms=1000)
+
+    assert validator.validate(APPOINTMENT)['source'] == 'local'
+    assert validator.stats()['errors'] == 1
+    assert validator.stats()['fallbacks'] == 1
+
+
+def test_malformed_result_falls_back_to_local():
+    validator, _ = make_validator(lambda event, context: {'ok': True}, budget_ms=1000)
+
+    assert validator.validate(APPOINTMENT)['source'] == 'local'
+    assert validator.stats()['errors'] == 1
+
+
+@pytest.fixture
+def stubbed_lambda(monkeypatch):
+    client = boto3.client('lambda', region_name='us-east-1',
+                          aws_access_key_id='testing', aws_secret_access_key='testing')
+    monkeypatch.setattr(lambda_utils, 'get_client', lambda service: client)
+    with Stubber(client) as stubber:
+        yield stubber
+
+
+def invoke_response(body, function_error=None):
+    payload = json.dumps(body).encode()
+    response = {'StatusCode': 200, 'Payload': StreamingBody(io.BytesIO(payload), len(payload))}
+    if function_error:
+        response['FunctionError'] = function_error
+    return response
+
+
+def test_function_error_falls_back_to_local(stubbed_lambda):
+    stubbed_lambda.add_response('invoke', invoke_response(
+        {'errorMessage': 'handler crashed', 'errorType': 'KeyError'}, function_error='Unhandled'
+    ))
+    validator = RemoteValidator('validator', local_validate, budget_ms=1000)
+
+    assert validator.validate(APPOINTMENT)['source'] == 'local'
+    assert validator.stats()['errors'] == 1
+    stubbed_lambda.assert_no_pending_responses()
+
+
+def test_function_error_raises_from_invoke(stubbed_lambda):
+    stubbed_lambda.add_response('invoke', invoke_response({'errorMessage': 'handler crashed'}, 'Unhandled'))
+
+    with pytest.raises(RuntimeError, match='handler crashed'):
+        lambda_utils.invoke_lambda_function('validator', APPOINTMENT)
+
+
+def test_circuit_opens_after_repeated_timeouts():
+    validator, function = make_validator(latency=0.1, budget_ms=10, failure_threshold=2, open_seconds=60)
+
+    for year in ('2001', '2002'):
+        assert validator.validate(dict(APPOINTMENT, carYear=year))['source'] == 'local'
+    assert function.invocations == 2
+
+    started = time.monotonic()
+    assert validator.validate(dict(APPOINTMENT, carYear='2003'))['source'] == 'local'
+    assert time.monotonic() - started < 0.01
+    assert function.invocations == 2
+    assert validator.stats()['circuitOpen']
+    assert validator.stats()['skipped'] == 1
+
+
+def test_circuit_closes_after_successful_probe():
+    validator, function = make_validator(latency=0.3, budget_ms=10, failure_threshold=1, open_seconds=0.05)
+    assert validator.validate(dict(APPOINTMENT, carYear='2001'))['source'] == 'local'
+    assert validator.stats()['circuitOpen']
+
+    function.latency = 0
+    validator.budget = 1
+    time.sleep(0.1)
+    assert validator.validate(dict(APPOINTMENT, carYear='2002'))['source'] == 'remote'
+    assert not validator.stats()['circuitOpen']
+
+
+def test_saturated_pool_validates_locally_without_queueing():
+    release = threading.Event()
+
+    def blocking_handler(event, context):
+        release.wait(5)
+        return remote_handler(event, context)
+
+    validator, function = make_validator(blocking_handler, budget_ms=10, workers=1, max_pending=2,
+                                         failure_threshold=100)
+    try:
+        results = validator.validate_many([dict(APPOINTMENT, carYear=str(2000 + i)) for i in range(5)])
+
+        assert [result['source'] for result in results] == ['local'] * 5
+        assert function.invocations <= 2
+        assert validator.stats()['skipped'] == 3
+        assert validator.stats()['pending'] == 2
+    finally:
+        release.set()
+
+
+def test_rules_reload_starts_a_new_cache():
+    version = ['v1']
+    validator, function = make_validator(budget_ms=1000, rules_version=lambda: version[0])
+
+    validator.validate(APPOINTMENT)
+    version[0] = 'v2'
+    validator.validate(APPOINTMENT)
+
+    assert function.invocations == 2
+    assert validator.stats()['cached'] == 0
+
+
+def test_cached_results_do_not_outlive_their_time_bucket(monkeypatch):
+    validator, function = make_validator(budget_ms=1000, time_bucket=60)
+    now = [1000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+
+    validator.validate(APPOINTMENT)
+    now[0] = 1019.0
+    validator.validate(APPOINTMENT)
+    assert function.invocations == 1
+
+    now[0] = 1020.0
+    validator.validate(APPOINTMENT)
+    assert function.invocations == 2